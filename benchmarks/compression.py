@@ -0,0 +1,98 @@
+"""
+Compares the throughput, the CPU time and the size of data on the wire of an echo exchange with and without
+permessage-deflate compression. The client and the server run in the same process, so the CPU time covers both.
+
+Usage: python benchmarks/compression.py [--messages 2000] [--size 4096] [--window-bits 15] [--no-context-takeover]
+"""
+import argparse
+import json
+import random
+import time
+from typing import List, Optional, Tuple
+
+import trio
+from trio_websocket import ConnectionClosed, WebSocketRequest, serve_websocket
+
+from ws.client import open_websocket_client
+from ws.commands.echo_server import accept_request
+from ws.settings import Settings
+from ws.utils.compression import create_compression_extension
+from ws.utils.size import get_readable_size
+
+# messages are different from each other, otherwise the compression context makes them almost free to send
+DISTINCT_MESSAGES = 100
+
+
+def create_message(size: int) -> str:
+    """Returns a json message looking like the ones of a market feed, which are the usual target of compression."""
+    items = []
+    while len(json.dumps(items)) < size:
+        items.append(
+            {
+                'symbol': random.choice(['BTC-USD', 'ETH-USD', 'SOL-USD', 'ADA-USD']),  # noqa: S311
+                'price': round(random.uniform(10, 50_000), 2),  # noqa: S311
+                'quantity': round(random.uniform(0, 10), 4),  # noqa: S311
+                'side': random.choice(['buy', 'sell']),  # noqa: S311
+                'timestamp': time.time(),
+            }
+        )
+    return json.dumps(items)
+
+
+async def measure(settings: Settings, messages: List[str], count: int) -> Tuple[float, float, Optional[int]]:
+    """Returns the duration, the CPU time and the compressed size of the data sent by the client."""
+
+    async def handler(request: WebSocketRequest) -> None:
+        ws = await accept_request(request, create_compression_extension(settings))
+        while True:
+            try:
+                await ws.send_message(await ws.get_message())
+            except ConnectionClosed:
+                break
+
+    async with trio.open_nursery() as nursery:
+        # port 0 lets the system pick a free port, so that the benchmark does not depend on the ones in use
+        server = await nursery.start(serve_websocket, handler, 'localhost', 0, None)
+        async with open_websocket_client(f'ws://localhost:{server.port}', settings) as client:
+            beginning, cpu_beginning = time.perf_counter(), time.process_time()
+            for i in range(count):
+                await client.send_message(messages[i % len(messages)])
+                await client.get_message()
+            duration, cpu_time = time.perf_counter() - beginning, time.process_time() - cpu_beginning
+        nursery.cancel_scope.cancel()
+
+    compressed_size = client.compression.sent_compressed_size if client.compression is not None else None
+    return duration, cpu_time, compressed_size
+
+
+async def main(count: int, size: int, window_bits: int, no_context_takeover: bool) -> None:
+    messages = [create_message(size) for _ in range(DISTINCT_MESSAGES)]
+    raw_size = sum(len(messages[i % len(messages)]) for i in range(count))
+    print(f'{count} json messages of {get_readable_size(len(messages[0]))}, window bits {window_bits}')
+    print(f'{"mode":>12} {"messages/s":>12} {"MB/s":>10} {"cpu time":>10} {"on the wire":>12} {"ratio":>8}')
+    for compression in (False, True):
+        settings = Settings(
+            compression=compression,
+            max_message_size=2 * max(len(message) for message in messages),
+            compression_client_max_window_bits=window_bits,
+            compression_server_max_window_bits=window_bits,
+            compression_client_no_context_takeover=no_context_takeover,
+            compression_server_no_context_takeover=no_context_takeover,
+        )
+        duration, cpu_time, compressed_size = await measure(settings, messages, count)
+        wire_size = raw_size if compressed_size is None else compressed_size
+        print(
+            f'{"deflate" if compression else "none":>12} {count / duration:>12.0f} '
+            f'{raw_size / duration / 1024**2:>10.2f} {cpu_time:>9.3f}s {get_readable_size(wire_size):>12} '
+            f'{raw_size / wire_size:>7.2f}x'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=2_000, help='number of messages echoed by the server')
+    parser.add_argument('--size', type=int, default=4_096, help='approximative size of each message in bytes')
+    parser.add_argument('--window-bits', type=int, default=15, choices=range(9, 16), help='deflate window bits')
+    parser.add_argument('--no-context-takeover', action='store_true', help='reset the compression context per message')
+    arguments = parser.parse_args()
+    trio.run(main, arguments.messages, arguments.size, arguments.window_bits, arguments.no_context_takeover)
@@ -0,0 +1,102 @@
+"""
+Compares the byte-at-a-time reverse reader previously used by "ws tail" with the block and mmap readers.
+
+Usage: python benchmarks/reverse_read_lines.py [--sizes 1M 10M 100M 1G 10G] [--line-length 1000] [--lines 10]
+"""
+import argparse
+import io
+import tempfile
+import time
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, List
+
+import trio
+
+from ws.utils.io import reverse_read_lines
+
+UNITS = {'K': 1024, 'M': 1024**2, 'G': 1024**3}
+
+
+async def byte_reverse_read_lines(file: str) -> AsyncIterator[bytes]:
+    """The implementation used before the block reader."""
+    async with await trio.open_file(file, 'rb') as f:
+        await f.seek(0, io.SEEK_END)
+        pointer = await f.tell()
+        buffer = bytearray()
+
+        while pointer >= 0:
+            await f.seek(pointer)
+            pointer -= 1
+            char = await f.read(1)
+            if char == b'\n':
+                yield buffer[::-1]
+                buffer.clear()
+            else:
+                buffer += char
+
+        if buffer:
+            yield buffer[::-1]
+
+
+def parse_size(value: str) -> int:
+    unit = value[-1].upper()
+    if unit in UNITS:
+        return int(float(value[:-1]) * UNITS[unit])
+    return int(value)
+
+
+def create_file(directory: Path, size: int, line_length: int) -> Path:
+    path = directory / f'file-{size}.log'
+    line = b'x' * (line_length - 1) + b'\n'
+    chunk = line * max(1, (1024 * 1024) // len(line))
+    with path.open('wb') as f:
+        written = 0
+        while written < size:
+            data = chunk[: size - written]
+            f.write(data)
+            written += len(data)
+    return path
+
+
+async def read_last_lines(reader: Callable[[str], AsyncIterator[bytes]], file: str, count: int) -> None:
+    lines = 0
+    async for _ in reader(file):
+        lines += 1
+        if lines == count:
+            break
+
+
+async def measure(function: Callable[[], Awaitable[None]]) -> float:
+    beginning = time.perf_counter()
+    await function()
+    return time.perf_counter() - beginning
+
+
+async def main(sizes: List[int], line_length: int, count: int) -> None:
+    readers = {
+        'byte': byte_reverse_read_lines,
+        'block': lambda file: reverse_read_lines(file, use_mmap=False),
+        'mmap': reverse_read_lines,
+    }
+    print(f'last {count} lines of {line_length} bytes')
+    print(f'{"file size":>12} ' + ' '.join(f'{name:>12}' for name in readers) + f' {"speedup":>10}')
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = create_file(Path(directory), size, line_length)
+            durations = {}
+            for name, reader in readers.items():
+                durations[name] = await measure(
+                    lambda reader=reader, path=path: read_last_lines(reader, str(path), count)
+                )
+            speedup = durations['byte'] / min(durations['block'], durations['mmap'])
+            print(f'{size:>12} ' + ' '.join(f'{durations[name]:>11.4f}s' for name in readers) + f' {speedup:>9.1f}x')
+            path.unlink()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['1M', '10M', '100M', '1G'], help='sizes of the files to read')
+    parser.add_argument('--line-length', type=int, default=1_000, help='length of each line in bytes')
+    parser.add_argument('--lines', type=int, default=10, help='number of lines to read from the end')
+    arguments = parser.parse_args()
+    trio.run(main, [parse_size(size) for size in arguments.sizes], arguments.line_length, arguments.lines)
@@ -56,7 +56,7 @@ async def test_should_print_error_message_when_reason_length_exceeds_123(capsys,
     assert 'Bye!' in output
 
 
-@pytest.mark.parametrize('input_data', ['1002', '1002 reason'])
+@pytest.mark.parametrize('input_data', ['', '1002', '1002 reason'])
 async def test_should_close_client_and_exit(capsys, nursery, mock_input, input_data):
     mock_input.send_text(f'close {input_data}\n')
     await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
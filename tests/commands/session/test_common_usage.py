@@ -1,10 +1,11 @@
 import platform
 
 import pytest
+import trio
 from trio_websocket import serve_websocket
 
 from tests.helpers import server_handler
-from ws.commands.session import main
+from ws.commands.session import get_prompt_session, main, prompt_user
 from ws.main import cli
 from ws.utils.command import Command
 
@@ -99,7 +100,15 @@ def test_should_check_trio_run_is_correctly_called_without_options(runner, mocke
     result = runner.invoke(cli, ['session', url])
 
     assert result.exit_code == 0
-    run_mock.assert_called_once_with(main, url, None)
+    run_mock.assert_called_once_with(main, url, None, False, None)
+
+
+def test_should_check_trio_run_is_correctly_called_with_timings_option(runner, mocker):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['session', ':1234', '--timings'])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', None, True, None)
 
 
 @pytest.mark.parametrize('filename_option', ['-f', '--file'])
@@ -109,4 +118,47 @@ def test_should_check_trio_run_is_correctly_called_with_options(tmp_path, runner
     result = runner.invoke(cli, ['session', ':1234', filename_option, f'{file_path}'])
 
     assert result.exit_code == 0
-    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', f'{file_path}')
+    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', f'{file_path}', False, None)
+
+
+async def test_should_print_messages_received_while_prompt_is_open(capsys, nursery, mock_input):
+    async def sending_handler(request) -> None:
+        ws = await request.accept()
+        await ws.send_message('hello from server')
+        await ws.send_message(b'bytes from server')
+        await trio.sleep_forever()
+
+    await nursery.start(serve_websocket, sending_handler, 'localhost', 1234, None)
+    async with trio.open_nursery() as session_nursery:
+        session_nursery.start_soon(main, 'ws://localhost:1234')
+        await trio.sleep(1)
+        # the user has not typed anything yet
+        output = capsys.readouterr().out
+        mock_input.send_text('quit\n')
+
+    assert 'TEXT message on' in output
+    assert 'hello from server\n' in output
+    assert 'BINARY message on' in output
+    assert "b'bytes from server'\n" in output
+    assert 'Bye! 👋\n' in capsys.readouterr().out
+
+
+async def test_should_end_session_when_endpoint_closes_the_connection(capsys, nursery, mock_input):
+    async def closing_handler(request) -> None:
+        ws = await request.accept()
+        await ws.aclose(1001, 'going away')
+
+    await nursery.start(serve_websocket, closing_handler, 'localhost', 1234, None)
+    with trio.fail_after(5):
+        await main('ws://localhost:1234')
+
+    assert 'Connection closed by the endpoint with code 1001 (GOING_AWAY), bye! 👋\n' in capsys.readouterr().out
+
+
+async def test_should_stop_prompt_when_it_is_cancelled(mock_input):
+    prompt_session = get_prompt_session()
+    with trio.move_on_after(0.5) as cancel_scope:
+        await prompt_user(prompt_session)
+
+    assert cancel_scope.cancelled_caught
+    assert not prompt_session.app.is_running
@@ -60,7 +60,7 @@ async def test_should_print_ping_help_and_exit(capsys, nursery, mock_input):
 
     assert 'The ping command sends a PING control frame with an optional' in output
     assert 'Example usage:' in output
-    assert 'A random 32 bytes of data will be sent to the server as ping' in output
+    assert 'A random 4 bytes of data will be sent to the server as ping' in output
     assert 'Sends a ping with the message "hello world"' in output
     assert output.count('> ping') == 2
     assert '> ping "hello world"' in output
@@ -30,7 +30,7 @@ async def test_should_print_timeout_message_and_exit_program(capsys, monkeypatch
     await main(url)
     output = capsys.readouterr().out
 
-    assert f'PING {url} with 32 bytes of data\n' in output
+    assert f'PING {url} with 4 bytes of data\n' in output
     assert 'Unable to receive pong before configured response timeout (0.0001s).\n' in output
     assert 'Bye!' in output
 
@@ -48,7 +48,7 @@ async def test_should_print_error_message_when_payload_length_exceeds_125(capsys
 
 
 @pytest.mark.parametrize(
-    ('input_data', 'length'), [('ping', 32), ('ping "hello world"', 11), ("ping 'hello world'", 11)]
+    ('input_data', 'length'), [('ping', 4), ('ping "hello world"', 11), ("ping 'hello world'", 11)]
 )
 async def test_should_print_success_message_when_pong_is_received(capsys, nursery, mock_input, input_data, length):
     url = 'ws://localhost:1234'
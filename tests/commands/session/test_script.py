@@ -0,0 +1,91 @@
+import pytest
+import trio
+from trio_websocket import ConnectionClosed, serve_websocket
+from wsproto.utilities import LocalProtocolError
+
+from tests.helpers import server_handler
+from ws.commands.session import main
+from ws.main import cli
+from ws.utils.script import parse_script
+
+
+def test_should_print_error_when_script_is_not_valid(tmp_path, runner):
+    script = tmp_path / 'commands.ws'
+    script.write_text('text hello\nfoo\n')
+    result = runner.invoke(cli, ['session', ':1234', '--script', f'{script}'])
+
+    assert result.exit_code == 2
+    assert 'line 2: unknown command foo' in result.output
+
+
+def test_should_check_trio_run_is_correctly_called_with_script_read_from_stdin(runner, mocker):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['session', ':1234', '-s', '-'], input='text hello\nping\n')
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', None, False, parse_script(['text hello', 'ping']))
+
+
+async def test_should_run_script_steps_in_order_and_print_their_durations(capsys, nursery):
+    received = []
+
+    async def recording_handler(request) -> None:
+        ws = await request.accept()
+        try:
+            while True:
+                message = await ws.get_message()
+                received.append(message)
+                await ws.send_message(message)
+        except ConnectionClosed:
+            pass
+
+    await nursery.start(serve_websocket, recording_handler, 'localhost', 1234, None)
+    steps = parse_script(['text first', 'ping', 'byte second', 'ping', 'pong', 'text third', 'close 1001 bye'])
+    with trio.fail_after(5):
+        await main('ws://localhost:1234', steps=steps)
+    output = capsys.readouterr().out
+
+    assert received == ['first', b'second', 'third']
+    assert 'Welcome' not in output
+    assert '--- script timings ---\n' in output
+    for line, description in [(1, 'text'), (2, 'ping'), (3, 'byte'), (4, 'ping'), (5, 'pong'), (6, 'text')]:
+        assert f'line {line} {description} ' in output
+    assert 'line 7 close 1001 = ' in output
+    assert 'total = ' in output
+    assert 'not run' not in output
+    assert all(step.duration is not None for step in steps)
+
+
+async def test_should_print_messages_received_during_script(capsys, nursery):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    # the pong is only received after the echo of the message sent before the ping
+    with trio.fail_after(5):
+        await main('ws://localhost:1234', steps=parse_script(['text hello', 'ping', 'close']))
+    output = capsys.readouterr().out
+
+    assert 'TEXT message on' in output
+    assert 'hello\n' in output
+
+
+async def test_should_exit_with_error_when_endpoint_closes_connection_during_script(capsys, nursery):
+    async def closing_handler(request) -> None:
+        ws = await request.accept()
+        await ws.aclose(1001, 'going away')
+
+    async def serve_closing_endpoint(task_status=trio.TASK_STATUS_IGNORED) -> None:
+        try:
+            await serve_websocket(closing_handler, 'localhost', 1234, None, task_status=task_status)
+        except LocalProtocolError:
+            # trio-websocket tries to answer the ping received after its close frame
+            pass
+
+    await nursery.start(serve_closing_endpoint)
+    steps = parse_script(['text hello', 'ping'])
+    with trio.fail_after(5), pytest.raises(SystemExit) as exc_info:
+        await main('ws://localhost:1234', steps=steps)
+    output = capsys.readouterr().out
+
+    assert exc_info.value.code == 1
+    assert output.count('Connection closed by the endpoint with code 1001 (GOING_AWAY), bye! 👋\n') == 1
+    assert '--- script timings ---\n' in output
+    assert 'line 2 ping 4.0 B = not run\n' in output
@@ -0,0 +1,146 @@
+import pytest
+import trio
+from trio_websocket import ConnectionClosed, WebSocketRequest, serve_websocket
+
+from tests.helpers import server_handler
+from ws.commands.bench import BenchStatistics, get_payload, main, print_bench_summary
+from ws.main import cli
+
+
+@pytest.mark.parametrize(('is_bytes', 'expected'), [(True, b'xxxx'), (False, 'xxxx')])
+def test_should_return_payload_of_the_given_size(is_bytes, expected):
+    assert get_payload(4, is_bytes) == expected
+
+
+def test_should_print_summary_without_latencies_when_nothing_was_sent(test_console):
+    print_bench_summary(test_console, BenchStatistics())
+    output = test_console.file.getvalue()
+
+    assert 'connections=0, messages=0, errors=0, timeouts=0, duration=0.000s' in output
+    assert 'round trip' not in output
+
+
+def test_should_print_error_when_url_argument_is_not_given(runner):
+    result = runner.invoke(cli, ['bench'])
+
+    assert result.exit_code == 2
+    assert "Missing argument 'URL'" in result.output
+
+
+@pytest.mark.parametrize('option', ['-c', '-n'])
+def test_should_print_error_when_count_options_are_not_strictly_positive(runner, option):
+    result = runner.invoke(cli, ['bench', 'ws://localhost:1234', option, '0'])
+
+    assert result.exit_code == 2
+    assert '0 is not in the range x>=1' in result.output
+
+
+def test_should_print_error_when_size_is_negative(runner):
+    result = runner.invoke(cli, ['bench', 'ws://localhost:1234', '-s', '-1'])
+
+    assert result.exit_code == 2
+    assert '-1 is not in the range x>=0' in result.output
+
+
+@pytest.mark.parametrize('is_bytes', [True, False])
+async def test_should_send_messages_on_all_connections_and_print_summary(capsys, nursery, is_bytes):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    await main('ws://localhost:1234', 3, 4, 16, is_bytes)
+    output = capsys.readouterr().out
+
+    assert 'BENCH ws://localhost:1234 with 3 connection(s) sending 4' in output
+    assert 'connections=3, messages=12, errors=0, timeouts=0' in output
+    assert 'throughput=' in output
+    assert 'connect min/avg/max' in output
+    assert 'round trip min/avg/max' in output
+    assert 'tls handshakes' not in output
+
+
+async def test_should_print_tls_handshakes_when_server_uses_tls(
+    capsys, monkeypatch, tmp_path, nursery, ca, server_context
+):
+    ca_file = tmp_path / 'ca.pem'
+    ca.cert_pem.write_to_path(f'{ca_file}')
+    monkeypatch.setenv('WS_TLS_CA_FILE', f'{ca_file}')
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, server_context)
+    # the first connection creates the TLS session, the next ones resume it
+    await main('wss://localhost:1234', 1, 1, 16, False)
+    await main('wss://localhost:1234', 2, 1, 16, False)
+    output = capsys.readouterr().out
+
+    assert 'tls handshakes: 1 full, 0 resumed (0.0% resumption rate)' in output
+    assert 'tls handshakes: 0 full, 2 resumed (100.0% resumption rate)' in output
+    assert 'resumed handshake min/avg/max' in output
+
+
+async def test_should_print_summary_when_duration_expires(capsys, nursery):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    await main('ws://localhost:1234', 1, 10**9, 16, False, duration=0.5)
+    output = capsys.readouterr().out
+
+    assert 'connections=1, messages=' in output
+    assert 'round trip min/avg/max' in output
+
+
+async def test_should_count_connections_which_cannot_be_opened_as_errors(capsys):
+    await main('ws://localhost:1234', 2, 1, 16, False)
+    output = capsys.readouterr().out
+
+    assert 'connections=0, messages=0, errors=2, timeouts=0' in output
+    assert 'round trip min/avg/max' not in output
+
+
+async def test_should_count_connections_without_echo_on_time_as_timeouts(capsys, monkeypatch, nursery):
+    async def mute_handler(request: WebSocketRequest) -> None:
+        ws = await request.accept()
+        try:
+            while True:
+                await ws.get_message()
+        except ConnectionClosed:
+            pass
+
+    monkeypatch.setenv('WS_RESPONSE_TIMEOUT', '0.1')
+    await nursery.start(serve_websocket, mute_handler, 'localhost', 1234, None)
+    with trio.fail_after(2):
+        await main('ws://localhost:1234', 2, 3, 16, False)
+    output = capsys.readouterr().out
+
+    assert 'connections=2, messages=0, errors=0, timeouts=2' in output
+    assert 'Unable to get response on time' not in output
+
+
+def test_should_check_trio_run_is_correctly_called_without_options(runner, mocker):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['bench', ':1234'])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', 10, 100, 32, False, None)
+
+
+@pytest.mark.parametrize(
+    ('connections_option', 'number_option', 'size_option', 'binary_option', 'duration_option'),
+    [('-c', '-n', '-s', '-b', '-d'), ('--connections', '--number', '--size', '--binary', '--duration')],
+)
+def test_should_check_trio_run_is_correctly_called_with_options(
+    runner, mocker, connections_option, number_option, size_option, binary_option, duration_option
+):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(
+        cli,
+        [
+            'bench',
+            ':1234',
+            connections_option,
+            '50',
+            number_option,
+            '1000',
+            size_option,
+            '512',
+            binary_option,
+            duration_option,
+            '10',
+        ],
+    )
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', 50, 1000, 512, True, 10.0)
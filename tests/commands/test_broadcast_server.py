@@ -0,0 +1,160 @@
+import pytest
+import trio
+from trio_websocket import open_websocket_url
+
+from ws.commands.broadcast_server import Broker, FrameQueue, Subscriber, encode_frame, main
+from ws.main import cli
+
+
+def test_should_print_error_when_slow_consumer_policy_is_unknown(runner):
+    result = runner.invoke(cli, ['broadcast-server', '-s', 'foo'])
+
+    assert result.exit_code == 2
+    assert "'foo' is not one of 'drop-oldest', 'disconnect', 'block'" in result.output
+
+
+def test_should_print_error_when_queue_size_is_not_positive(runner):
+    result = runner.invoke(cli, ['broadcast-server', '-q', '0'])
+
+    assert result.exit_code == 2
+    assert "Invalid value for '-q' / '--queue-size'" in result.output
+
+
+def test_should_check_trio_run_is_correctly_called_without_arguments(runner, mocker):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['broadcast-server'])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, 'localhost', 80, None, None, 100, 'drop-oldest')
+
+
+@pytest.mark.parametrize(
+    ('host_option', 'port_option', 'queue_option', 'policy_option'),
+    [('-H', '-p', '-q', '-s'), ('--host', '--port', '--queue-size', '--slow-consumer')],
+)
+def test_should_check_trio_run_is_correctly_called_with_arguments(
+    runner, mocker, host_option, port_option, queue_option, policy_option
+):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(
+        cli, ['broadcast-server', host_option, '::1', port_option, '1234', queue_option, '5', policy_option, 'block']
+    )
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, '::1', 1234, None, None, 5, 'block')
+
+
+@pytest.mark.parametrize(('message', 'frame'), [('hello', b'\x81\x05hello'), (b'hello', b'\x82\x05hello')])
+def test_should_encode_message_in_unmasked_frame(message, frame):
+    assert encode_frame(message) == frame
+
+
+class TestFrameQueue:
+    """Tests class FrameQueue"""
+
+    async def test_should_drop_oldest_frame_when_queue_is_full_with_drop_oldest_policy(self):
+        queue = FrameQueue(2, 'drop-oldest')
+        for frame in [b'1', b'2', b'3']:
+            assert await queue.put(frame) is True
+
+        assert queue.dropped == 1
+        assert [await queue.get(), await queue.get()] == [b'2', b'3']
+
+    async def test_should_refuse_frame_when_queue_is_full_with_disconnect_policy(self):
+        queue = FrameQueue(1, 'disconnect')
+
+        assert await queue.put(b'1') is True
+        assert await queue.put(b'2') is False
+        assert len(queue) == 1
+
+    async def test_should_wait_for_room_when_queue_is_full_with_block_policy(self, nursery):
+        queue = FrameQueue(1, 'block')
+        await queue.put(b'1')
+        put_done = trio.Event()
+
+        async def put_frame():
+            await queue.put(b'2')
+            put_done.set()
+
+        nursery.start_soon(put_frame)
+        await trio.sleep(0.1)
+        assert not put_done.is_set()
+
+        assert await queue.get() == b'1'
+        await put_done.wait()
+        assert await queue.get() == b'2'
+
+    async def test_should_release_blocked_publisher_when_queue_is_closed(self, nursery):
+        queue = FrameQueue(1, 'block')
+        await queue.put(b'1')
+        put_done = trio.Event()
+
+        async def put_frame():
+            await queue.put(b'2')
+            put_done.set()
+
+        nursery.start_soon(put_frame)
+        await trio.sleep(0.1)
+        queue.close()
+        await put_done.wait()
+
+        assert len(queue) == 1
+
+
+class TestBroker:
+    """Tests class Broker"""
+
+    async def test_should_share_frame_between_subscribers_of_topic_except_publisher(self):
+        broker = Broker()
+        publisher, first, second, other = [Subscriber(None, FrameQueue(10, 'drop-oldest')) for _ in range(4)]
+        for subscriber in [publisher, first, second]:
+            broker.subscribe('/news', subscriber)
+        broker.subscribe('/other', other)
+        await broker.publish('/news', 'hello', publisher)
+
+        assert len(publisher.queue) == 0
+        assert len(other.queue) == 0
+        first_frame = await first.queue.get()
+        assert first_frame == b'\x81\x05hello'
+        assert await second.queue.get() is first_frame
+
+    async def test_should_disconnect_subscriber_whose_queue_is_full_with_disconnect_policy(self):
+        broker = Broker()
+        slow, fast = Subscriber(None, FrameQueue(1, 'disconnect')), Subscriber(None, FrameQueue(10, 'disconnect'))
+        broker.subscribe('/news', slow)
+        broker.subscribe('/news', fast)
+        for message in ['1', '2', '3']:
+            await broker.publish('/news', message)
+
+        assert slow.is_too_slow is True
+        assert slow.cancel_scope.cancel_called is True
+        assert len(slow.queue) == 1
+        assert fast.is_too_slow is False
+        assert len(fast.queue) == 3
+
+    def test_should_forget_topic_when_its_last_subscriber_leaves(self):
+        broker = Broker()
+        subscriber = Subscriber(None, FrameQueue(1, 'block'))
+        broker.subscribe('/news', subscriber)
+
+        assert broker.count_subscribers('/news') == 1
+        broker.unsubscribe('/news', subscriber)
+        assert broker.count_subscribers('/news') == 0
+
+
+async def test_should_send_message_to_other_connections_on_the_same_path(capsys, nursery):
+    nursery.start_soon(main, 'localhost', 1234)
+    await trio.sleep(1)
+    async with open_websocket_url('ws://localhost:1234/news') as first:
+        async with open_websocket_url('ws://localhost:1234/news') as second:
+            async with open_websocket_url('ws://localhost:1234/other') as other:
+                await first.send_message('hello')
+                assert await second.get_message() == 'hello'
+                await second.send_message(b'world')
+                assert await first.get_message() == b'world'
+
+                with trio.move_on_after(0.2) as cancel_scope:
+                    await other.get_message()
+                assert cancel_scope.cancelled_caught
+
+    assert capsys.readouterr().out == 'Running broadcast server on localhost:1234 💫\n'
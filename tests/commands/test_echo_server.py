@@ -1,9 +1,26 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
 import pytest
 import trio
 from trio_websocket import open_websocket_url
 
-from ws.commands.echo_server import main
+from ws.client import open_websocket_client
+from ws.commands.echo_server import (
+    ServerStatistics,
+    format_server_metrics,
+    get_message_size,
+    main,
+    open_reuse_port_listeners,
+    print_server_summary,
+)
+from ws.console import console
 from ws.main import cli
+from ws.settings import Settings
 
 
 def test_should_print_error_when_host_is_not_correct(runner):
@@ -97,7 +114,7 @@ def test_should_check_trio_run_is_correctly_called_without_arguments(runner, moc
     result = runner.invoke(cli, ['echo-server'])
 
     assert result.exit_code == 0
-    run_mock.assert_called_once_with(main, 'localhost', 80, None, None)
+    run_mock.assert_called_once_with(main, 'localhost', 80, None, None, None)
 
 
 @pytest.mark.parametrize(
@@ -124,4 +141,227 @@ def test_should_check_trio_run_is_correctly_called_with_arguments(
     )
 
     assert result.exit_code == 0
-    run_mock.assert_called_once_with(main, '::1', 1234, f'{certificate}', f'{private_key}')
+    run_mock.assert_called_once_with(main, '::1', 1234, f'{certificate}', f'{private_key}', None)
+
+
+async def test_should_print_compression_summary_of_each_connection_when_compression_is_enabled(
+    capsys, monkeypatch, nursery
+):
+    monkeypatch.setenv('WS_COMPRESSION', '1')
+    nursery.start_soon(main, 'localhost', 1234)
+    await trio.sleep(1)
+    async with open_websocket_client('ws://localhost:1234/foo', Settings(compression=True)) as ws:
+        await ws.send_message('hello world')
+        assert 'hello world' == await ws.get_message()
+    await trio.sleep(0.1)
+
+    # rich wraps long lines at the width of the terminal
+    output = ' '.join(capsys.readouterr().out.split())
+    assert 'permessage-deflate: client_max_window_bits=15; server_max_window_bits=15' in output
+    assert 'closed, compression: sent 11.0 B as' in output
+
+
+async def test_should_not_compress_messages_when_client_does_not_offer_compression(capsys, monkeypatch, nursery):
+    monkeypatch.setenv('WS_COMPRESSION', '1')
+    nursery.start_soon(main, 'localhost', 1234)
+    await trio.sleep(1)
+    async with open_websocket_url('ws://localhost:1234/foo') as ws:
+        await ws.send_message('hello world')
+        assert 'hello world' == await ws.get_message()
+    await trio.sleep(0.1)
+
+    assert capsys.readouterr().out == 'Running server on localhost:1234 💫\n'
+
+
+def test_should_call_run_workers_when_several_workers_are_requested(runner, mocker):
+    run_mock = mocker.patch('trio.run')
+    workers_mock = mocker.patch('ws.commands.echo_server.run_workers')
+    result = runner.invoke(cli, ['echo-server', '-p', '1234', '-w', '3'])
+
+    assert result.exit_code == 0
+    workers_mock.assert_called_once_with('localhost', 1234, None, None, 3, None)
+    run_mock.assert_not_called()
+
+
+@pytest.mark.parametrize('workers', ['0', 'foo'])
+def test_should_print_error_when_workers_is_not_a_positive_number(runner, workers):
+    result = runner.invoke(cli, ['echo-server', '-w', workers])
+
+    assert result.exit_code == 2
+    assert "Invalid value for '-w' / '--workers'" in result.output
+
+
+def test_should_print_error_when_workers_share_a_port_chosen_by_the_system(runner):
+    result = runner.invoke(cli, ['echo-server', '-p', '0', '-w', '2'])
+
+    assert result.exit_code == 2
+    assert 'Workers cannot share a port chosen by the system, please give a port.' in result.output
+
+
+def test_should_print_error_when_platform_does_not_support_reuse_port(runner, monkeypatch):
+    monkeypatch.delattr('socket.SO_REUSEPORT', raising=False)
+    result = runner.invoke(cli, ['echo-server', '-p', '1234', '-w', '2'])
+
+    assert result.exit_code == 2
+    assert 'Several workers need the SO_REUSEPORT socket option' in result.output
+
+
+def test_should_print_statistics_of_each_worker_and_their_total(capsys):
+    results = [
+        (2, 102, ServerStatistics(connections=1, messages=3, size=30)),
+        (1, 101, ServerStatistics(connections=2, messages=4, size=2048)),
+    ]
+    print_server_summary(console, results)
+
+    assert capsys.readouterr().out == (
+        '--- echo-server statistics ---\n'
+        'worker 1 (pid 101): 2 connections, 4 messages, 2.0 KB\n'
+        'worker 2 (pid 102): 1 connections, 3 messages, 30.0 B\n'
+        'total: 3 connections, 7 messages, 2.0 KB\n'
+    )
+
+
+@pytest.mark.skipif(not hasattr(socket, 'SO_REUSEPORT'), reason='SO_REUSEPORT is not supported on this platform')
+async def test_should_let_several_listeners_share_the_same_port():
+    first_listeners = await open_reuse_port_listeners('127.0.0.1', 1234)
+    second_listeners = await open_reuse_port_listeners('127.0.0.1', 1234)
+    try:
+        assert first_listeners[0].socket.getsockname() == second_listeners[0].socket.getsockname()
+    finally:
+        for listener in [*first_listeners, *second_listeners]:
+            await listener.aclose()
+
+
+async def echo_messages(count: int) -> None:
+    for _ in range(count):
+        async with open_websocket_url('ws://localhost:1234/foo') as ws:
+            await ws.send_message('hello')
+            assert 'hello' == await ws.get_message()
+
+
+@pytest.mark.skipif(not hasattr(socket, 'SO_REUSEPORT'), reason='SO_REUSEPORT is not supported on this platform')
+def test_should_serve_connections_with_several_workers_and_print_their_statistics():
+    process = subprocess.Popen(
+        [sys.executable, '-c', 'from ws.main import cli; cli()', 'echo-server', '-p', '1234', '-w', '2'],
+        stdout=subprocess.PIPE,
+        text=True,
+        env={**os.environ, 'COLUMNS': '200'},
+    )
+    try:
+        time.sleep(2)
+        trio.run(echo_messages, 4)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        output, _ = process.communicate(timeout=10)
+
+    assert process.returncode == 0
+    lines = output.splitlines()
+    assert lines[0] == 'Running server on localhost:1234 with 2 workers 💫'
+    assert lines[1] == 'Program was interrupted by SIGTERM, good bye! 👋'
+    assert lines[2] == '--- echo-server statistics ---'
+    assert lines[3].startswith('worker 1 (pid ')
+    assert lines[4].startswith('worker 2 (pid ')
+    assert lines[5] == 'total: 4 connections, 4 messages, 20.0 B'
+
+
+def test_should_check_trio_run_is_correctly_called_with_metrics_port(runner, mocker):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['echo-server', '-p', '1234', '--metrics-port', '9464'])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, 'localhost', 1234, None, None, 9464)
+
+
+@pytest.mark.parametrize(
+    ('arguments', 'error'),
+    [
+        (['-p', '9464', '--metrics-port', '9464'], 'The metrics port must be different from the port of the server.'),
+        (['-p', '9465', '-w', '2', '--metrics-port', '9464'], 'The metrics port must be different from the port'),
+        (['-p', '1234', '-w', '3', '--metrics-port', '65534'], 'The metrics ports of the 3 workers go beyond 65535.'),
+    ],
+)
+def test_should_print_error_when_metrics_port_is_not_usable(runner, arguments, error):
+    result = runner.invoke(cli, ['echo-server', *arguments])
+
+    assert result.exit_code == 2
+    assert error in result.output
+
+
+@pytest.mark.parametrize(('message', 'size'), [(b'h\xc3\xa9', 3), ('hello', 5), ('h\u00e9', 3), ('', 0)])
+def test_should_return_size_of_message_in_bytes(message, size):
+    assert get_message_size(message) == size
+
+
+def test_should_format_server_statistics_in_prometheus_text_format():
+    statistics = ServerStatistics(
+        connections=3, active_connections=1, received_messages=2, received_size=300, messages=2, size=300, timeouts=1
+    )
+    statistics.message_sizes.observe(100)
+    statistics.message_sizes.observe(200)
+    statistics.latencies.observe(0.002)
+    lines = format_server_metrics(statistics).splitlines()
+
+    assert '# TYPE ws_echo_server_active_connections gauge' in lines
+    assert 'ws_echo_server_active_connections 1' in lines
+    assert '# TYPE ws_echo_server_connections_total counter' in lines
+    assert 'ws_echo_server_connections_total 3' in lines
+    assert 'ws_echo_server_received_messages_total 2' in lines
+    assert 'ws_echo_server_received_bytes_total 300' in lines
+    assert 'ws_echo_server_sent_messages_total 2' in lines
+    assert 'ws_echo_server_sent_bytes_total 300' in lines
+    assert 'ws_echo_server_timeouts_total 1' in lines
+    assert 'ws_echo_server_message_size_bytes_bucket{le="64"} 0' in lines
+    assert 'ws_echo_server_message_size_bytes_bucket{le="256"} 2' in lines
+    assert 'ws_echo_server_message_size_bytes_count 2' in lines
+    assert 'ws_echo_server_handler_latency_seconds_bucket{le="0.001"} 0' in lines
+    assert 'ws_echo_server_handler_latency_seconds_bucket{le="0.0025"} 1' in lines
+    assert 'ws_echo_server_handler_latency_seconds_count 1' in lines
+
+
+async def scrape_metrics(port: int) -> str:
+    stream = await trio.open_tcp_stream('localhost', port)
+    async with stream:
+        await stream.send_all(b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        data = b''
+        while True:
+            chunk = await stream.receive_some()
+            if not chunk:
+                break
+            data += chunk
+    return data.decode()
+
+
+async def test_should_serve_server_metrics_when_metrics_port_is_given(capsys, nursery):
+    nursery.start_soon(main, 'localhost', 1234, None, None, 9464)
+    await trio.sleep(1)
+    async with open_websocket_url('ws://localhost:1234/foo') as ws:
+        await ws.send_message('hello')
+        assert 'hello' == await ws.get_message()
+        await ws.send_message(b'world!')
+        assert b'world!' == await ws.get_message()
+        response = await scrape_metrics(9464)
+
+    assert response.startswith('HTTP/1.1 200 OK\r\n')
+    lines = response.splitlines()
+    assert 'ws_echo_server_active_connections 1' in lines
+    assert 'ws_echo_server_connections_total 1' in lines
+    assert 'ws_echo_server_received_messages_total 2' in lines
+    assert 'ws_echo_server_received_bytes_total 11' in lines
+    assert 'ws_echo_server_sent_messages_total 2' in lines
+    assert 'ws_echo_server_sent_bytes_total 11' in lines
+    assert 'ws_echo_server_handler_latency_seconds_count 2' in lines
+    assert capsys.readouterr().out == (
+        'Serving metrics on http://localhost:9464/metrics\nRunning server on localhost:1234 💫\n'
+    )
+
+
+async def test_should_count_connections_closed_by_the_server_after_a_timeout(monkeypatch, nursery):
+    monkeypatch.setenv('WS_RESPONSE_TIMEOUT', '0.1')
+    nursery.start_soon(main, 'localhost', 1234, None, None, 9464)
+    await trio.sleep(1)
+    async with open_websocket_url('ws://localhost:1234/foo'):
+        await trio.sleep(0.3)
+    lines = (await scrape_metrics(9464)).splitlines()
+
+    assert 'ws_echo_server_timeouts_total 1' in lines
+    assert 'ws_echo_server_active_connections 0' in lines
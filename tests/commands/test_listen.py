@@ -1,11 +1,30 @@
+import base64
+import io
 import json
+import signal
+
+from datetime import datetime
 
 import pytest
 import trio
 from freezegun import freeze_time
 from trio_websocket import ConnectionClosed, WebSocketRequest, serve_websocket
 
-from ws.commands.listen import main, print_json, print_message, trace_rule
+from tests.helpers import killer
+
+from ws.commands.listen import (
+    BUFFER_SIZE,
+    BatchWriter,
+    MessageRenderer,
+    format_ndjson_message,
+    SourceCounter,
+    format_raw_message,
+    main,
+    print_json,
+    print_message,
+    print_source_summary,
+    trace_rule,
+)
 from ws.main import cli
 
 
@@ -19,6 +38,16 @@ class TestTraceRule:
 
         assert f'─ {message_type} message on 2022-04-14 20:10:00 ─' in test_console.file.getvalue()
 
+    def test_should_print_rule_with_given_date(self, test_console):
+        trace_rule(test_console, False, datetime(2023, 1, 2, 3, 4, 5))
+
+        assert '─ TEXT message on 2023-01-02 03:04:05 ─' in test_console.file.getvalue()
+
+    def test_should_print_rule_with_source(self, test_console):
+        trace_rule(test_console, True, datetime(2023, 1, 2, 3, 4, 5), 'ws://localhost:1234/')
+
+        assert '─ BINARY message from ws://localhost:1234/ on 2023-01-02 03:04:05 ─' in test_console.file.getvalue()
+
 
 class TestPrintMessage:
     """Tests function print_message."""
@@ -50,6 +79,165 @@ class TestPrintJson:
         assert expected == test_console.file.getvalue()
 
 
+class TestMessageRenderer:
+    """Tests class MessageRenderer."""
+
+    def test_should_render_buffered_messages_in_reception_order(self, test_console):
+        renderer = MessageRenderer(test_console, is_json=False)
+        renderer.add('hello')
+        renderer.add(b'world')
+        assert test_console.file.getvalue() == ''
+
+        renderer.render()
+        output = test_console.file.getvalue()
+        assert output.index('TEXT message on') < output.index('hello') < output.index('BINARY message on')
+        assert output.endswith("b'world'\n")
+        assert 'elided' not in output
+
+    def test_should_render_source_of_messages(self, test_console):
+        test_console.width = 120
+        renderer = MessageRenderer(test_console, is_json=False)
+        renderer.add('hello', 'ws://foo/')
+        renderer.add('world', 'ws://bar/')
+        renderer.render()
+
+        output = test_console.file.getvalue()
+        assert output.index('TEXT message from ws://foo/ on') < output.index('TEXT message from ws://bar/ on')
+
+    def test_should_render_json_messages(self, test_console):
+        renderer = MessageRenderer(test_console, is_json=True)
+        renderer.add('{"hello": "world"}')
+        renderer.render()
+
+        assert test_console.file.getvalue().endswith('{\n  "hello": "world"\n}\n')
+
+    def test_should_drop_oldest_messages_when_buffer_is_full(self, test_console):
+        renderer = MessageRenderer(test_console, is_json=False, buffer_size=2)
+        for i in range(5):
+            renderer.add(f'message {i}')
+        renderer.render()
+
+        output = test_console.file.getvalue()
+        assert output.startswith('3 messages elided\n')
+        assert 'message 2' not in output
+        assert output.count('TEXT message on') == 2
+        assert output.index('message 3') < output.index('message 4')
+
+    def test_should_render_at_most_buffer_size_messages_at_once(self, test_console):
+        renderer = MessageRenderer(test_console, is_json=False)
+        for i in range(BUFFER_SIZE + 5):
+            renderer.add(f'message {i}')
+        renderer.render()
+
+        output = test_console.file.getvalue()
+        assert output.startswith('5 messages elided\n')
+        assert output.count('TEXT message on') == BUFFER_SIZE
+
+    def test_should_not_render_anything_twice(self, test_console):
+        renderer = MessageRenderer(test_console, is_json=False, buffer_size=1)
+        renderer.add('foo')
+        renderer.add('bar')
+        renderer.render()
+        renderer.render()
+
+        output = test_console.file.getvalue()
+        assert output.count('1 messages elided') == 1
+        assert output.count('bar') == 1
+
+    async def test_should_render_messages_periodically(self, test_console, autojump_clock):
+        renderer = MessageRenderer(test_console, is_json=False)
+        with trio.move_on_after(0.15):
+            renderer.add('foo')
+            await renderer.run(10)
+
+        assert 'foo' in test_console.file.getvalue()
+
+
+class TestFormatRawMessage:
+    """Tests function format_raw_message."""
+
+    def test_should_format_text_message_on_one_line(self):
+        assert format_raw_message('hello\nwor\\ld\r', 12.5) == b'12.500000 TEXT hello\\nwor\\\\ld\\r\n'
+
+    def test_should_format_binary_message_in_hexadecimal(self):
+        assert format_raw_message(b'\x00hi', 12.5) == b'12.500000 BINARY 006869\n'
+
+    def test_should_add_source_after_timestamp(self):
+        assert format_raw_message('hi', 12.5, 'ws://foo/') == b'12.500000 ws://foo/ TEXT hi\n'
+
+
+class TestFormatNdjsonMessage:
+    """Tests function format_ndjson_message."""
+
+    def test_should_format_text_message_as_json_object(self):
+        line = format_ndjson_message('héllo\n', 12.5)
+
+        assert line.endswith(b'\n')
+        assert line.count(b'\n') == 1
+        assert json.loads(line) == {'timestamp': 12.5, 'type': 'text', 'data': 'héllo\n'}
+
+    def test_should_format_binary_message_in_base64(self):
+        line = format_ndjson_message(b'\x81hello', 12.5)
+
+        data = json.loads(line)
+        assert data['type'] == 'binary'
+        assert base64.b64decode(data['data']) == b'\x81hello'
+
+    def test_should_add_source_when_it_is_given(self):
+        line = format_ndjson_message('hello', 12.5, 'ws://foo/')
+
+        assert json.loads(line) == {'timestamp': 12.5, 'source': 'ws://foo/', 'type': 'text', 'data': 'hello'}
+
+
+class TestSourceCounter:
+    """Tests class SourceCounter and function print_source_summary."""
+
+    def test_should_count_messages_and_their_size(self):
+        counter = SourceCounter()
+        counter.record('hello')
+        counter.record(b'\x00\x01')
+
+        assert counter.messages == 2
+        assert counter.size == 7
+
+    def test_should_print_counters_of_each_source(self, test_console):
+        print_source_summary(test_console, {'ws://foo/': SourceCounter(3, 2048), 'ws://bar/': SourceCounter()})
+
+        assert test_console.file.getvalue() == (
+            '--- listen statistics ---\nws://foo/: 3 messages, 2.0 KB\nws://bar/: 0 messages, 0.0 B\n'
+        )
+
+    def test_should_print_errors_of_a_source(self, test_console):
+        print_source_summary(test_console, {'ws://foo/': SourceCounter(3, 2048, 1)})
+
+        assert test_console.file.getvalue() == '--- listen statistics ---\nws://foo/: 3 messages, 2.0 KB, 1 error\n'
+
+
+class TestBatchWriter:
+    """Tests class BatchWriter."""
+
+    def test_should_keep_data_until_flush_size_is_reached(self):
+        file = io.BytesIO()
+        writer = BatchWriter(file, flush_size=6)
+
+        writer.write(b'foo')
+        assert file.getvalue() == b''
+        assert writer.size == 3
+
+        writer.write(b'bar')
+        assert file.getvalue() == b'foobar'
+        assert writer.size == 0
+
+    def test_should_write_pending_data_on_flush(self):
+        file = io.BytesIO()
+        writer = BatchWriter(file)
+        writer.write(b'foo')
+        writer.flush()
+        writer.flush()
+
+        assert file.getvalue() == b'foo'
+
+
 # command tests
 
 
@@ -96,7 +284,7 @@ def test_should_print_error_when_filename_is_not_a_file(tmp_path, runner):
 async def test_should_read_incoming_messages_with_json_flag(nursery, capsys):
     await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
     with trio.move_on_after(1):
-        await main('ws://localhost:1234', True)
+        await main(['ws://localhost:1234'], True)
 
     # Depending on the OS where the tests are run, the numbers varies a lot, what I used here is based on the
     # results I have in GitHub actions
@@ -109,7 +297,7 @@ async def test_should_read_incoming_messages_with_json_flag(nursery, capsys):
 async def test_should_read_incoming_messages_without_json_flag(nursery, capsys):
     await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
     with trio.move_on_after(1):
-        await main('ws://localhost:1234', False)
+        await main(['ws://localhost:1234'], False)
 
     output = capsys.readouterr().out
     interval = tuple(range(5, 11))
@@ -122,7 +310,7 @@ async def test_should_read_incoming_messages_without_json_flag(nursery, capsys):
 
 async def test_should_read_messages_for_a_given_amount_of_time(nursery, capsys):
     await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
-    await main('ws://localhost:1234', False, duration=0.5)
+    await main(['ws://localhost:1234'], False, duration=0.5)
 
     output = capsys.readouterr().out
     interval = tuple(range(2, 6))
@@ -140,7 +328,7 @@ async def test_should_read_messages_and_save_them_in_a_file(tmp_path, nursery, c
     message_interval = tuple(range(2, 6))
     hello_world_interval = tuple(range(2, 11))
     await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
-    await main('ws://localhost:1234', False, duration=0.5, filename=f'{file_path}')
+    await main(['ws://localhost:1234'], False, duration=0.5, filename=f'{file_path}')
 
     terminal_output = capsys.readouterr().out
     assert terminal_output.count('─ TEXT message on') in message_interval
@@ -157,12 +345,47 @@ async def test_should_read_messages_and_save_them_in_a_file(tmp_path, nursery, c
     assert file_output.count('world') in hello_world_interval
 
 
+async def test_should_write_raw_messages_on_stdout(nursery, capsys):
+    await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
+    await main(['ws://localhost:1234'], False, duration=0.5, output_format='raw')
+
+    lines = capsys.readouterr().out.splitlines()
+    interval = tuple(range(4, 12))
+    assert len(lines) in interval
+    assert all(' TEXT {"hello": "world"}' in line or ' BINARY 7b2268656c6c6f' in line for line in lines)
+    assert '─' not in ''.join(lines)
+
+
+async def test_should_write_interruption_message_on_stderr_in_raw_format(nursery, capsys, signal_message):
+    await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
+    nursery.start_soon(killer, 0.5)
+    with trio.fail_after(2):
+        await main(['ws://localhost:1234'], False, output_format='raw')
+
+    output = capsys.readouterr()
+    assert all(' TEXT ' in line or ' BINARY ' in line for line in output.out.splitlines())
+    assert 'Program was interrupted' not in output.out
+    assert output.err == signal_message(signal.SIGINT)
+
+
+async def test_should_write_ndjson_messages_in_file(tmp_path, nursery, capsys):
+    file_path = tmp_path / 'messages.ndjson'
+    await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
+    await main(['ws://localhost:1234'], False, duration=0.5, filename=f'{file_path}', output_format='ndjson')
+
+    assert capsys.readouterr().out == ''
+    messages = [json.loads(line) for line in file_path.read_text().splitlines()]
+    assert len(messages) in tuple(range(4, 12))
+    assert {message['type'] for message in messages} == {'text', 'binary'}
+    assert messages[0]['data'] == '{"hello": "world"}'
+
+
 def test_should_check_trio_run_is_correctly_called_without_options(runner, mocker):
     run_mock = mocker.patch('trio.run')
     result = runner.invoke(cli, ['listen', 'ws://localhost:1234'])
 
     assert result.exit_code == 0
-    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', False, None, None)
+    run_mock.assert_called_once_with(main, ['ws://localhost:1234/'], False, None, None, 'pretty', None, False)
 
 
 @pytest.mark.parametrize(
@@ -177,4 +400,145 @@ def test_should_check_trio_run_is_correctly_called_with_options(
     )
 
     assert result.exit_code == 0
-    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', True, 2.0, 'record.txt')
+    run_mock.assert_called_once_with(main, ['ws://localhost:1234/'], True, 2.0, 'record.txt', 'pretty', None, False)
+
+
+@pytest.mark.parametrize('output_format', ['raw', 'ndjson'])
+def test_should_check_trio_run_is_correctly_called_with_format_option(runner, mocker, output_format):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['listen', 'ws://localhost:1234', '--format', output_format])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, ['ws://localhost:1234/'], False, None, None, output_format, None, False)
+
+
+def test_should_print_error_when_format_is_unknown(runner):
+    result = runner.invoke(cli, ['listen', 'ws://localhost:1234', '--format', 'foo'])
+
+    assert result.exit_code == 2
+    assert "'foo' is not one of 'pretty', 'raw', 'ndjson'" in result.output
+
+
+@pytest.mark.parametrize('reconnect_option', ['-r', '--reconnect'])
+def test_should_check_trio_run_is_correctly_called_with_reconnect_options(runner, mocker, reconnect_option):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['listen', 'ws://localhost:1234', reconnect_option])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, ['ws://localhost:1234/'], False, None, None, 'pretty', 10, False)
+
+    run_mock.reset_mock()
+    result = runner.invoke(cli, ['listen', 'ws://localhost:1234', reconnect_option, '--max-attempts', '3'])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, ['ws://localhost:1234/'], False, None, None, 'pretty', 3, False)
+
+
+def test_should_check_trio_run_is_correctly_called_with_timings_option(runner, mocker):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['listen', 'ws://localhost:1234', '--timings'])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, ['ws://localhost:1234/'], False, None, None, 'pretty', None, True)
+
+
+def test_should_print_error_when_max_attempts_is_not_strictly_positive(runner):
+    result = runner.invoke(cli, ['listen', 'ws://localhost:1234', '-r', '--max-attempts', '0'])
+
+    assert result.exit_code == 2
+    assert '0 is not in the range x>=1' in result.output
+
+
+async def closing_handler(request: WebSocketRequest) -> None:
+    """Sends one message and closes the connection."""
+    ws = await request.accept()
+    await ws.send_message('hello')
+    await ws.aclose()
+
+
+@pytest.mark.parametrize('output_format', ['pretty', 'ndjson'])
+async def test_should_reconnect_when_connection_is_closed_by_server(nursery, capsys, monkeypatch, output_format):
+    monkeypatch.setattr('ws.utils.reconnect.BACKOFF_BASE', 0.01)
+    await nursery.start(serve_websocket, closing_handler, 'localhost', 1234, None)
+    await main(['ws://localhost:1234'], False, duration=0.5, output_format=output_format, max_attempts=3)
+
+    output = capsys.readouterr()
+    # in ndjson format, messages about connections are written on the standard error
+    messages, logs = (output.out, output.out) if output_format == 'pretty' else (output.out, output.err)
+    assert messages.count('hello') >= 3
+    assert 'Reconnected to ws://localhost:1234 after' in logs
+    assert '--- ws://localhost:1234 reconnect statistics ---' in logs
+    assert 'reconnect min/avg/max/stddev' in logs
+    assert 'downtime p50/p90/p99/p99.9' in logs
+
+
+async def test_should_merge_messages_of_several_urls_and_print_counters(nursery, capsys):
+    await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
+    await nursery.start(serve_websocket, handler, 'localhost', 1235, None)
+    await main(['ws://localhost:1234/', 'ws://localhost:1235/'], False, duration=0.5)
+
+    # rich wraps long lines at the width of the terminal
+    output = ' '.join(capsys.readouterr().out.split())
+    for port in (1234, 1235):
+        assert f'TEXT message from ws://localhost:{port}/ on' in output
+        assert f'BINARY message from ws://localhost:{port}/ on' in output
+    assert '--- listen statistics ---' in output
+    assert output.count(' messages, ') == 2
+
+
+async def test_should_tag_raw_messages_with_their_url(nursery, capsys):
+    await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
+    await nursery.start(serve_websocket, handler, 'localhost', 1235, None)
+    await main(['ws://localhost:1234/', 'ws://localhost:1235/'], False, duration=0.5, output_format='raw')
+
+    output = capsys.readouterr()
+    lines = output.out.splitlines()
+    sources = [line.split()[1] for line in lines]
+    assert set(sources) == {'ws://localhost:1234/', 'ws://localhost:1235/'}
+    assert f'ws://localhost:1234/: {sources.count("ws://localhost:1234/")} messages' in output.err
+    assert f'ws://localhost:1235/: {sources.count("ws://localhost:1235/")} messages' in output.err
+
+
+@pytest.mark.parametrize('output_format', ['pretty', 'raw'])
+async def test_should_keep_listening_other_urls_when_one_connection_fails(nursery, capsys, output_format):
+    await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
+    with pytest.raises(SystemExit) as exc_info:
+        await main(['ws://localhost:1234/', 'ws://localhost:1/'], False, duration=0.5, output_format=output_format)
+
+    assert exc_info.value.code == 1
+    output = capsys.readouterr()
+    messages, logs = (output.out, output.out) if output_format == 'pretty' else (output.out, output.err)
+    # rich wraps long lines at the width of the terminal
+    logs = ' '.join(logs.split())
+    assert messages.count('hello') >= 4
+    assert 'Connection to ws://localhost:1/ ended: unable to connect' in logs
+    assert 'ws://localhost:1/: 0 messages, 0.0 B, 1 error' in logs
+    assert 'ws://localhost:1234/: 0 messages' not in logs
+
+
+def test_should_print_error_when_url_file_does_not_exist(runner):
+    result = runner.invoke(cli, ['listen', '--url-file', 'foo.txt'])
+
+    assert result.exit_code == 2
+    assert "File 'foo.txt' does not exist" in result.output
+
+
+def test_should_print_error_when_url_file_contains_invalid_url(runner, tmp_path):
+    url_file = tmp_path / 'urls.txt'
+    url_file.write_text('ws://localhost:1234\nhttp://foo.com\n')
+    result = runner.invoke(cli, ['listen', '-u', f'{url_file}'])
+
+    assert result.exit_code == 2
+    assert 'http://foo.com is not a valid websocket url' in result.output
+
+
+@pytest.mark.parametrize('url_file_option', ['-u', '--url-file'])
+def test_should_check_trio_run_is_correctly_called_with_several_urls(runner, mocker, tmp_path, url_file_option):
+    url_file = tmp_path / 'urls.txt'
+    url_file.write_text('# shards\nws://localhost:1235\n\n  ws://localhost:1234  \nws://localhost:1236\n')
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['listen', 'ws://localhost:1234', ':1237', url_file_option, f'{url_file}'])
+
+    assert result.exit_code == 0
+    urls = ['ws://localhost:1234/', 'ws://localhost:1237/', 'ws://localhost:1235/', 'ws://localhost:1236/']
+    run_mock.assert_called_once_with(main, urls, False, None, None, 'pretty', None, False)
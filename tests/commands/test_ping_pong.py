@@ -1,7 +1,8 @@
 import pytest
-from trio_websocket import serve_websocket
+from trio_websocket import HandshakeError, serve_websocket
 
 from tests.helpers import killer, server_handler
+from ws.commands.ping import PingStatistics, print_ping_summary
 from ws.commands.ping import main as main_ping
 from ws.commands.pong import main as main_pong
 from ws.main import cli
@@ -10,6 +11,29 @@ command_parametrize = pytest.mark.parametrize('command', ['ping', 'pong'])
 ping_pong_parametrize = pytest.mark.parametrize('ping_pong', [main_ping, main_pong])
 
 
+class TestPrintPingSummary:
+    """Tests function print_ping_summary"""
+
+    def test_should_print_full_loss_without_latencies_when_no_pong_is_received(self, test_console):
+        print_ping_summary(test_console, 'ws://localhost:1234', PingStatistics(transmitted=2))
+        output = test_console.file.getvalue()
+
+        assert '--- ws://localhost:1234 ping statistics ---\n' in output
+        assert '2 pings transmitted, 0 pongs received, 100.0% loss\n' in output
+        assert 'rtt' not in output
+
+    def test_should_print_latencies_with_microsecond_resolution(self, test_console):
+        statistics = PingStatistics(transmitted=2)
+        statistics.histogram.record(0.001234)
+        statistics.histogram.record(0.002468)
+        print_ping_summary(test_console, 'ws://localhost:1234', statistics)
+        output = test_console.file.getvalue()
+
+        assert '2 pings transmitted, 2 pongs received, 0.0% loss\n' in output
+        assert 'rtt min/avg/max/stddev = 1.234/1.851/2.468/0.617 ms\n' in output
+        assert 'rtt p50/p90/p99/p99.9 = 1.234/2.468/2.468/2.468 ms\n' in output
+
+
 @command_parametrize
 def test_should_print_error_when_url_argument_is_not_given(runner, command):
     result = runner.invoke(cli, [command])
@@ -105,7 +129,11 @@ async def test_should_make_a_one_ping_with_default_values(capsys, nursery):
     await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
     await main_ping(url, number, interval)
 
-    assert f'PING {url} with 32 bytes of data\nsequence=1, time=' in capsys.readouterr().out
+    output = capsys.readouterr().out
+    assert f'PING {url} with 4 bytes of data\nsequence=1, time=' in output
+    assert f'--- {url} ping statistics ---\n1 pings transmitted, 1 pongs received, 0.0% loss\n' in output
+    assert 'rtt min/avg/max/stddev = ' in output
+    assert 'rtt p50/p90/p99/p99.9 = ' in output
 
 
 async def test_should_make_one_pong_with_default_values(capsys, nursery):
@@ -146,6 +174,16 @@ async def test_should_make_infinite_number_of_pings_and_pongs(capsys, nursery, p
     assert data.count('sequence') in (2, 3)
 
 
+async def test_should_print_ping_summary_when_program_is_interrupted(capsys, nursery):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    nursery.start_soon(killer, 1.5)
+    await main_ping('ws://localhost:1234', -1, 1.0)
+    output = capsys.readouterr().out
+
+    assert '2 pings transmitted, 2 pongs received, 0.0% loss\n' in output
+    assert output.index('Program was interrupted by Ctrl+C') < output.index('ping statistics')
+
+
 @ping_pong_parametrize
 async def test_should_make_pings_and_pongs_for_a_certain_amount_of_time(capsys, nursery, ping_pong):
     interval = 1
@@ -177,6 +215,15 @@ async def test_should_save_terminal_output_in_a_file(capsys, tmp_path, nursery,
     assert file_output.count('sequence') == 1
 
 
+@ping_pong_parametrize
+async def test_should_complete_html_file_when_connection_fails(capsys, tmp_path, ping_pong):
+    file_path = tmp_path / 'file.html'
+    with pytest.raises(HandshakeError):
+        await ping_pong('ws://localhost:1234', 1, 1, filename=f'{file_path}')
+
+    assert file_path.read_text().rstrip().endswith('</html>')
+
+
 @pytest.mark.parametrize(('command', 'ping_pong'), [('ping', main_ping), ('pong', main_pong)])
 def test_should_check_trio_run_is_correctly_called_without_arguments(runner, mocker, command, ping_pong):
     run_mock = mocker.patch('trio.run')
@@ -184,7 +231,7 @@ def test_should_check_trio_run_is_correctly_called_without_arguments(runner, moc
     result = runner.invoke(cli, [command, url])
 
     assert result.exit_code == 0
-    run_mock.assert_called_once_with(ping_pong, url, 1, 1.0, None, None, None)
+    run_mock.assert_called_once_with(ping_pong, url, 1, 1.0, None, None, None, False)
 
 
 @pytest.mark.parametrize(
@@ -221,5 +268,25 @@ def test_should_check_trio_run_is_correctly_called_with_arguments(
 
     assert result.exit_code == 0
     run_mock.assert_called_once_with(
-        ping_pong, 'ws://localhost:8000/', number, float(interval), message.encode(), float(duration), filename
+        ping_pong, 'ws://localhost:8000/', number, float(interval), message.encode(), float(duration), filename, False
     )
+
+
+@pytest.mark.parametrize(('command', 'ping_pong'), [('ping', main_ping), ('pong', main_pong)])
+def test_should_check_trio_run_is_correctly_called_with_timings_option(runner, mocker, command, ping_pong):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, [command, 'ws://localhost', '--timings'])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(ping_pong, 'ws://localhost/', 1, 1.0, None, None, None, True)
+
+
+@ping_pong_parametrize
+async def test_should_print_connection_timings_when_requested(capsys, nursery, ping_pong):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    await ping_pong('ws://localhost:1234', 1, 1.0, with_timings=True)
+    output = capsys.readouterr().out
+
+    assert '--- ws://localhost:1234 connection timings ---\n' in output
+    for phase in ('dns', 'tcp', 'upgrade', 'close'):
+        assert f'{phase} = ' in output
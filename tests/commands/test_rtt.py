@@ -0,0 +1,178 @@
+import pytest
+import trio
+from trio_websocket import ConnectionClosed, WebSocketRequest, serve_websocket
+
+from tests.helpers import server_handler
+from ws.commands.rtt import (
+    HEADER,
+    TEXT_HEADER_SIZE,
+    RttStatistics,
+    decode_message,
+    encode_message,
+    main,
+    print_rtt_summary,
+)
+from ws.main import cli
+
+
+class TestEncodeDecodeMessage:
+    """Tests functions encode_message and decode_message"""
+
+    @pytest.mark.parametrize('is_bytes', [True, False])
+    def test_should_decode_encoded_message(self, is_bytes):
+        message = encode_message(12, 1.5, 64, is_bytes)
+
+        assert len(message) == 64
+        assert decode_message(message) == (12, 1.5)
+
+    @pytest.mark.parametrize(('is_bytes', 'header_size'), [(True, HEADER.size), (False, TEXT_HEADER_SIZE)])
+    def test_should_not_pad_message_shorter_than_header(self, is_bytes, header_size):
+        assert len(encode_message(1, 1.0, 0, is_bytes)) == header_size
+
+    @pytest.mark.parametrize('timestamp', [0.0, 1.5, 123456.78901234567])
+    def test_should_encode_text_header_with_the_same_size_whatever_the_values(self, timestamp):
+        message = encode_message(2**40, timestamp, TEXT_HEADER_SIZE, is_bytes=False)
+
+        assert len(message) == TEXT_HEADER_SIZE
+        assert decode_message(message) == (2**40, timestamp)
+
+    @pytest.mark.parametrize('message', [b'foo', 'foo', 'a:b:c', '1:foo:'])
+    def test_should_return_none_when_message_cannot_be_parsed(self, message):
+        assert decode_message(message) is None
+
+
+def test_should_print_summary_without_latencies_when_nothing_is_received(test_console):
+    print_rtt_summary(test_console, 'ws://localhost:1234', RttStatistics(sent=3))
+    output = test_console.file.getvalue()
+
+    assert '--- ws://localhost:1234 rtt statistics ---\n' in output
+    assert '3 messages sent, 0 echoes received, 0 out of order, 0 unmatched\n' in output
+    assert 'rtt min' not in output
+
+
+def test_should_print_error_when_url_argument_is_not_given(runner):
+    result = runner.invoke(cli, ['rtt'])
+
+    assert result.exit_code == 2
+    assert "Missing argument 'URL'" in result.output
+
+
+def test_should_print_error_when_number_is_0(runner):
+    result = runner.invoke(cli, ['rtt', 'ws://localhost:1234', '-n', '0'])
+
+    assert result.exit_code == 2
+    assert 'The number of messages cannot be 0' in result.output
+
+
+def test_should_print_error_when_window_is_not_strictly_positive(runner):
+    result = runner.invoke(cli, ['rtt', 'ws://localhost:1234', '-w', '0'])
+
+    assert result.exit_code == 2
+    assert '0 is not in the range x>=1' in result.output
+
+
+@pytest.mark.parametrize('window', [1, 8])
+@pytest.mark.parametrize('is_bytes', [True, False])
+async def test_should_measure_round_trips_of_echoed_messages(capsys, nursery, window, is_bytes):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    await main('ws://localhost:1234', 20, window, 32, is_bytes)
+    output = capsys.readouterr().out
+
+    assert 'RTT ws://localhost:1234 with 32 bytes' in output
+    assert f'{window} in flight' in output
+    assert '20 messages sent, 20 echoes received, 0 out of order, 0 unmatched' in output
+    assert 'rtt min/avg/max/stddev = ' in output
+    assert 'rtt p50/p90/p99/p99.9 = ' in output
+
+
+@pytest.mark.parametrize(('is_bytes', 'expected'), [(True, '16 bytes BINARY'), (False, '32 bytes TEXT')])
+async def test_should_send_messages_of_header_size_when_size_is_too_small(capsys, nursery, is_bytes, expected):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    await main('ws://localhost:1234', 2, 1, 0, is_bytes)
+    output = capsys.readouterr().out
+
+    assert f'RTT ws://localhost:1234 with {expected} messages' in output
+    assert '2 messages sent, 2 echoes received' in output
+
+
+async def reverse_handler(request: WebSocketRequest) -> None:
+    """Echoes messages by pair in reverse order and sends an unexpected message at the beginning."""
+    ws = await request.accept()
+    await ws.send_message('hello')
+    while True:
+        try:
+            first = await ws.get_message()
+            second = await ws.get_message()
+            await ws.send_message(second)
+            await ws.send_message(first)
+        except ConnectionClosed:
+            break
+
+
+async def test_should_count_out_of_order_and_unmatched_messages(capsys, nursery):
+    await nursery.start(serve_websocket, reverse_handler, 'localhost', 1234, None)
+    await main('ws://localhost:1234', 4, 2, 32, False)
+    output = capsys.readouterr().out
+
+    assert '4 messages sent, 4 echoes received, 2 out of order, 1 unmatched' in output
+
+
+async def test_should_print_summary_when_duration_expires(capsys, nursery):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    await main('ws://localhost:1234', -1, 4, 32, True, duration=0.5)
+    output = capsys.readouterr().out
+
+    assert 'rtt statistics' in output
+    assert 'rtt p50/p90/p99/p99.9 = ' in output
+
+
+async def test_should_exit_when_echo_is_not_received_on_time(capsys, nursery, monkeypatch):
+    async def silent_handler(request: WebSocketRequest) -> None:
+        await request.accept()
+        await trio.sleep_forever()
+
+    monkeypatch.setenv('WS_RESPONSE_TIMEOUT', '0.2')
+    await nursery.start(serve_websocket, silent_handler, 'localhost', 1234, None)
+    with pytest.raises(SystemExit):
+        await main('ws://localhost:1234', 1, 1, 32, False)
+
+    output = capsys.readouterr().out
+    assert 'Unable to get response on time' in output
+    assert '1 messages sent, 0 echoes received' in output
+
+
+def test_should_check_trio_run_is_correctly_called_without_options(runner, mocker):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['rtt', ':1234'])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', 100, 1, 32, False, None)
+
+
+@pytest.mark.parametrize(
+    ('number_option', 'window_option', 'size_option', 'binary_option', 'duration_option'),
+    [('-n', '-w', '-s', '-b', '-d'), ('--number', '--window', '--size', '--binary', '--duration')],
+)
+def test_should_check_trio_run_is_correctly_called_with_options(
+    runner, mocker, number_option, window_option, size_option, binary_option, duration_option
+):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(
+        cli,
+        [
+            'rtt',
+            ':1234',
+            number_option,
+            '-1',
+            window_option,
+            '16',
+            size_option,
+            '128',
+            binary_option,
+            duration_option,
+            '5',
+        ],
+    )
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, 'ws://localhost:1234/', -1, 16, 128, True, 5.0)
@@ -8,7 +8,7 @@ import pytest
 import trio
 
 from tests.helpers import killer
-from ws.commands.tail import main
+from ws.commands.tail import FileOutput, main
 from ws.main import cli
 
 
@@ -26,6 +26,20 @@ def test_should_print_error_when_argument_is_not_a_file(runner):
     assert "File 'foo' does not exist" in result.output
 
 
+def test_should_print_error_when_argument_is_a_directory(runner, tmp_path):
+    result = runner.invoke(cli, ['tail', f'{tmp_path}'])
+
+    assert result.exit_code == 2
+    assert 'is a directory' in result.output
+
+
+def test_should_print_error_when_glob_pattern_does_not_match_any_file(runner, tmp_path):
+    result = runner.invoke(cli, ['tail', f'{tmp_path}/*.log'])
+
+    assert result.exit_code == 2
+    assert 'No file matches the pattern' in result.output
+
+
 def test_should_print_error_when_lines_option_does_not_have_the_correct_type(runner):
     result = runner.invoke(cli, ['tail', '-n', 'foo'])
 
@@ -55,8 +69,59 @@ def test_should_print_the_last_given_number_of_lines_of_a_file(runner, file_to_r
     assert 'I like async concurrency!\n' * (count - 1) + '\n' == result.output
 
 
+class TestFileOutput:
+    """Tests class FileOutput"""
+
+    def test_should_write_data_as_is_when_there_is_no_prefix(self, capsysbinary):
+        output = FileOutput()
+        output.write(b'foo')
+        output.write(b'bar\n')
+
+        assert capsysbinary.readouterr().out == b'foobar\n'
+
+    def test_should_prefix_complete_lines_and_keep_partial_line(self, capsysbinary):
+        output = FileOutput(b'[a] ')
+        output.write(b'foo\nba')
+        assert capsysbinary.readouterr().out == b'[a] foo\n'
+
+        output.write(b'r\nbaz')
+        assert capsysbinary.readouterr().out == b'[a] bar\n'
+
+        output.flush()
+        assert capsysbinary.readouterr().out == b'[a] baz\n'
+
+    def test_should_not_write_anything_on_flush_when_there_is_no_partial_line(self, capsysbinary):
+        output = FileOutput(b'[a] ')
+        output.write(b'foo\n')
+        output.flush()
+
+        assert capsysbinary.readouterr().out == b'[a] foo\n'
+
+
+def test_should_print_prefixed_last_lines_of_several_files(runner, tmp_path):
+    (tmp_path / 'a.log').write_text('a1\na2\na3\n')
+    (tmp_path / 'b.log').write_text('b1\nb2')
+    result = runner.invoke(cli, ['tail', '-n', '2', f'{tmp_path}/*.log'])
+
+    assert result.exit_code == 0
+    assert result.output == f'[{tmp_path}/a.log] a3\n[{tmp_path}/b.log] b1\n[{tmp_path}/b.log] b2\n'
+
+
+def test_should_print_a_file_only_once_when_it_is_given_several_times(runner, tmp_path):
+    file_path = tmp_path / 'a.log'
+    file_path.write_text('a1\na2')
+    result = runner.invoke(cli, ['tail', f'{file_path}', f'{tmp_path}/*.log'])
+
+    assert result.exit_code == 0
+    assert result.output == 'a1\na2\n'
+
+
 @pytest.mark.skipif(platform.python_implementation() == 'PyPy', reason="I don't know why it doesn't work on pypy")
-async def test_should_follow_given_file(capsys, file_to_read, signal_message):
+@pytest.mark.parametrize('inotify', [True, False])
+async def test_should_follow_given_file(capsys, monkeypatch, file_to_read, signal_message, inotify):
+    if not inotify:
+        monkeypatch.setattr('ws.utils.watcher._libc', None)
+
     async def update_file(file_path: pathlib.Path) -> None:
         async with await trio.open_file(file_path, 'a') as f:
             await trio.sleep(0.2)
@@ -65,22 +130,112 @@ async def test_should_follow_given_file(capsys, file_to_read, signal_message):
             await f.write('world\n')
 
     async with trio.open_nursery() as nursery:
-        nursery.start_soon(main, file_to_read, 10, True)
+        nursery.start_soon(main, [file_to_read], 10, True)
         nursery.start_soon(killer, 1)
         await update_file(file_to_read)
 
     expected = 'I like async concurrency!\n' * 9 + f'\nhello\nworld\n{signal_message(signal.SIGINT)}'
     # Windows magic!
     if platform.system() == 'Windows':
-        expected = expected.replace('I like async concurrency!\n', 'I like async concurrency!\r\n')
+        expected = expected.replace('!\n', '!\r\n').replace('hello\n', 'hello\r\n').replace('world\n', 'world\r\n')
 
     assert capsys.readouterr().out == expected
 
 
+@pytest.mark.parametrize('inotify', [True, False])
+async def test_should_follow_several_files_in_arrival_order(capsys, monkeypatch, tmp_path, inotify):
+    if not inotify:
+        monkeypatch.setattr('ws.utils.watcher._libc', None)
+    first_path, second_path = tmp_path / 'first.log', tmp_path / 'second.log'
+    first_path.write_text('')
+    second_path.write_text('')
+
+    async def write(file_path: pathlib.Path, data: str) -> None:
+        await trio.sleep(0.2)
+        with file_path.open('a') as f:
+            f.write(data)
+
+    with trio.move_on_after(1.5):
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(main, [f'{first_path}', f'{second_path}'], 10, True)
+            await write(first_path, 'one\ntw')
+            await write(second_path, 'three\n')
+            await write(first_path, 'o\n')
+            await write(second_path, 'four\n')
+
+    assert capsys.readouterr().out == (
+        f'[{first_path}] one\n[{second_path}] three\n[{first_path}] two\n[{second_path}] four\n'
+    )
+
+
+@pytest.mark.skipif(platform.system() == 'Windows', reason='an opened file cannot be renamed on Windows')
+@pytest.mark.parametrize('inotify', [True, False])
+async def test_should_follow_new_file_when_it_is_rotated(capsys, monkeypatch, tmp_path, inotify):
+    if not inotify:
+        monkeypatch.setattr('ws.utils.watcher._libc', None)
+    file_path = tmp_path / 'file.log'
+    file_path.write_text('first\n')
+
+    async def rotate_file() -> None:
+        await trio.sleep(0.2)
+        with file_path.open('a') as f:
+            f.write('second\n')
+        await trio.sleep(0.2)
+        file_path.rename(tmp_path / 'file.log.1')
+        await trio.sleep(0.2)
+        file_path.write_text('third\n')
+        await trio.sleep(1.5)
+        with file_path.open('a') as f:
+            f.write('fourth\n')
+
+    with trio.move_on_after(2.5):
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(main, [f'{file_path}'], 10, False, True)
+            await rotate_file()
+
+    output = capsys.readouterr()
+    assert output.out == 'first\n\nsecond\nthird\nfourth\n'
+    assert output.err == f'ws tail: {file_path} has been replaced; following new file\n'
+
+
+@pytest.mark.parametrize('follow_name', [True, False])
+async def test_should_read_file_from_the_beginning_when_it_is_truncated(capsys, tmp_path, follow_name):
+    file_path = tmp_path / 'file.log'
+    file_path.write_text('a very long line\n')
+
+    async def truncate_file() -> None:
+        await trio.sleep(0.2)
+        with file_path.open('r+') as f:
+            f.truncate(0)
+        await trio.sleep(0.3)
+        with file_path.open('a') as f:
+            f.write('new\n')
+
+    with trio.move_on_after(1):
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(main, [f'{file_path}'], 10, not follow_name, follow_name)
+            await truncate_file()
+
+    output = capsys.readouterr()
+    assert output.out == 'a very long line\n\nnew\n'
+    assert output.err == f'ws tail: {file_path}: file truncated\n'
+
+
 @pytest.mark.parametrize('follow_option', ['-f', '--follow'])
 def test_should_check_trio_run_is_correctly_called_with_arguments(runner, mocker, file_to_read, follow_option):
     run_mock = mocker.patch('trio.run')
     result = runner.invoke(cli, ['tail', f'{file_to_read}', '-n', '12', follow_option])
 
     assert result.exit_code == 0
-    run_mock.assert_called_once_with(main, f'{file_to_read}', 12, True)
+    run_mock.assert_called_once_with(main, [f'{file_to_read}'], 12, True, False)
+
+
+@pytest.mark.parametrize('follow_name_option', ['-F', '--follow-name'])
+def test_should_check_trio_run_is_correctly_called_with_follow_name_option(
+    runner, mocker, file_to_read, follow_name_option
+):
+    run_mock = mocker.patch('trio.run')
+    result = runner.invoke(cli, ['tail', f'{file_to_read}', follow_name_option])
+
+    assert result.exit_code == 0
+    run_mock.assert_called_once_with(main, [f'{file_to_read}'], 10, False, True)
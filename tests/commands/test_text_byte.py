@@ -1,21 +1,27 @@
 import functools
+import io
+import os
 import platform
 
 import pytest
 import trio
-from trio_websocket import ConnectionRejected, WebSocketRequest, serve_websocket
+from trio_websocket import ConnectionClosed, WebSocketRequest, serve_websocket
 
-from ws.commands.text_byte import main
+from tests.helpers import server_handler
+from ws.commands.text_byte import FRAME_SIZE, LineMessages, main, read_lines, send_message
 from ws.main import cli
+from ws.parameters import FileMessage
+from ws.utils.size import get_readable_size
 
 
-async def handler(request: WebSocketRequest, messages: set) -> None:
+async def handler(request: WebSocketRequest, messages: set, closed: trio.Event) -> None:
     ws = await request.accept()
     while True:
         try:
             message = await ws.get_message()
             messages.add(message)
-        except ConnectionRejected:
+        except ConnectionClosed:
+            closed.set()
             break
 
 
@@ -23,9 +29,13 @@ async def handler(request: WebSocketRequest, messages: set) -> None:
 @pytest.mark.skipif(platform.python_implementation() == 'PyPy', reason="I don't know why it does not work on pypy")
 async def test_should_send_given_message(capsys, nursery, message):
     messages = set()
-    await nursery.start(serve_websocket, functools.partial(handler, messages=messages), 'localhost', 1234, None)
-    with trio.move_on_after(0.1):
+    closed = trio.Event()
+    await nursery.start(
+        serve_websocket, functools.partial(handler, messages=messages, closed=closed), 'localhost', 1234, None
+    )
+    with trio.fail_after(1):
         await main('ws://localhost:1234', message)
+        await closed.wait()
 
     assert messages == {message}
     assert capsys.readouterr().out == 'Sent 5.0 B of data over the wire.\n'
@@ -42,8 +52,8 @@ def test_should_check_trio_run_is_correctly_called_with_given_message(runner, mo
     run_mock.assert_called_once_with(main, url, expected)
 
 
-@pytest.mark.parametrize(('command', 'expected'), [('byte', b'hello'), ('text', 'hello')])
-def test_should_check_trio_run_is_correctly_called_with_given_file(tmp_path, runner, mocker, command, expected):
+@pytest.mark.parametrize(('command', 'is_bytes'), [('byte', True), ('text', False)])
+def test_should_check_trio_run_is_correctly_called_with_given_file(tmp_path, runner, mocker, command, is_bytes):
     run_mock = mocker.patch('trio.run')
     url = 'ws://localhost:1234/'
     dummy_path = tmp_path / 'dummy.txt'
@@ -51,4 +61,207 @@ def test_should_check_trio_run_is_correctly_called_with_given_file(tmp_path, run
     result = runner.invoke(cli, [command, url, f'file@{dummy_path}'])
 
     assert result.exit_code == 0
-    run_mock.assert_called_once_with(main, url, expected)
+    run_mock.assert_called_once_with(main, url, FileMessage(f'{dummy_path}', 5, is_bytes))
+
+
+@pytest.mark.parametrize('command', ['byte', 'text'])
+def test_should_print_error_when_file_does_not_exist(runner, command):
+    result = runner.invoke(cli, [command, 'ws://localhost:1234/', 'file@foo.txt'])
+
+    assert result.exit_code == 2
+    assert 'file foo.txt does not exist' in result.output
+
+
+@pytest.mark.parametrize(
+    ('content', 'is_bytes'),
+    [(bytes(range(256)) * 1000, True), ('é✓' * 50_000, False), (b'', True), ('', False)],
+)
+async def test_should_send_file_in_fragmented_message(tmp_path, capsys, nursery, content, is_bytes):
+    received = []
+    closed = trio.Event()
+
+    async def recording_handler(request: WebSocketRequest) -> None:
+        ws = await request.accept()
+        try:
+            while True:
+                received.append(await ws.get_message())
+        except ConnectionClosed:
+            closed.set()
+
+    file_path = tmp_path / 'file'
+    if is_bytes:
+        file_path.write_bytes(content)
+    else:
+        file_path.write_text(content, encoding='utf-8')
+    size = file_path.stat().st_size
+    await nursery.start(
+        functools.partial(serve_websocket, max_message_size=1024 * 1024), recording_handler, 'localhost', 1234, None
+    )
+    with trio.fail_after(5):
+        await main('ws://localhost:1234', FileMessage(f'{file_path}', size, is_bytes))
+        await closed.wait()
+
+    assert received == [content]
+    assert f'Sent {get_readable_size(size)} of data over the wire in ' in capsys.readouterr().out
+
+
+async def test_should_exit_with_error_when_endpoint_closes_connection_while_file_is_sent(tmp_path, capsys, nursery):
+    file_path = tmp_path / 'file.bin'
+    file_path.write_bytes(b'a' * 10 * FRAME_SIZE)
+    await nursery.start(
+        functools.partial(serve_websocket, max_message_size=FRAME_SIZE),
+        functools.partial(handler, messages=set(), closed=trio.Event()),
+        'localhost',
+        1234,
+        None,
+    )
+    with trio.fail_after(5), pytest.raises(SystemExit) as exc_info:
+        await send_message('ws://localhost:1234', FileMessage(f'{file_path}', 10 * FRAME_SIZE, True))
+
+    output = capsys.readouterr().out
+    assert exc_info.value.code == 1
+    assert 'Connection closed by the endpoint with code 1009 (MESSAGE_TOO_BIG) while sending' in output
+    assert f'{file_path}' in output
+
+
+async def test_should_exit_with_error_when_text_file_is_not_utf8(tmp_path, capsys, nursery):
+    file_path = tmp_path / 'file.txt'
+    file_path.write_bytes(b'hello \xff')
+    await nursery.start(
+        serve_websocket, functools.partial(handler, messages=set(), closed=trio.Event()), 'localhost', 1234, None
+    )
+    with trio.fail_after(5), pytest.raises(SystemExit) as exc_info:
+        await send_message('ws://localhost:1234', FileMessage(f'{file_path}', 7, False))
+
+    # the message is wrapped at the width of the terminal
+    output = capsys.readouterr().out.replace('\n', ' ')
+    assert exc_info.value.code == 1
+    assert f'{file_path} is not a valid UTF-8 text' in output
+
+
+@pytest.mark.parametrize(
+    ('arguments', 'message'),
+    [
+        (['hello', '--from-stdin'], 'A message cannot be given with the --from-stdin option.'),
+        ([], "Missing argument 'MESSAGE'."),
+        (['hello', '--lines'], 'The --lines option needs a file@ message.'),
+        (['hello', '--rate', '10'], 'The --rate option only applies to the --from-stdin and --lines options.'),
+    ],
+)
+@pytest.mark.parametrize('command', ['byte', 'text'])
+def test_should_print_error_when_bulk_options_are_not_valid(runner, command, arguments, message):
+    result = runner.invoke(cli, [command, 'ws://localhost:1234/', *arguments])
+
+    assert result.exit_code == 2
+    assert message in result.output
+
+
+@pytest.mark.parametrize(('command', 'is_bytes'), [('byte', True), ('text', False)])
+def test_should_check_trio_run_is_correctly_called_with_bulk_options(tmp_path, runner, mocker, command, is_bytes):
+    run_mock = mocker.patch('trio.run')
+    url = 'ws://localhost:1234/'
+    dummy_path = tmp_path / 'dummy.txt'
+    dummy_path.write_text('hello\nworld\n')
+
+    result = runner.invoke(cli, [command, url, '--from-stdin'])
+    assert result.exit_code == 0
+    run_mock.assert_called_with(main, url, LineMessages(None, is_bytes))
+
+    result = runner.invoke(cli, [command, url, f'file@{dummy_path}', '-l', '-r', '100'])
+    assert result.exit_code == 0
+    run_mock.assert_called_with(main, url, LineMessages(f'{dummy_path}', is_bytes, 100.0))
+
+
+async def test_should_read_non_empty_lines_by_chunks(tmp_path):
+    file_path = tmp_path / 'file.txt'
+    file_path.write_bytes(b'first line\r\n\nsecond line\nthird')
+    async with await trio.open_file(file_path, 'rb') as f:
+        batches = [lines async for lines in read_lines(f, chunk_size=8)]
+
+    assert [line for lines in batches for line in lines] == [b'first line', b'second line', b'third']
+    assert len(batches) > 1
+
+
+async def test_should_read_lines_of_pipe_without_waiting_for_full_chunk():
+    read_fd, write_fd = os.pipe()
+    async with trio.wrap_file(open(read_fd, 'rb')) as f:
+        try:
+            os.write(write_fd, b'first\nsec')
+            lines = read_lines(f)
+            with trio.fail_after(1):
+                assert await lines.__anext__() == [b'first']
+            os.write(write_fd, b'ond\n')
+            with trio.fail_after(1):
+                assert await lines.__anext__() == [b'second']
+        finally:
+            os.close(write_fd)
+
+
+@pytest.mark.parametrize(
+    ('is_bytes', 'expected'), [(True, [b'hello', b'world', 'é✓'.encode()]), (False, ['hello', 'world', 'é✓'])]
+)
+@pytest.mark.parametrize('from_stdin', [True, False])
+async def test_should_send_each_line_as_a_message(
+    tmp_path, capsys, monkeypatch, nursery, from_stdin, is_bytes, expected
+):
+    received = []
+    closed = trio.Event()
+
+    async def recording_handler(request: WebSocketRequest) -> None:
+        ws = await request.accept()
+        try:
+            while True:
+                received.append(await ws.get_message())
+        except ConnectionClosed:
+            closed.set()
+
+    content = 'hello\n\nworld\né✓\n'.encode()
+    if from_stdin:
+        monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(content)))
+        messages = LineMessages(None, is_bytes)
+    else:
+        file_path = tmp_path / 'lines.txt'
+        file_path.write_bytes(content)
+        messages = LineMessages(f'{file_path}', is_bytes)
+    await nursery.start(serve_websocket, recording_handler, 'localhost', 1234, None)
+    with trio.fail_after(5):
+        await main('ws://localhost:1234', messages)
+        await closed.wait()
+
+    assert received == expected
+    assert 'Sent 3 messages, 15.0 B of data over the wire in ' in capsys.readouterr().out
+
+
+async def test_should_exit_with_error_when_endpoint_does_not_answer_close_after_lines(
+    tmp_path, capsys, monkeypatch, nursery
+):
+    async def mute_handler(request: WebSocketRequest) -> None:
+        ws = await request.accept()
+        # the answer to the close frame is sent with the stream lock held
+        async with ws._stream_lock:
+            await trio.sleep_forever()
+
+    monkeypatch.setenv('WS_DISCONNECT_TIMEOUT', '0.1')
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_text('hello\nworld\n')
+    await nursery.start(serve_websocket, mute_handler, 'localhost', 1234, None)
+    beginning = trio.current_time()
+    with trio.fail_after(2), pytest.raises(SystemExit) as exc_info:
+        await send_message('ws://localhost:1234', LineMessages(f'{file_path}', False))
+
+    assert exc_info.value.code == 1
+    assert trio.current_time() - beginning >= 0.4
+    assert 'Unable to disconnect on time from ws://localhost:1234' in capsys.readouterr().out
+
+
+async def test_should_send_lines_at_given_rate(tmp_path, capsys, nursery):
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_text('\n'.join(str(i) for i in range(5)))
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    beginning = trio.current_time()
+    with trio.fail_after(5):
+        await main('ws://localhost:1234', LineMessages(f'{file_path}', False, 20))
+
+    # the last message is sent 4 intervals of 50 ms after the first one
+    assert trio.current_time() - beginning >= 0.2
+    assert 'Sent 5 messages, 5.0 B of data over the wire in ' in capsys.readouterr().out
@@ -12,7 +12,9 @@ from prompt_toolkit.input import PipeInput, create_pipe_input
 from prompt_toolkit.output import DummyOutput
 from rich.console import Console
 
+from ws.client import clear_tls_caches
 from ws.console import console, custom_theme
+from ws.settings import clear_settings_cache
 
 
 @pytest.fixture()
@@ -108,3 +110,18 @@ def mock_input() -> PipeInput:
     with create_pipe_input() as pipe_input:
         with create_app_session(input=pipe_input, output=DummyOutput()):
             yield pipe_input
+
+
+@pytest.fixture(autouse=True)
+def clear_tls_caches_after_test():
+    """SSL contexts and TLS sessions are kept for the whole process, tests must not share them."""
+    yield
+    clear_tls_caches()
+
+
+@pytest.fixture(autouse=True)
+def clear_settings_cache_around_test():
+    """Settings are resolved once per process, each test resolves them again from its own environment."""
+    clear_settings_cache()
+    yield
+    clear_settings_cache()
@@ -4,10 +4,12 @@ from unittest.mock import call
 import mock
 import pytest
 import trio
-from trio_websocket import ConnectionClosed, DisconnectionTimeout, serve_websocket
+from trio_websocket import ConnectionClosed, DisconnectionTimeout, HandshakeError, serve_websocket
 
 from tests.helpers import server_handler
-from ws.client import get_client_ssl_context, websocket_client
+from ws.client import clear_tls_caches, get_cached_client_ssl_context, get_client_ssl_context, websocket_client
+from ws.commands.echo_server import request_handler
+from ws.settings import Settings
 
 
 class TestGetClientSSLContext:
@@ -176,3 +178,147 @@ class TestClient:
         async with websocket_client('wss://localhost:1234') as client:
             await client.send_message('foo')
             assert 'foo' == await client.get_message()
+
+    async def test_should_print_compression_parameters_and_summary_when_compression_is_enabled(
+        self, monkeypatch, capsys, nursery
+    ):
+        monkeypatch.setenv('WS_COMPRESSION', '1')
+        await nursery.start(serve_websocket, request_handler, 'localhost', 1234, None)
+        async with websocket_client('ws://localhost:1234') as client:
+            await client.send_message('foo' * 100)
+            assert 'foo' * 100 == await client.get_message()
+
+        output = capsys.readouterr().out
+        assert 'permessage-deflate: client_max_window_bits=15; server_max_window_bits=15\n' in output
+        assert 'compression: sent 300.0 B as' in output
+
+    async def test_should_print_warning_when_server_does_not_accept_compression(self, monkeypatch, capsys, nursery):
+        monkeypatch.setenv('WS_COMPRESSION', '1')
+        await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+        async with websocket_client('ws://localhost:1234') as client:
+            await client.send_message('foo')
+            assert 'foo' == await client.get_message()
+
+        assert capsys.readouterr().out == 'The server did not accept permessage-deflate compression\n'
+
+
+class TestConnectionTimings:
+    """Tests the timings of the connection steps printed by the client."""
+
+    async def test_should_print_connection_timings_without_tls(self, capsys, nursery):
+        await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+        async with websocket_client('ws://localhost:1234', with_timings=True) as client:
+            await client.send_message('foo')
+            assert 'foo' == await client.get_message()
+
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == '--- ws://localhost:1234 connection timings ---'
+        assert [line.split(' = ')[0] for line in lines[1:]] == ['dns', 'tcp', 'upgrade', 'close']
+        assert all(line.endswith(' ms') for line in lines[1:])
+
+    async def test_should_print_tls_handshake_timing_with_tls(
+        self, monkeypatch, capsys, tmp_path, nursery, ca, server_context
+    ):
+        ca_file = tmp_path / 'ca.pem'
+        ca.cert_pem.write_to_path(f'{ca_file}')
+        monkeypatch.setenv('WS_TLS_CA_FILE', f'{ca_file}')
+        await nursery.start(serve_websocket, server_handler, 'localhost', 1234, server_context)
+        async with websocket_client('wss://localhost:1234', with_timings=True) as client:
+            await client.send_message('foo')
+            await client.get_message()
+
+        lines = capsys.readouterr().out.splitlines()
+        assert [line.split(' = ')[0] for line in lines[1:]] == ['dns', 'tcp', 'tls', 'upgrade', 'close']
+
+    async def test_should_print_step_which_failed_when_connection_is_refused(self, capsys):
+        with pytest.raises(HandshakeError):
+            async with websocket_client('ws://localhost:1234', with_timings=True):
+                pass
+
+        output = capsys.readouterr().out
+        assert 'dns = ' in output
+        assert 'tcp = not completed after' in output
+
+    async def test_should_not_print_connection_timings_by_default(self, capsys, nursery):
+        await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+        async with websocket_client('ws://localhost:1234') as client:
+            await client.send_message('foo')
+            await client.get_message()
+
+        assert capsys.readouterr().out == ''
+
+
+class TestGetCachedClientSSLContext:
+    """Tests function get_cached_client_ssl_context."""
+
+    def test_should_return_none_when_tls_is_not_configured(self):
+        assert get_cached_client_ssl_context(Settings()) is None
+
+    def test_should_create_context_only_once_for_the_same_settings(self, mocker, tmp_path, ca):
+        ca_file = tmp_path / 'ca.pem'
+        ca.cert_pem.write_to_path(f'{ca_file}')
+        spy = mocker.spy(ssl, 'create_default_context')
+        context = get_cached_client_ssl_context(Settings(tls_ca_file=ca_file))
+
+        assert isinstance(context, ssl.SSLContext)
+        assert get_cached_client_ssl_context(Settings(tls_ca_file=ca_file)) is context
+        spy.assert_called_once()
+
+    def test_should_create_new_context_when_tls_settings_change(self, tmp_path, ca, certificate):
+        ca_file = tmp_path / 'ca.pem'
+        ca.cert_pem.write_to_path(f'{ca_file}')
+        context = get_cached_client_ssl_context(Settings(tls_ca_file=ca_file))
+
+        assert (
+            get_cached_client_ssl_context(Settings(tls_ca_file=ca_file, tls_certificate_file=certificate))
+            is not context
+        )
+
+
+class TestTlsSessionResumption:
+    """Tests the reuse of TLS sessions by clients."""
+
+    async def test_should_resume_tls_session_on_next_connections_to_the_same_server(
+        self, monkeypatch, tmp_path, nursery, ca, server_context
+    ):
+        ca_file = tmp_path / 'ca.pem'
+        ca.cert_pem.write_to_path(f'{ca_file}')
+        monkeypatch.setenv('WS_TLS_CA_FILE', f'{ca_file}')
+        await nursery.start(serve_websocket, server_handler, 'localhost', 1234, server_context)
+
+        resumed = []
+        for _ in range(3):
+            async with websocket_client('wss://localhost:1234') as client:
+                await client.send_message('foo')
+                assert 'foo' == await client.get_message()
+            resumed.append(client.is_tls_session_resumed)
+            assert client.tls_handshake_time > 0
+
+        assert resumed == [False, True, True]
+
+    async def test_should_do_full_handshake_after_caches_are_cleared(
+        self, monkeypatch, tmp_path, nursery, ca, server_context
+    ):
+        ca_file = tmp_path / 'ca.pem'
+        ca.cert_pem.write_to_path(f'{ca_file}')
+        monkeypatch.setenv('WS_TLS_CA_FILE', f'{ca_file}')
+        await nursery.start(serve_websocket, server_handler, 'localhost', 1234, server_context)
+
+        async with websocket_client('wss://localhost:1234') as client:
+            await client.send_message('foo')
+            await client.get_message()
+        clear_tls_caches()
+        async with websocket_client('wss://localhost:1234') as client:
+            await client.send_message('foo')
+            await client.get_message()
+
+        assert not client.is_tls_session_resumed
+
+    async def test_should_not_record_tls_handshake_without_tls(self, nursery):
+        await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+        async with websocket_client('ws://localhost:1234') as client:
+            await client.send_message('foo')
+            await client.get_message()
+
+        assert client.tls_handshake_time is None
+        assert not client.is_tls_session_resumed
@@ -1,6 +1,18 @@
+import time
+import xml.etree.ElementTree as ET
+
 import pytest
 
-from ws.console import Console, configure_console_recording, custom_theme, save_output
+from ws.console import (
+    Console,
+    HtmlOutputRecorder,
+    OutputRecorder,
+    SvgOutputRecorder,
+    configure_console_recording,
+    create_output_recorder,
+    custom_theme,
+    save_output,
+)
 from ws.settings import get_settings
 
 
@@ -8,23 +20,169 @@ class TestConfigureConsoleRecording:
     """Tests function configure_console_recording"""
 
     @pytest.mark.parametrize(('filename', 'record'), [(None, False), ('file.txt', True)])
-    def test_should_correctly_configure_terminal_record_property_given_correct_input(self, filename, record):
+    def test_should_correctly_configure_terminal_record_property_given_correct_input(self, tmp_path, filename, record):
         console = Console()
         settings = get_settings()
+        filename = filename if filename is None else f'{tmp_path / filename}'
         configure_console_recording(console, settings, filename)
 
         assert console.record is record
         assert console.width == settings.terminal_width
+        if filename is not None:
+            save_output(console, filename)
 
     @pytest.mark.parametrize('filename', ['foo.txt', 'foo.html', 'foo.svg'])
-    def test_should_check_width_is_taken_from_environnement_variable(self, monkeypatch, filename):
+    def test_should_check_width_is_taken_from_environnement_variable(self, tmp_path, monkeypatch, filename):
         monkeypatch.setenv('WS_TERMINAL_WIDTH', '120')
         console = Console()
         settings = get_settings()
-        configure_console_recording(console, settings, filename)
+        configure_console_recording(console, settings, f'{tmp_path / filename}')
 
         assert console.record is True
         assert console.width == 120
+        save_output(console, f'{tmp_path / filename}')
+
+
+@pytest.mark.parametrize(
+    ('filename', 'recorder_class'),
+    [
+        ('file.txt', OutputRecorder),
+        ('file', OutputRecorder),
+        ('a.html', HtmlOutputRecorder),
+        ('a.svg', SvgOutputRecorder),
+    ],
+)
+def test_should_create_recorder_given_file_extension(tmp_path, filename, recorder_class):
+    recorder = create_output_recorder(Console(record=True), f'{tmp_path / filename}')
+
+    assert type(recorder) is recorder_class
+    recorder.close()
+
+
+class TestOutputRecorder:
+    """Tests recorder classes"""
+
+    def test_should_append_output_to_file_while_recording(self, tmp_path):
+        file_path = tmp_path / 'file.txt'
+        console = Console(record=True, width=80)
+        recorder = OutputRecorder(console, f'{file_path}', flush_interval=0)
+        console.push_render_hook(recorder)
+
+        console.print('hello')
+        console.print('world')
+        # the output of the last print is only written by the next flush
+        assert file_path.read_text() == 'hello\n'
+        assert console.export_text(clear=False) == 'world\n'
+
+        recorder.close()
+        assert file_path.read_text() == 'hello\nworld\n'
+
+    def test_should_not_write_output_before_flush_interval(self, tmp_path):
+        file_path = tmp_path / 'file.txt'
+        console = Console(record=True, width=80)
+        recorder = OutputRecorder(console, f'{file_path}', flush_interval=3600)
+        console.push_render_hook(recorder)
+
+        console.print('hello')
+        console.print('world')
+        assert file_path.read_text() == ''
+
+        recorder.close()
+        assert file_path.read_text() == 'hello\nworld\n'
+
+    def test_should_write_output_of_last_print_after_flush_interval(self, tmp_path):
+        file_path = tmp_path / 'file.txt'
+        console = Console(record=True, width=80)
+        recorder = OutputRecorder(console, f'{file_path}', flush_interval=0.05)
+        console.push_render_hook(recorder)
+
+        console.print('hello')
+        deadline = time.monotonic() + 2
+        while file_path.read_text() != 'hello\n' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert file_path.read_text() == 'hello\n'
+
+        recorder.close()
+        assert file_path.read_text() == 'hello\n'
+
+    def test_should_write_complete_html_document(self, tmp_path):
+        file_path = tmp_path / 'file.html'
+        console = Console(record=True, width=80, theme=custom_theme)
+        recorder = HtmlOutputRecorder(console, f'{file_path}', flush_interval=0)
+        console.push_render_hook(recorder)
+
+        console.print('[error]hello')
+        console.print('world')
+        content = file_path.read_text()
+        assert content.startswith('<!DOCTYPE html>')
+        assert 'hello</span>' in content
+        assert '</html>' not in content
+
+        recorder.close()
+        content = file_path.read_text()
+        assert 'world' in content
+        assert content.rstrip().endswith('</html>')
+
+    def test_should_write_valid_svg_document_with_all_chunks(self, tmp_path):
+        file_path = tmp_path / 'file.svg'
+        console = Console(record=True, width=80, theme=custom_theme)
+        recorder = SvgOutputRecorder(console, f'{file_path}', flush_interval=0)
+        console.push_render_hook(recorder)
+
+        console.print('[error]hello world')
+        console.print('foo')
+        console.print('bar\nbaz')
+        recorder.close()
+
+        content = file_path.read_text()
+        root = ET.fromstring(content)
+        assert root.tag == '{http://www.w3.org/2000/svg}svg'
+        assert file_path.name in content
+        assert 'hello&#160;world' in content
+        assert content.count('<g transform="translate(0, ') == 3
+        # four lines of 24.4 pixels plus the paddings and margins
+        assert root.attrib['viewBox'].endswith(f' {4 * 24.4 + 50:g}')
+
+    def test_should_keep_svg_document_valid_after_each_flush(self, tmp_path):
+        file_path = tmp_path / 'file.svg'
+        console = Console(record=True, width=80, theme=custom_theme)
+        recorder = SvgOutputRecorder(console, f'{file_path}', flush_interval=0)
+        console.push_render_hook(recorder)
+
+        console.print('hello')
+        console.print('world')
+        # the first print is flushed by the second one, the file is complete without closing the recorder
+        content = file_path.read_text()
+        root = ET.fromstring(content)
+        assert 'hello' in content
+        assert 'world' not in content
+        assert root.attrib['viewBox'].endswith(f' {24.4 + 50:g}')
+
+        console.print('foo')
+        root = ET.fromstring(file_path.read_text())
+        assert root.attrib['viewBox'].endswith(f' {2 * 24.4 + 50:g}')
+
+        recorder.close()
+        content = file_path.read_text()
+        root = ET.fromstring(content)
+        assert 'foo' in content
+        assert root.attrib['viewBox'].endswith(f' {3 * 24.4 + 50:g}')
+
+    def test_should_write_one_line_terminal_when_nothing_is_recorded(self, tmp_path):
+        file_path = tmp_path / 'file.svg'
+        recorder = SvgOutputRecorder(Console(record=True, width=80), f'{file_path}')
+        recorder.close()
+
+        root = ET.fromstring(file_path.read_text())
+        assert root.attrib['viewBox'].endswith(f' {24.4 + 50:g}')
+
+    def test_should_write_valid_svg_document_before_first_flush(self, tmp_path):
+        file_path = tmp_path / 'file.svg'
+        recorder = SvgOutputRecorder(Console(record=True, width=80), f'{file_path}')
+
+        root = ET.fromstring(file_path.read_text())
+        assert root.attrib['viewBox'].endswith(f' {24.4 + 50:g}')
+        recorder.close()
 
 
 class TestSaveOutput:
@@ -38,7 +196,8 @@ class TestSaveOutput:
         configure_console_recording(console, settings, f'{file_path}')
         console.print('hello world')
 
-        assert not file_path.exists()
+        # the file is written while recording
+        assert file_path.exists()
         save_output(console, f'{file_path}')
 
         assert file_path.exists()
@@ -50,3 +209,12 @@ class TestSaveOutput:
         if file_path.suffix == '.svg':
             assert 'hello&#160;world' in output
             assert file_path.name in output
+
+    @pytest.mark.parametrize('filename', ['file.html', 'file.svg', 'file.txt'])
+    def test_should_save_output_when_recording_was_not_configured_with_a_file(self, tmp_path, filename):
+        file_path = tmp_path / filename
+        console = Console(theme=custom_theme, record=True)
+        console.print('hello world')
+        save_output(console, f'{file_path}')
+
+        assert 'hello' in file_path.read_text()
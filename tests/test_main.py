@@ -0,0 +1,102 @@
+import importlib
+import json
+import subprocess
+import sys
+from typing import List, Set, Tuple
+
+import click
+import pytest
+
+from ws.main import LAZY_COMMANDS, LazyGroup, cli
+
+# time budgets in seconds of a fresh process, they are large enough for slow CI machines while catching an import of
+# all command modules at startup
+HELP_BUDGET = 0.5
+TEXT_BUDGET = 1.5
+# modules which are only needed by commands not involved in the checks below, other than command modules
+HEAVY_MODULES = {'prompt_toolkit', 'pygments', 'ws.utils.lexer'}
+
+STARTUP_SCRIPT = """\
+import json, sys, time
+beginning = time.perf_counter()
+from ws.main import cli
+try:
+    cli(sys.argv[1:])
+except SystemExit:
+    pass
+print(json.dumps({'duration': time.perf_counter() - beginning, 'modules': sorted(sys.modules)}))
+"""
+
+
+def run_cli(*args: str) -> Tuple[float, Set[str]]:
+    """Runs the cli in a fresh interpreter and returns its startup time and the modules imported."""
+    process = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, *args], capture_output=True, text=True, check=True)
+    data = json.loads(process.stdout.splitlines()[-1])
+    return data['duration'], set(data['modules'])
+
+
+def get_top_modules(modules: Set[str]) -> List[str]:
+    return sorted(module for module in modules if module in HEAVY_MODULES or module.split('.')[0] in HEAVY_MODULES)
+
+
+@pytest.mark.parametrize('name', LAZY_COMMANDS)
+def test_should_declare_lazy_command_with_its_real_name_and_short_help(name):
+    import_path, short_help = LAZY_COMMANDS[name]
+    module_name, attribute = import_path.split(':')
+    command = getattr(importlib.import_module(module_name), attribute)
+
+    assert command.name == name
+    assert command.get_short_help_str(limit=1000) == short_help
+
+
+def test_should_load_command_module_only_when_command_is_requested():
+    group = LazyGroup(lazy_commands={'ping': LAZY_COMMANDS['ping']})
+    ctx = click.Context(group)
+
+    assert group.list_commands(ctx) == ['ping']
+    assert group.commands == {}
+    command = group.get_command(ctx, 'ping')
+    assert command.name == 'ping'
+    assert group.commands == {'ping': command}
+    assert group.get_command(ctx, 'pong') is None
+
+
+def test_should_print_lazy_and_regular_commands_in_help(runner):
+    @click.group(cls=LazyGroup, lazy_commands={'text': LAZY_COMMANDS['text']})
+    def group():
+        pass
+
+    @group.command()
+    def hello():
+        """Says hello."""
+
+    result = runner.invoke(group, ['--help'])
+
+    assert result.exit_code == 0
+    assert 'hello  Says hello.\n' in result.output
+    assert 'text   Sends text message on URL endpoint.\n' in result.output
+
+
+def test_should_suggest_lazy_commands_when_command_is_unknown(runner):
+    result = runner.invoke(cli, ['tex'])
+
+    assert result.exit_code == 2
+    assert 'Did you mean one of these?\n    text' in result.output
+
+
+def test_should_print_help_without_importing_commands_within_budget():
+    duration, modules = run_cli('--help')
+
+    assert not [module for module in modules if module.startswith('ws.commands')]
+    assert get_top_modules(modules) == []
+    assert duration < HELP_BUDGET
+
+
+def test_should_run_text_command_without_importing_other_commands_within_budget():
+    # without the message argument, the command exits with a usage error once its module is loaded
+    duration, modules = run_cli('text', 'ws://localhost:1234')
+
+    assert 'ws.commands.text_byte' in modules
+    assert [module for module in modules if module.startswith('ws.commands.')] == ['ws.commands.text_byte']
+    assert get_top_modules(modules) == []
+    assert duration < TEXT_BUDGET
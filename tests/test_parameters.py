@@ -3,7 +3,14 @@ import platform
 import click
 import pytest
 
-from ws.parameters import ByteParamType, HostParamType, TextParamType, WsUrlParamType, get_normalized_message
+from ws.parameters import (
+    ByteParamType,
+    FileMessage,
+    HostParamType,
+    TextParamType,
+    WsUrlParamType,
+    get_normalized_message,
+)
 
 
 class TestWsUrlParamType:
@@ -92,6 +99,14 @@ class TestByteParamType:
 
         assert param.convert(f'file@{dummy_file}', None, None) == value.encode()
 
+    def test_should_return_file_message_given_file_as_input_and_stream_files(self, tmp_path):
+        dummy_file = tmp_path / 'file.txt'
+        dummy_file.write_text('Cameroon is a great country!')
+        param = ByteParamType(stream_files=True)
+
+        assert param.convert(f'file@{dummy_file}', None, None) == FileMessage(f'{dummy_file}', 28, True)
+        assert param.convert('hello', None, None) == b'hello'
+
 
 class TestTextParamType:
     """Tests parameter TextParamType"""
@@ -117,6 +132,14 @@ class TestTextParamType:
 
         assert param.convert(f'file@{dummy_file}', None, None) == text
 
+    def test_should_return_file_message_given_file_as_input_and_stream_files(self, tmp_path):
+        dummy_file = tmp_path / 'file.txt'
+        dummy_file.write_text('Cameroon is a great country!')
+        param = TextParamType(stream_files=True)
+
+        assert param.convert(f'file@{dummy_file}', None, None) == FileMessage(f'{dummy_file}', 28, False)
+        assert param.convert('hello', None, None) == 'hello'
+
 
 class TestHostParamType:
     """Tests parameter HostParamType"""
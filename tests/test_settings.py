@@ -4,7 +4,7 @@ import os
 import pydantic
 import pytest
 
-from ws.settings import ENV_FILE, Settings, get_config_from_toml, get_settings
+from ws.settings import ENV_FILE, Settings, clear_settings_cache, get_config_from_toml, get_settings
 
 
 def test_should_check_default_setting_values(test_console):
@@ -20,6 +20,11 @@ def test_should_check_default_setting_values(test_console):
     assert settings.tls_certificate_file is None
     assert settings.tls_key_file is None
     assert settings.tls_password is None
+    assert settings.compression is False
+    assert settings.compression_client_max_window_bits is None
+    assert settings.compression_server_max_window_bits is None
+    assert settings.compression_client_no_context_takeover is False
+    assert settings.compression_server_no_context_takeover is False
 
 
 def test_should_read_values_from_environment(monkeypatch, tmp_path):
@@ -67,6 +72,15 @@ def test_should_raise_error_when_given_value_is_incorrect(monkeypatch, field):
     assert message in str(exc_info.value)
 
 
+@pytest.mark.parametrize('value', ['8', '16'])
+@pytest.mark.parametrize('field', ['compression_client_max_window_bits', 'compression_server_max_window_bits'])
+def test_should_raise_error_when_window_bits_are_out_of_range(monkeypatch, field, value):
+    monkeypatch.setenv(f'ws_{field}', value)
+
+    with pytest.raises(pydantic.ValidationError):
+        Settings()
+
+
 @pytest.fixture()
 def clean_environment():
     """Helps to have a clean environment for tests."""
@@ -237,3 +251,50 @@ class TestGetSettings:
 
         assert settings.connect_timeout == 4.0  # 4 instead of 2 because local env file has priority
         assert settings.disconnect_timeout == 5.0  # 5 instead of 3 because home env file was never opened
+
+    def test_should_raise_error_when_toml_file_contains_incorrect_value(self, tmp_path, mocker):
+        mocker.patch('pathlib.Path.cwd', return_value=tmp_path)
+        config_file = tmp_path / 'pyproject.toml'
+        config_file.write_text('[tool.ws]\nconnect_timeout=-1\n')
+
+        with pytest.raises(pydantic.ValidationError):
+            get_settings()
+
+    def test_should_read_configuration_only_once(self, tmp_path, mocker):
+        mocker.patch('pathlib.Path.cwd', return_value=tmp_path)
+        config_file = tmp_path / 'pyproject.toml'
+        config_file.write_text('[tool.ws]\nconnect_timeout=3.0\n')
+        toml_mock = mocker.patch('ws.settings.get_config_from_toml', wraps=get_config_from_toml)
+
+        assert get_settings() is get_settings()
+        assert toml_mock.call_count == 1
+
+    def test_should_read_configuration_again_when_cache_is_cleared(self, tmp_path, mocker):
+        mocker.patch('pathlib.Path.cwd', return_value=tmp_path)
+        config_file = tmp_path / 'pyproject.toml'
+        config_file.write_text('[tool.ws]\nconnect_timeout=3.0\n')
+        settings = get_settings()
+        config_file.write_text('[tool.ws]\nconnect_timeout=4.0\n')
+
+        assert get_settings().connect_timeout == 3.0
+        clear_settings_cache()
+        assert get_settings().connect_timeout == 4.0
+        assert settings.connect_timeout == 3.0
+
+    def test_should_apply_overrides_on_a_copy_of_cached_settings(self, tmp_path, mocker):
+        mocker.patch('pathlib.Path.cwd', return_value=tmp_path)
+        config_file = tmp_path / 'pyproject.toml'
+        config_file.write_text('[tool.ws]\nconnect_timeout=3.0\n')
+        toml_mock = mocker.patch('ws.settings.get_config_from_toml', wraps=get_config_from_toml)
+        settings = get_settings(response_timeout=2, compression=True)
+
+        assert settings.connect_timeout == 3.0
+        assert settings.response_timeout == 2.0
+        assert settings.compression is True
+        assert get_settings().response_timeout == 5.0
+        assert get_settings().compression is False
+        assert toml_mock.call_count == 1
+
+    def test_should_raise_error_when_override_is_incorrect(self):
+        with pytest.raises(pydantic.ValidationError):
+            get_settings(response_timeout=0)
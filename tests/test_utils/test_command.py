@@ -0,0 +1,106 @@
+import argparse
+
+import pytest
+from prompt_toolkit.completion import CompleteEvent
+from prompt_toolkit.document import Document
+from rich.console import Console
+
+from ws.settings import get_settings
+from ws.utils.command import CommandContext, CommandRegistry, SessionCommand, command_registry
+
+
+@pytest.fixture()
+def terminal() -> Console:
+    return Console(width=200, color_system=None)
+
+
+@pytest.fixture()
+def context(terminal) -> CommandContext:
+    return CommandContext('ws://localhost:1234', None, terminal, get_settings())
+
+
+def get_echo_command(calls: list) -> SessionCommand:
+    async def handle_echo(context: CommandContext, arguments: argparse.Namespace) -> bool:
+        calls.append(arguments)
+        context.terminal.print(f'{arguments.message} {arguments.count}')
+        return arguments.message == 'bye'
+
+    return SessionCommand(
+        'echo',
+        handle_echo,
+        '• echo <message>: Prints a message.',
+        'Prints the message.',
+        {'message': None, 'count': '1'},
+    )
+
+
+class TestCommandRegistry:
+    """Tests class CommandRegistry"""
+
+    def test_should_register_help_command_by_default(self):
+        assert CommandRegistry().names == ['help']
+
+    def test_should_raise_error_when_command_is_already_registered(self):
+        registry = CommandRegistry()
+        registry.register(get_echo_command([]))
+
+        with pytest.raises(ValueError) as exc_info:
+            registry.register(get_echo_command([]))
+
+        assert str(exc_info.value) == 'session command echo is already registered'
+
+    async def test_should_dispatch_input_to_registered_command_with_default_arguments(self, context, terminal):
+        calls = []
+        registry = CommandRegistry()
+        registry.register(get_echo_command(calls))
+        with terminal.capture() as capture:
+            assert await registry.dispatch(context, 'echo hello') is False
+            assert await registry.dispatch(context, "echo 'bye' 2") is True
+
+        assert capture.get() == 'hello 1\nbye 2\n'
+        assert [(call.message, call.count) for call in calls] == [('hello', '1'), ('bye', '2')]
+
+    @pytest.mark.parametrize(
+        ('user_input', 'message'),
+        [
+            ('echo hello 1 foo', 'Unknown argument: foo\n'),
+            ('echo -h', 'Unknown argument: -h\n'),
+            ('foo', 'Unknown command foo, available commands are:\n• help\n• echo\n'),
+        ],
+    )
+    async def test_should_print_error_when_input_is_not_valid(self, context, terminal, user_input, message):
+        calls = []
+        registry = CommandRegistry()
+        registry.register(get_echo_command(calls))
+        with terminal.capture() as capture:
+            assert await registry.dispatch(context, user_input) is False
+
+        assert message in capture.get()
+        assert calls == []
+
+    async def test_should_print_help_of_registered_commands(self, context, terminal):
+        registry = CommandRegistry()
+        registry.register(get_echo_command([]))
+        with terminal.capture() as capture:
+            await registry.dispatch(context, 'help')
+            await registry.dispatch(context, 'help echo')
+
+        output = capture.get()
+        assert 'The session program lets you interact with a websocket endpoint with the following commands:' in output
+        assert '• echo <message>: Prints a message.\n' in output
+        assert 'Prints the message.' in output
+
+    def test_should_complete_commands_and_help_arguments(self):
+        registry = CommandRegistry()
+        registry.register(get_echo_command([]))
+        completer = registry.get_completer()
+
+        def complete(text: str) -> list:
+            return sorted(completion.text for completion in completer.get_completions(Document(text), CompleteEvent()))
+
+        assert complete('') == ['echo', 'help']
+        assert complete('help ') == ['echo']
+
+
+def test_should_register_session_commands_in_default_registry():
+    assert command_registry.names == ['help', 'ping', 'pong', 'text', 'byte', 'close', 'quit']
@@ -0,0 +1,26 @@
+import pytest
+import trio
+from trio_websocket import ConnectionClosed, open_websocket, serve_websocket
+from wsproto.events import TextMessage
+
+from tests.helpers import server_handler
+from ws.utils.compat import encode_event, send_frame
+
+
+async def test_should_send_encoded_frame(nursery):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    async with open_websocket('localhost', 1234, '/', use_ssl=False) as client:
+        frame = encode_event(client, TextMessage(data='hello')) + encode_event(client, TextMessage(data='world'))
+        await send_frame(client, frame)
+
+        with trio.fail_after(1):
+            assert [await client.get_message(), await client.get_message()] == ['hello', 'world']
+
+
+async def test_should_raise_error_when_connection_is_closed(nursery):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    async with open_websocket('localhost', 1234, '/', use_ssl=False) as client:
+        await client.aclose()
+
+        with pytest.raises(ConnectionClosed):
+            await send_frame(client, b'')
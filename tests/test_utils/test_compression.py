@@ -0,0 +1,133 @@
+import pytest
+import trio
+from trio_websocket import ConnectionClosed, serve_websocket
+
+from ws.client import open_websocket_client
+from ws.commands.echo_server import accept_request
+from ws.settings import Settings
+from ws.utils.compression import (
+    MeasuredPerMessageDeflate,
+    create_compression_extension,
+    print_compression_parameters,
+    print_compression_summary,
+)
+
+
+async def compression_handler(request) -> None:
+    ws = await accept_request(request, MeasuredPerMessageDeflate())
+    while True:
+        try:
+            message = await ws.get_message()
+            await ws.send_message(message)
+        except ConnectionClosed:
+            break
+
+
+class TestCreateCompressionExtension:
+    """Tests function create_compression_extension"""
+
+    def test_should_return_none_when_compression_is_disabled(self):
+        assert create_compression_extension(Settings()) is None
+
+    def test_should_return_extension_configured_with_settings(self):
+        settings = Settings(
+            compression=True,
+            compression_client_max_window_bits=10,
+            compression_server_max_window_bits=12,
+            compression_client_no_context_takeover=True,
+        )
+        extension = create_compression_extension(settings)
+
+        assert isinstance(extension, MeasuredPerMessageDeflate)
+        assert (
+            extension.parameters == 'client_max_window_bits=10; server_max_window_bits=12; client_no_context_takeover'
+        )
+
+    def test_should_return_a_new_extension_each_time(self):
+        settings = Settings(compression=True)
+
+        assert create_compression_extension(settings) is not create_compression_extension(settings)
+
+
+class TestMeasuredPerMessageDeflate:
+    """Tests class MeasuredPerMessageDeflate"""
+
+    def test_should_return_ratio_of_one_when_nothing_is_exchanged(self):
+        extension = MeasuredPerMessageDeflate()
+
+        assert extension.sent_ratio == 1.0
+        assert extension.received_ratio == 1.0
+
+    @pytest.mark.parametrize('message', ['hello' * 1000, b'hello' * 1000])
+    async def test_should_count_sizes_of_compressed_messages(self, nursery, message):
+        await nursery.start(serve_websocket, compression_handler, 'localhost', 1234, None)
+        async with open_websocket_client('ws://localhost:1234', Settings(compression=True)) as client:
+            for _ in range(2):
+                await client.send_message(message)
+                assert await client.get_message() == message
+
+        extension = client.compression
+        assert extension.enabled()
+        assert extension.sent_size == extension.received_size == 2 * len(message)
+        assert extension.sent_compressed_size < 100
+        assert extension.received_compressed_size < 100
+        assert extension.sent_ratio > 50
+        assert extension.received_ratio > 50
+
+    async def test_should_not_be_enabled_when_server_does_not_accept_compression(self, nursery):
+        async def handler(request):
+            ws = await request.accept()
+            await ws.send_message(await ws.get_message())
+
+        await nursery.start(serve_websocket, handler, 'localhost', 1234, None)
+        async with open_websocket_client('ws://localhost:1234', Settings(compression=True)) as client:
+            await client.send_message('foo')
+            assert await client.get_message() == 'foo'
+
+        assert not client.compression.enabled()
+        assert client.compression.sent_size == 0
+
+
+class TestPrintCompressionParameters:
+    """Tests function print_compression_parameters"""
+
+    def test_should_not_print_anything_when_compression_is_disabled(self, test_console):
+        print_compression_parameters(test_console, None)
+
+        assert test_console.file.getvalue() == ''
+
+    def test_should_print_warning_when_compression_is_not_negotiated(self, test_console):
+        print_compression_parameters(test_console, MeasuredPerMessageDeflate())
+
+        assert test_console.file.getvalue() == 'The server did not accept permessage-deflate compression\n'
+
+    def test_should_print_negotiated_parameters(self, test_console):
+        extension = MeasuredPerMessageDeflate()
+        extension.finalize('permessage-deflate; client_max_window_bits=9; server_no_context_takeover')
+        test_console.width = 120
+        print_compression_parameters(test_console, extension)
+
+        assert test_console.file.getvalue() == (
+            'permessage-deflate: client_max_window_bits=9; server_max_window_bits=15; server_no_context_takeover\n'
+        )
+
+
+class TestPrintCompressionSummary:
+    """Tests function print_compression_summary"""
+
+    def test_should_not_print_anything_when_compression_is_not_negotiated(self, test_console):
+        print_compression_summary(test_console, MeasuredPerMessageDeflate())
+
+        assert test_console.file.getvalue() == ''
+
+    def test_should_print_sizes_and_ratios(self, test_console):
+        extension = MeasuredPerMessageDeflate()
+        extension.finalize('permessage-deflate')
+        extension.sent_size, extension.sent_compressed_size = 2048, 512
+        extension.received_size, extension.received_compressed_size = 300, 100
+        test_console.width = 120
+        print_compression_summary(test_console, extension)
+
+        assert test_console.file.getvalue() == (
+            'compression: sent 2.0 KB as 512.0 B (ratio 4.00), received 300.0 B as 100.0 B (ratio 3.00)\n'
+        )
@@ -12,11 +12,32 @@ from ws.utils.io import function_runner, reverse_read_lines, signal_handler, sle
 @pytest.mark.skipif(
     platform.system() == 'Windows', reason="I don't know why I don't have the correct output on windows"
 )
-async def test_should_read_file_in_reverse_order(file_to_read):
-    data = [line.decode() async for line in reverse_read_lines(f'{file_to_read}')][::-1]
+@pytest.mark.parametrize('use_mmap', [True, False])
+@pytest.mark.parametrize('block_size', [1, 7, 64 * 1024])
+async def test_should_read_file_in_reverse_order(file_to_read, block_size, use_mmap):
+    data = [line.decode() async for line in reverse_read_lines(f'{file_to_read}', block_size, use_mmap)][::-1]
     assert '\n'.join(data) == file_to_read.read_text()
 
 
+@pytest.mark.parametrize('use_mmap', [True, False])
+async def test_should_read_lines_longer_than_block_size(tmp_path, use_mmap):
+    file_path = tmp_path / 'file.txt'
+    lines = [b'a' * 100, b'', b'b' * 250, b'c']
+    file_path.write_bytes(b'\n'.join(lines))
+
+    data = [line async for line in reverse_read_lines(f'{file_path}', 16, use_mmap)]
+    assert data == lines[::-1]
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+@pytest.mark.parametrize(('content', 'expected'), [(b'', []), (b'\n', [b'']), (b'\nfoo', [b'foo'])])
+async def test_should_not_return_empty_first_line(tmp_path, use_mmap, content, expected):
+    file_path = tmp_path / 'file.txt'
+    file_path.write_bytes(content)
+
+    assert [line async for line in reverse_read_lines(f'{file_path}', 4, use_mmap)] == expected
+
+
 async def test_should_run_and_kill_given_function_task(autojump_clock, capsys, signal_message):
     records = []
 
@@ -0,0 +1,83 @@
+import pytest
+import trio
+
+from ws.utils.metrics import Histogram, format_histogram, format_metric, serve_metrics
+
+
+class TestHistogram:
+    """Tests class Histogram"""
+
+    def test_should_count_values_in_the_first_bucket_greater_or_equal_to_them(self):
+        histogram = Histogram([10, 1, 100])
+        for value in [0.5, 1, 5, 10, 50, 1000]:
+            histogram.observe(value)
+
+        assert histogram.buckets == (1, 10, 100)
+        assert histogram.counts == [2, 2, 1, 1]
+        assert histogram.count == 6
+        assert histogram.sum == 1066.5
+
+
+def test_should_format_counter_metric():
+    assert format_metric('requests_total', 'counter', 'Requests received.', 3) == [
+        '# HELP requests_total Requests received.',
+        '# TYPE requests_total counter',
+        'requests_total 3',
+    ]
+
+
+def test_should_format_histogram_with_cumulative_counts():
+    histogram = Histogram([0.1, 1])
+    for value in [0.05, 0.5, 0.7, 2]:
+        histogram.observe(value)
+
+    assert format_histogram('latency_seconds', 'Latency.', histogram) == [
+        '# HELP latency_seconds Latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        'latency_seconds_sum 3.25',
+        'latency_seconds_count 4',
+    ]
+
+
+async def send_request(port: int, request: bytes) -> str:
+    stream = await trio.open_tcp_stream('localhost', port)
+    async with stream:
+        await stream.send_all(request)
+        data = b''
+        while True:
+            chunk = await stream.receive_some()
+            if not chunk:
+                break
+            data += chunk
+    return data.decode()
+
+
+class TestServeMetrics:
+    """Tests function serve_metrics"""
+
+    @pytest.mark.parametrize('path', ['/metrics', '/metrics?name=foo'])
+    async def test_should_return_rendered_metrics_on_metrics_path(self, nursery, path):
+        await nursery.start(serve_metrics, 'localhost', 9464, lambda: 'foo 1\n')
+        response = await send_request(9464, f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+
+        assert response == (
+            'HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\nContent-Length: 6\r\n'
+            'Connection: close\r\n\r\nfoo 1\n'
+        )
+
+    @pytest.mark.parametrize(
+        ('request_data', 'status'),
+        [
+            (b'GET / HTTP/1.1\r\n\r\n', '404 Not Found'),
+            (b'POST /metrics HTTP/1.1\r\n\r\n', '405 Method Not Allowed'),
+            (b'hello\r\n\r\n', '400 Bad Request'),
+        ],
+    )
+    async def test_should_return_error_status_when_request_is_not_a_scrape(self, nursery, request_data, status):
+        await nursery.start(serve_metrics, 'localhost', 9464, lambda: 'foo 1\n')
+        response = await send_request(9464, request_data)
+
+        assert response.startswith(f'HTTP/1.1 {status}\r\n')
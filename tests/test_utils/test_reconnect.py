@@ -0,0 +1,142 @@
+import pytest
+import trio
+from trio_websocket import (
+    CloseReason,
+    ConnectionClosed,
+    ConnectionRejected,
+    ConnectionTimeout,
+    DisconnectionTimeout,
+    HandshakeError,
+    WebSocketConnection,
+    serve_websocket,
+)
+
+from tests.helpers import server_handler
+from ws.utils.reconnect import (
+    ReconnectStatistics,
+    describe_connection_error,
+    get_backoff_delay,
+    print_reconnect_summary,
+    run_websocket_client,
+    run_with_reconnection,
+)
+
+
+@pytest.mark.parametrize(('attempt', 'maximum'), [(1, 0.5), (2, 1.0), (3, 2.0), (10, 30.0), (100, 30.0)])
+def test_should_return_jittered_exponential_delay(attempt, maximum):
+    delays = [get_backoff_delay(attempt) for _ in range(100)]
+
+    assert all(maximum / 2 <= delay <= maximum for delay in delays)
+    assert len(set(delays)) > 1
+
+
+async def send_hello(client: WebSocketConnection) -> None:
+    await client.send_message('hello')
+    assert await client.get_message() == 'hello'
+
+
+class TestRunWithReconnection:
+    """Tests function run_with_reconnection"""
+
+    async def test_should_return_when_handler_returns(self, nursery, capsys):
+        statistics = ReconnectStatistics()
+        await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+        await run_with_reconnection('ws://localhost:1234', send_hello, 3, statistics)
+
+        assert statistics.reconnections == 0
+        assert statistics.failed_attempts == 0
+        assert capsys.readouterr().out == ''
+
+    async def test_should_raise_last_error_after_max_attempts(self, capsys, autojump_clock):
+        statistics = ReconnectStatistics()
+        with pytest.raises(HandshakeError):
+            await run_with_reconnection('ws://localhost:1234', send_hello, 3, statistics)
+
+        output = capsys.readouterr().out
+        assert statistics.failed_attempts == 4
+        assert output.count('Connection to ws://localhost:1234 failed') == 3
+        assert 'attempt 3/3' in output
+        assert 'Unable to reconnect to ws://localhost:1234 after 3 attempt(s)' in output
+
+    async def test_should_reconnect_when_connection_is_lost(self, nursery, capsys, monkeypatch):
+        monkeypatch.setattr('ws.utils.reconnect.BACKOFF_BASE', 0.01)
+        connections = []
+
+        async def handler(client: WebSocketConnection) -> None:
+            connections.append(client)
+            if len(connections) < 3:
+                await client.aclose()
+                await client.get_message()
+
+        statistics = ReconnectStatistics()
+        await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+        await run_with_reconnection('ws://localhost:1234', handler, 3, statistics)
+
+        assert len(connections) == 3
+        assert statistics.reconnections == 2
+        assert statistics.failed_attempts == 0
+        assert statistics.disconnected_at is None
+        assert statistics.downtimes.count == statistics.reconnect_times.count == 2
+        assert statistics.total_downtime > 0
+        assert capsys.readouterr().out.count('Connection to ws://localhost:1234 lost (ConnectionClosed)') == 2
+
+    async def test_should_print_connection_timings_of_each_attempt(self, capsys, monkeypatch):
+        # the autojump clock is not used, since it would jump to the connect timeout during the dns resolution thread
+        monkeypatch.setattr('ws.utils.reconnect.BACKOFF_BASE', 0.01)
+        statistics = ReconnectStatistics()
+        with pytest.raises(HandshakeError):
+            await run_with_reconnection('ws://localhost:1234', send_hello, 2, statistics, with_timings=True)
+
+        output = capsys.readouterr().out
+        assert output.count('--- ws://localhost:1234 connection timings ---') == 3
+        assert output.count('tcp = not completed after') == 3
+
+
+async def test_should_run_handler_once_without_max_attempts(nursery):
+    await nursery.start(serve_websocket, server_handler, 'localhost', 1234, None)
+    await run_websocket_client('ws://localhost:1234', send_hello)
+
+
+async def test_should_raise_connection_error_without_max_attempts():
+    with pytest.raises(HandshakeError):
+        await run_websocket_client('ws://localhost:1234', send_hello)
+
+
+@pytest.mark.parametrize(
+    ('error', 'description'),
+    [
+        (
+            ConnectionClosed(CloseReason(1000, None)),
+            'connection closed by the endpoint with code 1000 (NORMAL_CLOSURE)',
+        ),
+        (ConnectionRejected(403, [], b''), 'connection rejected with status code 403'),
+        (ConnectionTimeout(), 'unable to connect on time'),
+        (DisconnectionTimeout(), 'unable to disconnect on time'),
+        (OSError('foo'), 'unable to connect (foo)'),
+    ],
+)
+def test_should_describe_connection_error(error, description):
+    assert describe_connection_error(error) == description
+
+
+def test_should_describe_cause_of_handshake_error():
+    try:
+        raise HandshakeError from ConnectionRefusedError(111, 'Connection refused')
+    except HandshakeError as e:
+        assert describe_connection_error(e) == 'unable to connect ([Errno 111] Connection refused)'
+
+
+async def test_should_include_current_disconnection_in_total_downtime(autojump_clock):
+    statistics = ReconnectStatistics(total_downtime=1.0, disconnected_at=trio.current_time())
+    await trio.sleep(2)
+
+    assert statistics.get_total_downtime() == pytest.approx(3.0)
+
+
+def test_should_print_summary_without_latencies_when_there_is_no_reconnection(test_console):
+    print_reconnect_summary(test_console, 'ws://localhost:1234', ReconnectStatistics(failed_attempts=2))
+    output = test_console.file.getvalue()
+
+    assert '--- ws://localhost:1234 reconnect statistics ---\n' in output
+    assert '0 reconnections, 2 failed attempts, total downtime 0.000s\n' in output
+    assert 'min/avg/max' not in output
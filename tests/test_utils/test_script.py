@@ -0,0 +1,67 @@
+import pytest
+from rich.console import Console
+
+from ws.utils.command import Command
+from ws.utils.script import ScriptError, ScriptStep, parse_script, print_script_report
+
+
+class TestParseScript:
+    """Tests function parse_script"""
+
+    def test_should_return_steps_and_ignore_empty_lines_and_comments(self):
+        lines = [
+            '# greetings\n',
+            'text hello\n',
+            '\n',
+            'byte "hello world"\n',
+            'ping\n',
+            'pong foo\n',
+            'close 1001 bye\n',
+        ]
+        steps = parse_script(lines)
+
+        assert steps == [
+            ScriptStep(2, Command.TEXT, 'hello'),
+            ScriptStep(4, Command.BYTE, b'hello world'),
+            ScriptStep(5, Command.PING),
+            ScriptStep(6, Command.PONG, b'foo'),
+            ScriptStep(7, Command.CLOSE, code=1001, reason='bye'),
+        ]
+
+    def test_should_drop_trailing_quit_command(self):
+        assert parse_script(['text hello', 'quit']) == [ScriptStep(1, Command.TEXT, 'hello')]
+
+    @pytest.mark.parametrize(
+        ('lines', 'message'),
+        [
+            (['text hello', 'help'], 'line 2: unknown command help, available commands are text, byte, ping, pong'),
+            (['foo'], 'line 1: unknown command foo'),
+            (['text'], 'line 1: '),
+            (['close 1000', 'text hello'], 'line 2: no command can follow close'),
+            (['quit', 'ping'], 'line 2: no command can follow quit'),
+        ],
+    )
+    def test_should_raise_error_when_a_line_is_not_valid(self, lines, message):
+        with pytest.raises(ScriptError) as exc_info:
+            parse_script(lines)
+
+        assert str(exc_info.value).startswith(message)
+
+
+def test_should_print_duration_or_status_of_each_step():
+    terminal = Console(width=200, color_system=None)
+    steps = [
+        ScriptStep(1, Command.TEXT, 'hello', duration=0.001),
+        ScriptStep(2, Command.PING, error='no pong'),
+        ScriptStep(3, Command.CLOSE),
+    ]
+    with terminal.capture() as capture:
+        print_script_report(terminal, steps, 1.5)
+
+    assert capture.get() == (
+        '--- script timings ---\n'
+        'line 1 text 5.0 B = 1.000 ms\n'
+        'line 2 ping 4.0 B = no pong\n'
+        'line 3 close 1000 = not run\n'
+        'total = 1500.000 ms\n'
+    )
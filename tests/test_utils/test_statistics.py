@@ -0,0 +1,62 @@
+import statistics
+
+import pytest
+
+from ws.utils.statistics import LatencyHistogram
+
+
+class TestLatencyHistogram:
+    """Tests class LatencyHistogram"""
+
+    @pytest.mark.parametrize('significant_digits', [0, 6])
+    def test_should_raise_error_when_significant_digits_is_out_of_range(self, significant_digits):
+        with pytest.raises(ValueError) as exc_info:
+            LatencyHistogram(significant_digits=significant_digits)
+
+        assert 'significant_digits must be between 1 and 5' == str(exc_info.value)
+
+    def test_should_return_zero_values_when_nothing_is_recorded(self):
+        histogram = LatencyHistogram()
+
+        assert histogram.count == 0
+        assert histogram.min == histogram.max == histogram.mean == histogram.stddev == 0
+        assert histogram.percentile(50) == 0
+
+    def test_should_compute_exact_min_max_mean_and_stddev(self):
+        values = [0.001, 0.002, 0.004, 0.010, 0.250]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        assert histogram.count == 5
+        assert histogram.min == 0.001
+        assert histogram.max == 0.250
+        assert histogram.mean == pytest.approx(statistics.mean(values))
+        assert histogram.stddev == pytest.approx(statistics.pstdev(values))
+
+    def test_should_compute_percentiles_within_given_precision(self):
+        histogram = LatencyHistogram(significant_digits=3)
+        # values from 1ms to 10s
+        for value in range(1, 10_001):
+            histogram.record(value / 1000)
+
+        for percentile in (50, 90, 99, 99.9):
+            expected = percentile / 100 * 10
+            assert histogram.percentile(percentile) == pytest.approx(expected, rel=1e-3)
+        assert histogram.percentile(100) == 10
+
+    def test_should_clamp_values_greater_than_highest_trackable_value(self):
+        histogram = LatencyHistogram(highest_trackable_value=1)
+        histogram.record(5)
+
+        assert histogram.max == 1
+        assert histogram.percentile(99) == 1
+
+    def test_should_not_grow_with_the_number_of_recorded_values(self):
+        histogram = LatencyHistogram()
+        size = len(histogram._counts)
+        for value in range(100_000):
+            histogram.record(value / 1_000)
+
+        assert len(histogram._counts) == size
+        assert histogram.count == 100_000
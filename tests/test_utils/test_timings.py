@@ -0,0 +1,59 @@
+import pytest
+import trio
+
+from ws.utils.timings import ConnectionTimings, measure, print_connection_timings
+
+
+class TestConnectionTimings:
+    """Tests class ConnectionTimings"""
+
+    async def test_should_record_duration_of_measured_phase(self, autojump_clock):
+        timings = ConnectionTimings()
+        with timings.measure('dns'):
+            await trio.sleep(0.5)
+
+        assert timings.durations == {'dns': 0.5}
+        assert timings.pending_phase is None
+
+    async def test_should_keep_phase_pending_when_it_fails(self, autojump_clock):
+        timings = ConnectionTimings()
+        with pytest.raises(OSError), timings.measure('tcp'):
+            await trio.sleep(0.25)
+            raise OSError('connection refused')
+        await trio.sleep(0.25)
+
+        assert timings.durations == {}
+        assert timings.pending_phase == ('tcp', 0.5)
+
+    def test_should_not_measure_anything_when_timings_are_not_requested(self):
+        with measure(None, 'dns'):
+            pass
+
+
+class TestPrintConnectionTimings:
+    """Tests function print_connection_timings"""
+
+    def test_should_print_measured_phases_in_connection_order(self, test_console):
+        timings = ConnectionTimings()
+        timings.durations = {'close': 0.0005, 'upgrade': 0.002, 'tcp': 0.001234, 'dns': 0.0001}
+        print_connection_timings(test_console, 'ws://localhost:1234', timings)
+
+        assert test_console.file.getvalue() == (
+            '--- ws://localhost:1234 connection timings ---\n'
+            'dns = 0.100 ms\n'
+            'tcp = 1.234 ms\n'
+            'upgrade = 2.000 ms\n'
+            'close = 0.500 ms\n'
+        )
+
+    async def test_should_print_phase_which_did_not_complete(self, test_console, autojump_clock):
+        timings = ConnectionTimings()
+        with timings.measure('dns'):
+            await trio.sleep(0.001)
+        with pytest.raises(trio.TooSlowError), trio.fail_after(2), timings.measure('tls'):
+            await trio.sleep(3)
+        print_connection_timings(test_console, 'wss://localhost:1234', timings)
+
+        output = test_console.file.getvalue()
+        assert 'dns = 1.000 ms\n' in output
+        assert 'tls = not completed after 2000.000 ms\n' in output
@@ -0,0 +1,76 @@
+import ssl
+
+from ws.utils.tls import TlsHandshakeStatistics, TlsSessionCache, print_tls_summary
+
+
+class TestTlsSessionCache:
+    """Tests class TlsSessionCache"""
+
+    def test_should_return_none_when_there_is_no_session_for_the_server(self):
+        assert TlsSessionCache().get(ssl.create_default_context(), 'localhost', 443) is None
+
+    def test_should_return_session_of_the_server_created_with_the_same_context(self, mocker):
+        context, other_context = ssl.create_default_context(), ssl.create_default_context()
+        session = mocker.Mock(spec=ssl.SSLSession)
+        cache = TlsSessionCache()
+        cache.set(context, 'localhost', 443, session)
+
+        assert cache.get(context, 'localhost', 443) is session
+        assert cache.get(context, 'localhost', 8443) is None
+        assert cache.get(other_context, 'localhost', 443) is None
+
+    def test_should_not_replace_session_by_none(self, mocker):
+        context = ssl.create_default_context()
+        session = mocker.Mock(spec=ssl.SSLSession)
+        cache = TlsSessionCache()
+        cache.set(context, 'localhost', 443, session)
+        cache.set(context, 'localhost', 443, None)
+
+        assert cache.get(context, 'localhost', 443) is session
+
+    def test_should_forget_sessions_when_cleared(self, mocker):
+        context = ssl.create_default_context()
+        cache = TlsSessionCache()
+        cache.set(context, 'localhost', 443, mocker.Mock(spec=ssl.SSLSession))
+        cache.clear()
+
+        assert cache.get(context, 'localhost', 443) is None
+
+
+class TestTlsHandshakeStatistics:
+    """Tests class TlsHandshakeStatistics"""
+
+    def test_should_record_handshakes_in_the_histogram_of_their_kind(self):
+        statistics = TlsHandshakeStatistics()
+        statistics.record(0.01, is_resumed=False)
+        statistics.record(0.002, is_resumed=True)
+        statistics.record(0.003, is_resumed=True)
+
+        assert statistics.full_handshakes.count == 1
+        assert statistics.resumed_handshakes.count == 2
+
+    def test_should_not_record_anything_when_connection_does_not_use_tls(self):
+        statistics = TlsHandshakeStatistics()
+        statistics.record(None, is_resumed=False)
+
+        assert statistics.full_handshakes.count == statistics.resumed_handshakes.count == 0
+
+
+def test_should_not_print_tls_summary_when_there_is_no_handshake(test_console):
+    print_tls_summary(test_console, TlsHandshakeStatistics())
+
+    assert test_console.file.getvalue() == ''
+
+
+def test_should_print_tls_summary_with_full_and_resumed_handshakes(test_console):
+    statistics = TlsHandshakeStatistics()
+    statistics.record(0.01, is_resumed=False)
+    statistics.record(0.002, is_resumed=True)
+    statistics.record(0.002, is_resumed=True)
+    statistics.record(0.002, is_resumed=True)
+    print_tls_summary(test_console, statistics)
+    lines = test_console.file.getvalue().splitlines()
+
+    assert lines[0] == 'tls handshakes: 1 full, 3 resumed (75.0% resumption rate)'
+    assert lines[1] == 'full handshake min/avg/max/stddev = 10.000/10.000/10.000/0.000 ms'
+    assert lines[3] == 'resumed handshake min/avg/max/stddev = 2.000/2.000/2.000/0.000 ms'
@@ -0,0 +1,79 @@
+import platform
+
+import pytest
+import trio
+
+from ws.utils import watcher as watcher_module
+from ws.utils.watcher import InotifyWatcher, PollingWatcher, watch_file
+
+linux_only = pytest.mark.skipif(watcher_module._libc is None, reason='inotify is only available on linux')
+
+
+async def append_later(file_path, data: str, delay: float = 0.2) -> None:
+    await trio.sleep(delay)
+    with file_path.open('a') as f:
+        f.write(data)
+
+
+class TestPollingWatcher:
+    """Tests class PollingWatcher"""
+
+    async def test_should_return_when_file_size_differs_from_position(self, nursery, file_to_read):
+        watcher = PollingWatcher(f'{file_to_read}', interval=0.01)
+        nursery.start_soon(append_later, file_to_read, 'hello\n')
+
+        with trio.fail_after(2):
+            await watcher.wait(file_to_read.stat().st_size)
+
+    async def test_should_return_immediately_when_file_already_changed(self, file_to_read):
+        watcher = PollingWatcher(f'{file_to_read}', interval=0.01)
+
+        with trio.fail_after(1):
+            await watcher.wait(0)
+
+
+@linux_only
+class TestInotifyWatcher:
+    """Tests class InotifyWatcher"""
+
+    def test_should_raise_error_when_file_does_not_exist(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            InotifyWatcher(f'{tmp_path / "foo.txt"}', watcher_module._libc)
+
+    async def test_should_return_when_file_is_modified(self, nursery, file_to_read):
+        watcher = InotifyWatcher(f'{file_to_read}', watcher_module._libc)
+        nursery.start_soon(append_later, file_to_read, 'hello\n')
+        try:
+            with trio.fail_after(2):
+                await watcher.wait(file_to_read.stat().st_size)
+        finally:
+            watcher.close()
+
+    async def test_should_wait_while_file_is_not_modified(self, file_to_read):
+        watcher = InotifyWatcher(f'{file_to_read}', watcher_module._libc)
+        try:
+            with trio.move_on_after(0.3) as scope:
+                await watcher.wait(file_to_read.stat().st_size)
+        finally:
+            watcher.close()
+
+        assert scope.cancelled_caught
+
+
+class TestWatchFile:
+    """Tests function watch_file"""
+
+    @linux_only
+    async def test_should_return_inotify_watcher_on_linux(self, file_to_read):
+        with watch_file(f'{file_to_read}') as watcher:
+            assert isinstance(watcher, InotifyWatcher)
+
+    def test_should_return_polling_watcher_when_inotify_is_not_available(self, monkeypatch, file_to_read):
+        monkeypatch.setattr(watcher_module, '_libc', None)
+        with watch_file(f'{file_to_read}') as watcher:
+            assert isinstance(watcher, PollingWatcher)
+
+    @pytest.mark.skipif(platform.system() == 'Windows', reason='the file is removed before being watched')
+    def test_should_return_polling_watcher_when_inotify_fails(self, tmp_path):
+        with watch_file(f'{tmp_path / "foo.txt"}') as watcher:
+            assert isinstance(watcher, PollingWatcher)
@@ -0,0 +1,103 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from ws.utils.workers import WorkerSupervisor
+
+
+def report_index(index, results):
+    results.put(index)
+
+
+def report_large_result(index, results):
+    results.put(str(index) * 256 * 1024)
+
+
+def crash_once(index, marker, results):
+    if not marker.exists():
+        marker.touch()
+        time.sleep(0.1)
+        raise SystemExit(3)
+    results.put(index)
+
+
+def crash_at_start(index, results):
+    if index == 1:
+        raise SystemExit(1)
+    time.sleep(30)
+    results.put(index)
+
+
+def stop_supervisor(index, directory, results):
+    signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGTERM])
+    (directory / f'{index}.ready').touch()
+    if index == 1:
+        # the supervisor is stopped once all workers wait for the signal
+        while len(list(directory.glob('*.ready'))) < 2:
+            time.sleep(0.01)
+        os.kill(os.getppid(), signal.SIGTERM)
+    signal.sigwait([signal.SIGTERM])
+    results.put(index)
+
+
+class TestWorkerSupervisor:
+    """Tests class WorkerSupervisor"""
+
+    def test_should_return_results_of_all_workers(self):
+        supervisor = WorkerSupervisor(report_index, (), 3)
+
+        assert sorted(supervisor.run()) == [1, 2, 3]
+        assert supervisor.exit_code == 0
+
+    def test_should_read_results_larger_than_the_pipe_buffer_while_workers_run(self):
+        supervisor = WorkerSupervisor(report_large_result, (), 3)
+
+        # without reading, the workers would wait forever for room in the pipe, and the supervisor for their exit
+        assert sorted(supervisor.run()) == ['1' * 256 * 1024, '2' * 256 * 1024, '3' * 256 * 1024]
+
+    def test_should_restart_worker_which_crashes(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.setattr('ws.utils.workers.MIN_UPTIME', 0.0)
+        supervisor = WorkerSupervisor(crash_once, (tmp_path / 'marker',), 1)
+
+        assert supervisor.run() == [1]
+        assert supervisor.exit_code == 0
+        assert capsys.readouterr().out == 'Worker 1 exited with code 3, restarting it\n'
+
+    def test_should_stop_all_workers_when_a_worker_crashes_right_after_its_start(self, capsys):
+        supervisor = WorkerSupervisor(crash_at_start, (), 2)
+        beginning = time.monotonic()
+
+        assert supervisor.run() == []
+        assert supervisor.exit_code == 1
+        assert time.monotonic() - beginning < 10
+        assert capsys.readouterr().out == 'Worker 1 exited with code 1 right after its start\n'
+
+    @pytest.mark.skipif(not hasattr(signal, 'pthread_sigmask'), reason='signals are not supported on this platform')
+    def test_should_forward_termination_signal_to_workers(self, tmp_path, capsys):
+        previous_handler = signal.getsignal(signal.SIGTERM)
+        supervisor = WorkerSupervisor(stop_supervisor, (tmp_path,), 2)
+
+        assert sorted(supervisor.run()) == [1, 2]
+        assert supervisor.exit_code == 0
+        assert capsys.readouterr().out == 'Program was interrupted by SIGTERM, good bye! 👋\n'
+        assert signal.getsignal(signal.SIGTERM) is previous_handler
+
+    @pytest.mark.skipif(not hasattr(signal, 'pthread_sigmask'), reason='signals are not supported on this platform')
+    def test_should_forward_termination_signal_received_by_another_thread(self, tmp_path, capsys):
+        stopped = threading.Event()
+        thread = threading.Thread(target=stopped.wait)
+        thread.start()
+        # the main thread blocks the signal, so that it is received by the other thread
+        signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGTERM])
+        try:
+            supervisor = WorkerSupervisor(stop_supervisor, (tmp_path,), 2)
+
+            assert sorted(supervisor.run()) == [1, 2]
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, [signal.SIGTERM])
+            stopped.set()
+            thread.join()
+        assert capsys.readouterr().out == 'Program was interrupted by SIGTERM, good bye! 👋\n'
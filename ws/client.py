@@ -1,19 +1,33 @@
 import contextlib
+import functools
 import ssl
-from typing import Optional
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
 
 import certifi
 import pydantic
+import trio
+from rich.console import Console
 from trio_websocket import (
     ConnectionRejected,
     ConnectionTimeout,
     DisconnectionTimeout,
+    HandshakeError,
     WebSocketConnection,
-    open_websocket_url,
 )
+from wsproto import ConnectionType, WSConnection
 
 from ws.console import console
-from ws.settings import get_settings
+from ws.settings import Settings, get_settings
+from ws.utils.compat import add_request_extensions, open_client_handshake
+from ws.utils.compression import (
+    MeasuredPerMessageDeflate,
+    create_compression_extension,
+    print_compression_parameters,
+    print_compression_summary,
+)
+from ws.utils.timings import ConnectionTimings, measure, print_connection_timings
+from ws.utils.tls import tls_session_cache
 
 
 def get_client_ssl_context(
@@ -66,42 +80,212 @@ def get_client_ssl_context(
     return context
 
 
+# contexts are created once per process, loading CA and certificate files is expensive and TLS sessions can only be
+# resumed with the context which created them
+_ssl_contexts: Dict[Tuple[Optional[str], ...], Optional[ssl.SSLContext]] = {}
+
+
+def get_cached_client_ssl_context(settings: Settings) -> Optional[ssl.SSLContext]:
+    key = tuple(
+        None if value is None else str(value)
+        for value in (settings.tls_ca_file, settings.tls_certificate_file, settings.tls_key_file, settings.tls_password)
+    )
+    if key not in _ssl_contexts:
+        _ssl_contexts[key] = get_client_ssl_context(
+            ca_file=settings.tls_ca_file,
+            certificate=settings.tls_certificate_file,
+            keyfile=settings.tls_key_file,
+            password=settings.tls_password,
+        )
+    return _ssl_contexts[key]
+
+
+@functools.lru_cache(maxsize=None)
+def get_default_ssl_context() -> ssl.SSLContext:
+    return ssl.create_default_context()
+
+
+def clear_tls_caches() -> None:
+    """Forgets SSL contexts and TLS sessions, the next connections will do a full handshake."""
+    _ssl_contexts.clear()
+    get_default_ssl_context.cache_clear()
+    tls_session_cache.clear()
+
+
+class WebSocketClient(WebSocketConnection):
+    """
+    A client connection which can offer permessage-deflate compression to the server. trio-websocket does not
+    support extensions, so they are added to the opening handshake request before it is sent by the reader task.
+    The duration of the TLS handshake and whether the TLS session was resumed are kept for statistics.
+    """
+
+    def __init__(
+        self,
+        stream: trio.abc.Stream,
+        *,
+        host: str,
+        path: str,
+        extra_headers: Optional[List[Tuple[str, str]]] = None,
+        message_queue_size: int = 1,
+        max_message_size: int = 1024 * 1024,
+        compression: Optional[MeasuredPerMessageDeflate] = None,
+    ):
+        super().__init__(
+            stream,
+            WSConnection(ConnectionType.CLIENT),
+            host=host,
+            path=path,
+            client_extra_headers=extra_headers,
+            message_queue_size=message_queue_size,
+            max_message_size=max_message_size,
+        )
+        self.compression = compression
+        self.tls_handshake_time: Optional[float] = None
+        self.is_tls_session_resumed = False
+        if compression is not None:
+            add_request_extensions(self, [compression])
+
+
+def get_url_parts(url: str) -> Tuple[str, int, str, bool]:
+    """Returns the host, port, resource and whether TLS is used, like trio-websocket does."""
+    parts = urllib.parse.urlsplit(url)
+    is_secure = parts.scheme == 'wss'
+    port = parts.port if parts.port is not None else (443 if is_secure else 80)
+    resource = parts.path or '/'
+    if parts.query:
+        resource += f'?{parts.query}'
+    return parts.hostname, port, resource, is_secure
+
+
+async def open_tcp_stream(host: str, port: int, timings: Optional[ConnectionTimings] = None) -> trio.SocketStream:
+    """
+    Opens a TCP connection. When timings are requested, the name is resolved before connecting to measure both steps,
+    and resolved addresses are tried one after the other instead of using the happy eyeballs algorithm of trio.
+    """
+    if timings is None:
+        return await trio.open_tcp_stream(host, port)
+
+    with timings.measure('dns'):
+        addresses = await trio.socket.getaddrinfo(host, port, type=trio.socket.SOCK_STREAM)
+
+    with timings.measure('tcp'):
+        for index, (*_, address) in enumerate(addresses):
+            try:
+                return await trio.open_tcp_stream(address[0], port)
+            except OSError:
+                if index == len(addresses) - 1:
+                    raise
+
+
+async def connect_websocket_client(
+    nursery: trio.Nursery,
+    url: str,
+    settings: Settings,
+    ssl_context: Optional[ssl.SSLContext] = None,
+    timings: Optional[ConnectionTimings] = None,
+) -> WebSocketClient:
+    host, port, resource, is_secure = get_url_parts(url)
+    stream = await open_tcp_stream(host, port, timings)
+    tls_handshake_time = None
+    if is_secure:
+        ssl_context = get_default_ssl_context() if ssl_context is None else ssl_context
+        stream = trio.SSLStream(stream, ssl_context, server_hostname=host, https_compatible=True)
+        session = tls_session_cache.get(ssl_context, host, port)
+        if session is not None:
+            stream.session = session
+        beginning = trio.current_time()
+        try:
+            with measure(timings, 'tls'):
+                await stream.do_handshake()
+        except BaseException:
+            await trio.aclose_forcefully(stream)
+            raise
+        tls_handshake_time = trio.current_time() - beginning
+
+    client = WebSocketClient(
+        stream,
+        host=host if port in (80, 443) else f'{host}:{port}',
+        path=resource,
+        extra_headers=settings.extra_headers,
+        message_queue_size=settings.message_queue_size,
+        max_message_size=settings.max_message_size,
+        compression=create_compression_extension(settings),
+    )
+    client.tls_handshake_time = tls_handshake_time
+    if is_secure:
+        client.is_tls_session_resumed = stream.session_reused
+    with measure(timings, 'upgrade'):
+        await open_client_handshake(nursery, client)
+    # with TLS 1.3, the session ticket is sent by the server after the handshake, it is received with the upgrade response
+    if is_secure:
+        tls_session_cache.set(ssl_context, host, port, stream.session)
+    return client
+
+
+@contextlib.asynccontextmanager
+async def open_websocket_client(
+    url: str, settings: Settings, timings: Optional[ConnectionTimings] = None
+) -> WebSocketClient:
+    """
+    Opens a websocket connection configured with the given settings, connection errors are left to the caller.
+    Errors are the same as the ones raised by trio_websocket.open_websocket_url. When timings are given, the duration
+    of each step of the connection is recorded in it.
+    """
+    ssl_context = get_cached_client_ssl_context(settings)
+
+    async with trio.open_nursery() as nursery:
+        try:
+            with trio.fail_after(settings.connect_timeout):
+                client = await connect_websocket_client(nursery, url, settings, ssl_context, timings)
+        except trio.TooSlowError:
+            raise ConnectionTimeout from None
+        except OSError as e:
+            raise HandshakeError from e
+
+        try:
+            yield client
+        finally:
+            try:
+                with trio.fail_after(settings.disconnect_timeout), measure(timings, 'close'):
+                    await client.aclose()
+            except trio.TooSlowError:
+                raise DisconnectionTimeout from None
+
+
 @contextlib.asynccontextmanager
-async def websocket_client(url: str) -> WebSocketConnection:
+async def websocket_client(url: str, with_timings: bool = False, terminal: Console = console) -> WebSocketClient:
+    """
+    Opens a websocket connection and exits the program with a message when it fails. With timings, the duration of
+    each step of the connection is printed when it is closed, or when it fails. Messages are printed on the terminal.
+    """
     try:
         settings = get_settings()
     except pydantic.ValidationError as e:
-        console.print(f'[error]{e}')
+        terminal.print(f'[error]{e}')
         raise SystemExit(1) from None
 
-    arguments = {
-        'connect_timeout': settings.connect_timeout,
-        'disconnect_timeout': settings.disconnect_timeout,
-        'message_queue_size': settings.message_queue_size,
-        'max_message_size': settings.max_message_size,
-        'extra_headers': settings.extra_headers,
-    }
-    ssl_context = get_client_ssl_context(
-        ca_file=settings.tls_ca_file,
-        certificate=settings.tls_certificate_file,
-        keyfile=settings.tls_key_file,
-        password=settings.tls_password,
-    )
-
+    timings = ConnectionTimings() if with_timings else None
     try:
-        async with open_websocket_url(url, ssl_context=ssl_context, **arguments) as ws:
-            yield ws
+        async with open_websocket_client(url, settings, timings) as ws:
+            print_compression_parameters(terminal, ws.compression)
+            try:
+                yield ws
+            finally:
+                print_compression_summary(terminal, ws.compression)
     except ConnectionTimeout:
-        console.print(f'[error]Unable to connect to {url}')
+        terminal.print(f'[error]Unable to connect to {url}')
         raise SystemExit(1) from None
     except DisconnectionTimeout:
-        console.print(f'[error]Unable to disconnect on time from {url}')
+        terminal.print(f'[error]Unable to disconnect on time from {url}')
         raise SystemExit(1) from None
     except ConnectionRejected as e:
-        console.print(f'[error]Connection was rejected by {url}')
-        console.print(f'[label]status code[/] = [info]{e.status_code}[/]')
+        terminal.print(f'[error]Connection was rejected by {url}')
+        terminal.print(f'[label]status code[/] = [info]{e.status_code}[/]')
         headers = [(key.decode(), value.decode()) for key, value in e.headers] if e.headers is not None else []
-        console.print(f'[label]headers[/] = {headers}')
-        console.print(f'[label]body[/] = [info]{e.body.decode()}[/]')
+        terminal.print(f'[label]headers[/] = {headers}')
+        terminal.print(f'[label]body[/] = [info]{e.body.decode()}[/]')
 
         raise SystemExit(1) from None
+    finally:
+        if timings is not None:
+            print_connection_timings(terminal, url, timings)
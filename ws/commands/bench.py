@@ -0,0 +1,153 @@
+from dataclasses import dataclass, field
+from typing import AnyStr, Optional
+
+import click
+import trio
+from rich.console import Console
+from trio_websocket import ConnectionClosed, ConnectionTimeout, DisconnectionTimeout, HandshakeError
+
+from ws.client import open_websocket_client
+from ws.console import console
+from ws.options import duration_option, url_argument
+from ws.settings import Settings, get_settings
+from ws.utils.decorators import catch_pydantic_error
+from ws.utils.io import function_runner, signal_handler, sleep_until
+from ws.utils.size import get_readable_size
+from ws.utils.statistics import LatencyHistogram, print_latency_summary
+from ws.utils.tls import TlsHandshakeStatistics, print_tls_summary
+
+
+@dataclass
+class BenchStatistics:
+    connections: int = 0
+    messages: int = 0
+    bytes_sent: int = 0
+    # connections which failed or were closed before sending all their messages, and the ones which ended because
+    # the server did not connect, answer or disconnect on time
+    errors: int = 0
+    timeouts: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    connect_times: LatencyHistogram = field(default_factory=LatencyHistogram)
+    round_trips: LatencyHistogram = field(default_factory=LatencyHistogram)
+    tls_handshakes: TlsHandshakeStatistics = field(default_factory=TlsHandshakeStatistics)
+
+    @property
+    def elapsed_time(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        finished_at = trio.current_time() if self.finished_at is None else self.finished_at
+        return finished_at - self.started_at
+
+
+def get_payload(size: int, is_bytes: bool) -> AnyStr:
+    return b'x' * size if is_bytes else 'x' * size
+
+
+async def run_connection(
+    url: str, settings: Settings, number: int, payload: AnyStr, statistics: BenchStatistics
+) -> None:
+    """Sends the messages on a new connection, a failure only ends this connection and is counted in the statistics."""
+    beginning = trio.current_time()
+    try:
+        async with open_websocket_client(url, settings) as client:
+            statistics.connect_times.record(trio.current_time() - beginning)
+            statistics.tls_handshakes.record(client.tls_handshake_time, client.is_tls_session_resumed)
+            statistics.connections += 1
+            for _ in range(number):
+                before = trio.current_time()
+                await client.send_message(payload)
+                with trio.fail_after(settings.response_timeout):
+                    await client.get_message()
+                statistics.round_trips.record(trio.current_time() - before)
+                statistics.messages += 1
+                statistics.bytes_sent += len(payload)
+    except (trio.TooSlowError, ConnectionTimeout, DisconnectionTimeout):
+        statistics.timeouts += 1
+    except (HandshakeError, ConnectionClosed):
+        statistics.errors += 1
+
+
+@catch_pydantic_error
+async def run_bench(
+    url: str, connections: int, number: int, size: int, is_bytes: bool, statistics: BenchStatistics
+) -> None:
+    settings = get_settings()
+    payload = get_payload(size, is_bytes)
+    message_type = 'BINARY' if is_bytes else 'TEXT'
+    console.print(
+        f'BENCH {url} with [number]{connections}[/] connection(s) sending [number]{number}[/] {message_type}'
+        f' message(s) of [number]{get_readable_size(size)}[/]'
+    )
+    statistics.started_at = trio.current_time()
+    try:
+        async with trio.open_nursery() as nursery:
+            for _ in range(connections):
+                nursery.start_soon(run_connection, url, settings, number, payload, statistics)
+    finally:
+        statistics.finished_at = trio.current_time()
+
+
+def print_bench_summary(terminal: Console, statistics: BenchStatistics) -> None:
+    elapsed_time = statistics.elapsed_time
+    messages_rate = statistics.messages / elapsed_time if elapsed_time else 0.0
+    bytes_rate = statistics.bytes_sent / elapsed_time if elapsed_time else 0.0
+    terminal.print(
+        f'[label]connections[/]=[number]{statistics.connections}[/], [label]messages[/]=[number]{statistics.messages}'
+        f'[/], [label]errors[/]=[number]{statistics.errors}[/], [label]timeouts[/]=[number]{statistics.timeouts}[/],'
+        f' [label]duration[/]=[number]{elapsed_time:.3f}s[/]'
+    )
+    terminal.print(
+        f'[label]throughput[/]=[number]{messages_rate:.1f}[/] messages/s,'
+        f' [number]{get_readable_size(bytes_rate)}[/]/s'
+    )
+    for label, histogram in [('connect', statistics.connect_times), ('round trip', statistics.round_trips)]:
+        if histogram.count:
+            print_latency_summary(terminal, label, histogram)
+    print_tls_summary(terminal, statistics.tls_handshakes)
+
+
+async def main(
+    url: str, connections: int, number: int, size: int, is_bytes: bool, duration: Optional[float] = None
+) -> None:
+    statistics = BenchStatistics()
+    try:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(
+                function_runner, nursery.cancel_scope, run_bench, url, connections, number, size, is_bytes, statistics
+            )
+            nursery.start_soon(signal_handler, nursery.cancel_scope)
+            nursery.start_soon(sleep_until, nursery.cancel_scope, duration)
+    finally:
+        print_bench_summary(console, statistics)
+
+
+@click.command()
+@url_argument
+@click.option(
+    '-c',
+    '--connections',
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help='Number of concurrent connections to open.',
+)
+@click.option(
+    '-n',
+    '--number',
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help='Number of messages to send on each connection.',
+)
+@click.option(
+    '-s', '--size', type=click.IntRange(min=0), default=32, show_default=True, help='Size of each message in bytes.'
+)
+@click.option('-b', '--binary', 'is_bytes', is_flag=True, help='Send BINARY messages instead of TEXT messages.')
+@duration_option
+def bench(url: str, connections: int, number: int, size: int, is_bytes: bool, duration: float):
+    """
+    Benchmarks a websocket echo server located at URL.
+    Each connection sends its messages one after another and waits for the echo before sending the next one.
+    """
+    trio.run(main, url, connections, number, size, is_bytes, duration)
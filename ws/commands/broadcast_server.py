@@ -0,0 +1,247 @@
+import collections
+import functools
+from typing import AnyStr, Deque, Dict, Optional, Set
+
+import click
+import trio
+from trio_websocket import ConnectionClosed, WebSocketConnection, WebSocketRequest, serve_websocket
+from wsproto.frame_protocol import FrameProtocol
+
+from ws.commands.echo_server import get_server_ssl_context
+from ws.console import console
+from ws.parameters import HOST
+from ws.settings import get_settings
+from ws.utils.compat import send_frame
+from ws.utils.decorators import catch_pydantic_error
+from ws.utils.io import function_runner, signal_handler
+
+# what happens to a message published for a subscriber whose queue is full
+SLOW_CONSUMER_POLICIES = ('drop-oldest', 'disconnect', 'block')
+# a subscriber disconnected because it is too slow may not read the close frame either
+CLOSE_TIMEOUT = 1.0
+POLICY_VIOLATION = 1008
+
+
+def encode_frame(message: AnyStr) -> bytes:
+    """Encodes the message in a server frame, without extension, so that the same bytes can be sent to everyone."""
+    return bytes(FrameProtocol(client=False, extensions=[]).send_data(message, fin=True))
+
+
+class FrameQueue:
+    """
+    Bounded queue of frames waiting to be sent to a subscriber. When it is full, the policy drops the oldest frame,
+    refuses the new one so that the subscriber is disconnected, or blocks the publisher until there is room.
+    """
+
+    def __init__(self, size: int, policy: str):
+        self._size = size
+        self._policy = policy
+        self._frames: Deque[bytes] = collections.deque()
+        self._readers = trio.lowlevel.ParkingLot()
+        self._writers = trio.lowlevel.ParkingLot()
+        self._closed = False
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    async def put(self, frame: bytes) -> bool:
+        """Returns False when the frame is refused because the subscriber is too slow."""
+        if self._policy == 'block':
+            while len(self._frames) >= self._size and not self._closed:
+                await self._writers.park()
+        elif len(self._frames) >= self._size:
+            if self._policy == 'disconnect':
+                return False
+            self._frames.popleft()
+            self.dropped += 1
+
+        if not self._closed:
+            self._frames.append(frame)
+            self._readers.unpark()
+        return True
+
+    async def get(self) -> bytes:
+        while not self._frames:
+            await self._readers.park()
+        frame = self._frames.popleft()
+        self._writers.unpark()
+        return frame
+
+    def close(self) -> None:
+        """Releases publishers waiting for room, frames put afterwards are ignored."""
+        self._closed = True
+        self._writers.unpark_all()
+
+
+class Subscriber:
+    def __init__(self, connection: WebSocketConnection, queue: FrameQueue):
+        self.connection = connection
+        self.queue = queue
+        self.is_too_slow = False
+        self.cancel_scope = trio.CancelScope()
+
+    def disconnect(self) -> None:
+        self.is_too_slow = True
+        self.queue.close()
+        # noinspection PyAsyncCall
+        self.cancel_scope.cancel()
+
+
+class Broker:
+    """Keeps the subscribers of each topic, a topic being the path of the url connections are opened on."""
+
+    def __init__(self):
+        self._topics: Dict[str, Set[Subscriber]] = collections.defaultdict(set)
+
+    def subscribe(self, topic: str, subscriber: Subscriber) -> None:
+        self._topics[topic].add(subscriber)
+
+    def unsubscribe(self, topic: str, subscriber: Subscriber) -> None:
+        subscribers = self._topics[topic]
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._topics[topic]
+
+    def count_subscribers(self, topic: str) -> int:
+        return len(self._topics.get(topic, ()))
+
+    async def publish(self, topic: str, message: AnyStr, publisher: Optional[Subscriber] = None) -> None:
+        """Sends the message to all subscribers of the topic except the publisher, it is encoded only once."""
+        frame = encode_frame(message)
+        for subscriber in list(self._topics.get(topic, ())):
+            if subscriber is publisher or subscriber.is_too_slow:
+                continue
+            if not await subscriber.queue.put(frame):
+                subscriber.disconnect()
+
+
+async def send_frames(subscriber: Subscriber) -> None:
+    try:
+        while True:
+            frame = await subscriber.queue.get()
+            await send_frame(subscriber.connection, frame)
+    except ConnectionClosed:
+        pass
+
+
+async def receive_messages(broker: Broker, topic: str, subscriber: Subscriber) -> None:
+    try:
+        while True:
+            message = await subscriber.connection.get_message()
+            await broker.publish(topic, message, subscriber)
+    except ConnectionClosed:
+        pass
+
+
+async def request_handler(request: WebSocketRequest, broker: Broker, queue_size: int, policy: str) -> None:
+    ws = await request.accept()
+    topic = ws.path
+    # the address is no longer available once the connection is closed
+    remote_url = ws.remote.url
+    subscriber = Subscriber(ws, FrameQueue(queue_size, policy))
+    broker.subscribe(topic, subscriber)
+    try:
+        # the subscriber leaves as soon as one direction of the connection is closed
+        with subscriber.cancel_scope:
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(function_runner, nursery.cancel_scope, send_frames, subscriber)
+                nursery.start_soon(function_runner, nursery.cancel_scope, receive_messages, broker, topic, subscriber)
+    finally:
+        broker.unsubscribe(topic, subscriber)
+        subscriber.queue.close()
+
+    if subscriber.is_too_slow:
+        console.print(
+            f'[warning]Subscriber {remote_url} of {topic} disconnected, its queue of [number]{queue_size}[/] messages'
+            ' is full'
+        )
+        # the frame being sent may have been cut by the cancellation, the subscriber is not expected to read more
+        with trio.move_on_after(CLOSE_TIMEOUT):
+            await ws.aclose(POLICY_VIOLATION, 'slow consumer')
+    elif subscriber.queue.dropped:
+        console.print(
+            f'[warning]{subscriber.queue.dropped} messages were dropped for the slow subscriber {remote_url} of {topic}'
+        )
+
+
+@catch_pydantic_error
+async def run_server(
+    host: str, port: int, cert_file: Optional[str], key_file: Optional[str], queue_size: int, policy: str
+) -> None:
+    ssl_context = get_server_ssl_context(cert_file, key_file)
+    settings = get_settings()
+    handler = functools.partial(request_handler, broker=Broker(), queue_size=queue_size, policy=policy)
+    console.print(f'[info]Running broadcast server on {host}:{port} :dizzy:')
+    await serve_websocket(
+        handler,
+        host,
+        port,
+        ssl_context,
+        message_queue_size=settings.message_queue_size,
+        max_message_size=settings.max_message_size,
+        connect_timeout=settings.connect_timeout,
+        disconnect_timeout=settings.disconnect_timeout,
+    )
+
+
+async def main(
+    host: str,
+    port: int,
+    cert_file: Optional[str] = None,
+    key_file: Optional[str] = None,
+    queue_size: int = 100,
+    policy: str = 'drop-oldest',
+) -> None:
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(
+            function_runner, nursery.cancel_scope, run_server, host, port, cert_file, key_file, queue_size, policy
+        )
+        nursery.start_soon(signal_handler, nursery.cancel_scope)
+
+
+@click.command('broadcast-server')
+@click.option('-H', '--host', type=HOST, help='Host to bind the server.', default='localhost', show_default=True)
+@click.option(
+    '-p',
+    '--port',
+    type=click.IntRange(min=0, max=65535),
+    help='Port to bind the server.',
+    default=80,
+    show_default=True,
+)
+@click.option('-c', '--cert-file', type=click.Path(exists=True, dir_okay=False), help='Server certificate.')
+@click.option(
+    '-k', '--key-file', type=click.Path(exists=True, dir_okay=False), help='Private key bound to the certificate.'
+)
+@click.option(
+    '-q',
+    '--queue-size',
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help='Number of messages waiting to be sent to a subscriber before it is considered as too slow.',
+)
+@click.option(
+    '-s',
+    '--slow-consumer',
+    'policy',
+    type=click.Choice(SLOW_CONSUMER_POLICIES),
+    default='drop-oldest',
+    show_default=True,
+    help='What to do when the queue of a subscriber is full: drop its oldest message, disconnect it, or make the'
+    ' publisher wait.',
+)
+def broadcast_server(
+    host: str,
+    port: int,
+    queue_size: int,
+    policy: str,
+    cert_file: Optional[str] = None,
+    key_file: Optional[str] = None,
+):
+    """
+    Runs a broadcast websocket server.
+    Each message received on a path is sent to all the other connections opened on the same path.
+    """
+    trio.run(main, host, port, cert_file, key_file, queue_size, policy)
@@ -1,62 +1,353 @@
+import functools
+import os
+import socket
 import ssl
-from typing import Optional
+import time
+from dataclasses import dataclass, field
+from multiprocessing.queues import SimpleQueue
+from typing import List, Optional, Tuple, Union
 
 import click
 import trio
-from trio_websocket import ConnectionClosed, WebSocketRequest, serve_websocket
+from rich.console import Console
+from trio_websocket import ConnectionClosed, WebSocketConnection, WebSocketRequest, WebSocketServer, serve_websocket
 
 from ws.console import console
 from ws.parameters import HOST
-from ws.settings import get_settings
+from ws.settings import Settings, get_settings
+from ws.utils.compat import accept_request_with_extensions
+from ws.utils.compression import MeasuredPerMessageDeflate, create_compression_extension, format_compression_summary
+from ws.utils.decorators import catch_pydantic_error
 from ws.utils.io import function_runner, signal_handler
+from ws.utils.metrics import Histogram, format_histogram, format_metric, serve_metrics
+from ws.utils.size import get_readable_size
+from ws.utils.workers import WorkerSupervisor, wait_for_termination
 
-SETTINGS = get_settings()
 
+async def accept_request(
+    request: WebSocketRequest, compression: Optional[MeasuredPerMessageDeflate] = None
+) -> WebSocketConnection:
+    """
+    Accepts the request, with permessage-deflate compression if the client offers it. trio-websocket does not support
+    extensions, so the handshake response is sent like WebSocketRequest.accept does, with the extension added.
+    """
+    if compression is None:
+        return await request.accept()
+
+    return await accept_request_with_extensions(request, [compression])
+
+
+# metrics are only served locally, they are meant to be scraped by an agent running on the same machine
+METRICS_HOST = 'localhost'
+# upper bounds of the histogram buckets, sizes are in bytes and latencies in seconds
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+@dataclass
+class ServerStatistics:
+    """
+    Counters of a server process. They are plain attributes updated by the handler of each connection, so that
+    counting does not slow down the echo. messages and size are about messages sent back to clients.
+    """
+
+    connections: int = 0
+    active_connections: int = 0
+    received_messages: int = 0
+    received_size: int = 0
+    messages: int = 0
+    size: int = 0
+    timeouts: int = 0
+    message_sizes: Histogram = field(default_factory=lambda: Histogram(SIZE_BUCKETS))
+    latencies: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+
+
+def get_message_size(message: Union[str, bytes]) -> int:
+    """Returns the size in bytes of the message, text is only encoded when it is not ascii."""
+    if isinstance(message, bytes) or message.isascii():
+        return len(message)
+    return len(message.encode())
 
-async def request_handler(request: WebSocketRequest) -> None:
-    ws = await request.accept()
-    while True:
-        try:
-            with trio.fail_after(SETTINGS.response_timeout):
-                message = await ws.get_message()
-            await ws.send_message(message)
-        except (ConnectionClosed, trio.TooSlowError):
-            break
 
+def format_server_metrics(statistics: ServerStatistics) -> str:
+    """Returns the statistics in the Prometheus text format."""
+    prefix = 'ws_echo_server'
+    lines = [
+        *format_metric(
+            f'{prefix}_active_connections', 'gauge', 'Connections currently open.', statistics.active_connections
+        ),
+        *format_metric(f'{prefix}_connections_total', 'counter', 'Connections accepted.', statistics.connections),
+        *format_metric(
+            f'{prefix}_received_messages_total', 'counter', 'Messages received.', statistics.received_messages
+        ),
+        *format_metric(
+            f'{prefix}_received_bytes_total', 'counter', 'Bytes of messages received.', statistics.received_size
+        ),
+        *format_metric(f'{prefix}_sent_messages_total', 'counter', 'Messages sent back.', statistics.messages),
+        *format_metric(f'{prefix}_sent_bytes_total', 'counter', 'Bytes of messages sent back.', statistics.size),
+        *format_metric(
+            f'{prefix}_timeouts_total',
+            'counter',
+            'Connections closed after waiting too long for a message.',
+            statistics.timeouts,
+        ),
+        *format_histogram(f'{prefix}_message_size_bytes', 'Size of messages received.', statistics.message_sizes),
+        *format_histogram(
+            f'{prefix}_handler_latency_seconds',
+            'Time between the reception of a message and its echo.',
+            statistics.latencies,
+        ),
+    ]
+    return '\n'.join(lines) + '\n'
 
-async def run_server(host: str, port: int, cert_file: Optional[str] = None, key_file: Optional[str] = None) -> None:
+
+async def request_handler(
+    request: WebSocketRequest, settings: Optional[Settings] = None, statistics: Optional[ServerStatistics] = None
+) -> None:
+    settings = get_settings() if settings is None else settings
+    statistics = ServerStatistics() if statistics is None else statistics
+    compression = create_compression_extension(settings)
+    ws = await accept_request(request, compression)
+    statistics.connections += 1
+    statistics.active_connections += 1
+    # the parameters and the compression ratio are printed for each connection, only when compression is negotiated
+    is_compressed = compression is not None and compression.enabled()
+    if is_compressed:
+        # the address is no longer available once the connection is closed
+        remote_url = ws.remote.url
+        console.print(f'[info]Connection from {remote_url}[/], [label]permessage-deflate[/]: {compression.parameters}')
+
+    try:
+        while True:
+            try:
+                with trio.fail_after(settings.response_timeout):
+                    message = await ws.get_message()
+                received_at = time.perf_counter()
+                size = get_message_size(message)
+                statistics.received_messages += 1
+                statistics.received_size += size
+                statistics.message_sizes.observe(size)
+                await ws.send_message(message)
+                statistics.latencies.observe(time.perf_counter() - received_at)
+                statistics.messages += 1
+                statistics.size += size
+            except trio.TooSlowError:
+                statistics.timeouts += 1
+                break
+            except ConnectionClosed:
+                break
+    finally:
+        statistics.active_connections -= 1
+        if is_compressed:
+            console.print(f'[info]Connection from {remote_url} closed[/], {format_compression_summary(compression)}')
+
+
+def get_server_ssl_context(cert_file: Optional[str] = None, key_file: Optional[str] = None) -> Optional[ssl.SSLContext]:
     if key_file is not None and cert_file is None:
         raise click.UsageError('You cannot provide a private key file without the certificate.')
 
-    ssl_context = None
-    if cert_file is not None:
-        # noinspection PyTypeChecker
-        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    if cert_file is None:
+        return None
+
+    # noinspection PyTypeChecker
+    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    try:
+        ssl_context.load_cert_chain(cert_file, keyfile=key_file)
+    except ssl.SSLError:
+        console.print('[error]Unable to set up TLS. Please check the files you provided are correct.')
+        raise SystemExit(1) from None
+    return ssl_context
+
+
+async def open_reuse_port_listeners(
+    host: str, port: int, ssl_context: Optional[ssl.SSLContext] = None
+) -> List[trio.abc.Listener]:
+    """
+    Opens listeners like trio.open_tcp_listeners, with SO_REUSEPORT set on their socket so that several processes
+    listen on the same port. The kernel spreads the incoming connections between them.
+    """
+    addresses = await trio.socket.getaddrinfo(host, port, type=trio.socket.SOCK_STREAM, flags=trio.socket.AI_PASSIVE)
+    listeners = []
+    for family, type_, proto, _, address in addresses:
+        sock = trio.socket.socket(family, type_, proto)
         try:
-            ssl_context.load_cert_chain(cert_file, keyfile=key_file)
-        except ssl.SSLError:
-            console.print('[error]Unable to set up TLS. Please check the files you provided are correct.')
-            raise SystemExit(1) from None
-
-    console.print(f'[info]Running server on {host}:{port} :dizzy:')
-    await serve_websocket(
-        request_handler,
-        host,
-        port,
-        ssl_context,
-        message_queue_size=SETTINGS.message_queue_size,
-        max_message_size=SETTINGS.max_message_size,
-        connect_timeout=SETTINGS.connect_timeout,
-        disconnect_timeout=SETTINGS.disconnect_timeout,
-    )
-
-
-async def main(host: str, port: int, cert_file: Optional[str] = None, key_file: Optional[str] = None) -> None:
+            sock.setsockopt(trio.socket.SOL_SOCKET, trio.socket.SO_REUSEADDR, 1)
+            sock.setsockopt(trio.socket.SOL_SOCKET, trio.socket.SO_REUSEPORT, 1)
+            if family == trio.socket.AF_INET6:
+                sock.setsockopt(trio.socket.IPPROTO_IPV6, trio.socket.IPV6_V6ONLY, 1)
+            await sock.bind(address)
+            sock.listen(socket.SOMAXCONN)
+        except BaseException:
+            sock.close()
+            raise
+        listener = trio.SocketListener(sock)
+        listeners.append(listener if ssl_context is None else trio.SSLListener(listener, ssl_context))
+    return listeners
+
+
+@catch_pydantic_error
+async def run_server(
+    host: str,
+    port: int,
+    cert_file: Optional[str] = None,
+    key_file: Optional[str] = None,
+    statistics: Optional[ServerStatistics] = None,
+    is_worker: bool = False,
+    metrics_port: Optional[int] = None,
+) -> None:
+    """
+    Runs the server, workers share the port with other processes and do not print the banner of the server. When a
+    metrics port is given, the statistics of the server are served on it in the Prometheus text format.
+    """
+    ssl_context = get_server_ssl_context(cert_file, key_file)
+    settings = get_settings()
+    statistics = ServerStatistics() if statistics is None else statistics
+    handler = functools.partial(request_handler, settings=settings, statistics=statistics)
+    options = {
+        'message_queue_size': settings.message_queue_size,
+        'max_message_size': settings.max_message_size,
+        'connect_timeout': settings.connect_timeout,
+        'disconnect_timeout': settings.disconnect_timeout,
+    }
     async with trio.open_nursery() as nursery:
-        nursery.start_soon(function_runner, nursery.cancel_scope, run_server, host, port, cert_file, key_file)
+        if metrics_port is not None:
+            await nursery.start(
+                serve_metrics, METRICS_HOST, metrics_port, functools.partial(format_server_metrics, statistics)
+            )
+            if not is_worker:
+                console.print(f'[info]Serving metrics on http://{METRICS_HOST}:{metrics_port}/metrics')
+
+        if is_worker:
+            listeners = await open_reuse_port_listeners(host, port, ssl_context)
+            await WebSocketServer(handler, listeners, **options).run()
+        else:
+            console.print(f'[info]Running server on {host}:{port} :dizzy:')
+            await serve_websocket(handler, host, port, ssl_context, **options)
+
+
+async def main(
+    host: str,
+    port: int,
+    cert_file: Optional[str] = None,
+    key_file: Optional[str] = None,
+    metrics_port: Optional[int] = None,
+) -> None:
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(
+            function_runner,
+            nursery.cancel_scope,
+            run_server,
+            host,
+            port,
+            cert_file,
+            key_file,
+            None,
+            False,
+            metrics_port,
+        )
         nursery.start_soon(signal_handler, nursery.cancel_scope)
 
 
+async def serve_worker(
+    host: str,
+    port: int,
+    cert_file: Optional[str],
+    key_file: Optional[str],
+    statistics: ServerStatistics,
+    metrics_port: Optional[int],
+) -> None:
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(
+            function_runner,
+            nursery.cancel_scope,
+            run_server,
+            host,
+            port,
+            cert_file,
+            key_file,
+            statistics,
+            True,
+            metrics_port,
+        )
+        nursery.start_soon(wait_for_termination, nursery.cancel_scope)
+
+
+def get_worker_metrics_port(metrics_port: Optional[int], index: int) -> Optional[int]:
+    """Each worker serves its own statistics, on the port following the one of the previous worker."""
+    return None if metrics_port is None else metrics_port + index - 1
+
+
+def run_worker(
+    index: int,
+    host: str,
+    port: int,
+    cert_file: Optional[str],
+    key_file: Optional[str],
+    metrics_port: Optional[int],
+    results: SimpleQueue,
+) -> None:
+    statistics = ServerStatistics()
+    trio.run(serve_worker, host, port, cert_file, key_file, statistics, get_worker_metrics_port(metrics_port, index))
+    results.put((index, os.getpid(), statistics))
+
+
+def print_server_summary(terminal: Console, results: List[Tuple[int, int, ServerStatistics]]) -> None:
+    def format_statistics(statistics: ServerStatistics) -> str:
+        return (
+            f'[number]{statistics.connections}[/] connections, [number]{statistics.messages}[/] messages,'
+            f' [number]{get_readable_size(statistics.size)}[/]'
+        )
+
+    total = ServerStatistics()
+    terminal.print('--- echo-server statistics ---')
+    for index, pid, statistics in sorted(results, key=lambda result: result[0]):
+        terminal.print(f'[label]worker {index}[/] (pid {pid}): {format_statistics(statistics)}')
+        total.connections += statistics.connections
+        total.messages += statistics.messages
+        total.size += statistics.size
+    terminal.print(f'[label]total[/]: {format_statistics(total)}')
+
+
+def check_metrics_port(port: int, metrics_port: Optional[int], workers: int) -> None:
+    if metrics_port is None:
+        return
+    last_metrics_port = metrics_port + workers - 1
+    if last_metrics_port > 65535:
+        raise click.UsageError(f'The metrics ports of the {workers} workers go beyond 65535.')
+    if metrics_port <= port <= last_metrics_port:
+        raise click.UsageError('The metrics port must be different from the port of the server.')
+
+
+def run_workers(
+    host: str,
+    port: int,
+    cert_file: Optional[str],
+    key_file: Optional[str],
+    workers: int,
+    metrics_port: Optional[int] = None,
+) -> None:
+    """Runs the server in several processes listening on the same port, and prints the statistics of each of them."""
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        raise click.UsageError('Several workers need the SO_REUSEPORT socket option, which this platform lacks.')
+    if port == 0:
+        raise click.UsageError('Workers cannot share a port chosen by the system, please give a port.')
+    # errors in the certificate files are reported once, before workers are started
+    get_server_ssl_context(cert_file, key_file)
+
+    console.print(f'[info]Running server on {host}:{port} with {workers} workers :dizzy:')
+    if metrics_port is not None:
+        for index in range(1, workers + 1):
+            worker_metrics_port = get_worker_metrics_port(metrics_port, index)
+            console.print(
+                f'[info]Serving metrics of worker {index} on http://{METRICS_HOST}:{worker_metrics_port}/metrics'
+            )
+    supervisor = WorkerSupervisor(run_worker, (host, port, cert_file, key_file, metrics_port), workers)
+    results = supervisor.run()
+    print_server_summary(console, results)
+    if supervisor.exit_code:
+        raise SystemExit(supervisor.exit_code)
+
+
 @click.command('echo-server')
 @click.option('-H', '--host', type=HOST, help='Host to bind the server.', default='localhost', show_default=True)
 @click.option(
@@ -71,9 +362,34 @@ async def main(host: str, port: int, cert_file: Optional[str] = None, key_file:
 @click.option(
     '-k', '--key-file', type=click.Path(exists=True, dir_okay=False), help='Private key bound to the certificate.'
 )
-def echo_server(host: str, port: int, cert_file: Optional[str] = None, key_file: Optional[str] = None):
+@click.option(
+    '-w',
+    '--workers',
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help='Number of processes serving connections on the same port, to use several CPU cores.',
+)
+@click.option(
+    '--metrics-port',
+    type=click.IntRange(min=1, max=65535),
+    help='Local port serving the statistics of the server in the Prometheus text format on /metrics. With several'
+    ' workers, each worker uses the next port.',
+)
+def echo_server(
+    host: str,
+    port: int,
+    cert_file: Optional[str] = None,
+    key_file: Optional[str] = None,
+    workers: int = 1,
+    metrics_port: Optional[int] = None,
+):
     """
     Runs an echo websocket server.
     The server will return the data sent by the client.
     """
-    trio.run(main, host, port, cert_file, key_file)
+    check_metrics_port(port, metrics_port, workers)
+    if workers > 1:
+        run_workers(host, port, cert_file, key_file, workers, metrics_port)
+        return
+    trio.run(main, host, port, cert_file, key_file, metrics_port)
@@ -1,24 +1,53 @@
+import base64
+import collections
+import functools
 import json
+import math
+import sys
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import AnyStr, Optional
+from typing import AnyStr, Awaitable, BinaryIO, Callable, Deque, Dict, List, Optional, Sequence, Tuple
 
 import click
 import trio
 from rich.console import Console
 from rich.markup import escape
+from trio_websocket import WebSocketConnection
 
-from ws.client import websocket_client
-from ws.console import configure_console_recording, console, save_output
-from ws.options import duration_option, filename_option, url_argument
+from ws.console import configure_console_recording, console, error_console, save_output
+from ws.options import duration_option, filename_option, timings_option
+from ws.parameters import WS_URL
 from ws.settings import get_settings
 from ws.utils.io import function_runner, signal_handler, sleep_until
+from ws.utils.reconnect import (
+    RECONNECT_ERRORS,
+    ReconnectStatistics,
+    describe_connection_error,
+    print_reconnect_summary,
+    run_websocket_client,
+)
+from ws.utils.size import get_readable_size
 
+OUTPUT_FORMATS = ('pretty', 'raw', 'ndjson')
+# buffered messages are written when they reach this size or when the oldest one has waited for the flush interval
+FLUSH_SIZE = 64 * 1024
+FLUSH_INTERVAL = 0.1
+# in pretty mode, messages are rendered a few times per second and only the most recent ones are kept between two renders
+REFRESH_RATE = 10
+# it is also the maximum number of messages rendered per tick, a message takes about half a millisecond to render and
+# the reception is blocked meanwhile
+BUFFER_SIZE = 50
 
-def trace_rule(terminal: Console, is_bytes: bool) -> None:
-    date = datetime.now()
+
+def trace_rule(
+    terminal: Console, is_bytes: bool, date: Optional[datetime] = None, source: Optional[str] = None
+) -> None:
+    date = datetime.now() if date is None else date
     message_type = 'BINARY' if is_bytes else 'TEXT'
+    origin = '' if source is None else f' from {escape(source)}'
 
-    terminal.rule(f'[bold info]{message_type} message on {date:%Y-%m-%d %H:%M:%S}')
+    terminal.rule(f'[bold info]{message_type} message{origin} on {date:%Y-%m-%d %H:%M:%S}')
 
 
 def print_message(terminal: Console, message: AnyStr, is_bytes: bool) -> None:
@@ -41,36 +70,387 @@ def print_json(terminal: Console, message: AnyStr, is_bytes: bool) -> None:
         terminal.print(escape(message))
 
 
-async def listen_messages(url: str, is_json: bool, filename: Optional[str] = None) -> None:
-    configure_console_recording(console, get_settings(), filename)
+def format_raw_message(message: AnyStr, timestamp: float, source: Optional[str] = None) -> bytes:
+    """
+    Formats a message on one line, newlines of TEXT messages are escaped and BINARY messages are hex encoded. The
+    source of the message comes after the timestamp when it is given.
+    """
+    prefix = f'{timestamp:.6f}' if source is None else f'{timestamp:.6f} {source}'
+    if isinstance(message, bytes):
+        return f'{prefix} BINARY {message.hex()}\n'.encode()
+    message = message.replace('\\', '\\\\').replace('\n', '\\n').replace('\r', '\\r')
+    return f'{prefix} TEXT {message}\n'.encode()
+
+
+def format_ndjson_message(message: AnyStr, timestamp: float, source: Optional[str] = None) -> bytes:
+    """Formats a message as a json object on one line, BINARY messages are base64 encoded."""
+    data = {'timestamp': timestamp} if source is None else {'timestamp': timestamp, 'source': source}
+    if isinstance(message, bytes):
+        data.update(type='binary', data=base64.b64encode(message).decode())
+    else:
+        data.update(type='text', data=message)
+    return json.dumps(data, ensure_ascii=False).encode() + b'\n'
+
+
+@dataclass
+class SourceCounter:
+    """Counts messages received from one URL, the size is in bytes for BINARY messages and characters for TEXT ones."""
+
+    messages: int = 0
+    size: int = 0
+    # 1 when the connection to the URL failed or was lost for good
+    errors: int = 0
+
+    def record(self, message: AnyStr) -> None:
+        self.messages += 1
+        self.size += len(message)
+
+
+def print_source_summary(terminal: Console, counters: Dict[str, SourceCounter]) -> None:
+    terminal.print('--- listen statistics ---')
+    for url, counter in counters.items():
+        errors = f', [error]{counter.errors} error[/]' if counter.errors else ''
+        terminal.print(
+            f'[info]{escape(url)}[/]: [number]{counter.messages}[/] messages, '
+            f'[number]{get_readable_size(counter.size)}[/]{errors}'
+        )
+
+
+class BatchWriter:
+    """Keeps formatted messages in memory and writes them in one call to limit the number of system calls."""
+
+    def __init__(self, file: BinaryIO, flush_size: int = FLUSH_SIZE):
+        self._file = file
+        self._flush_size = flush_size
+        self._chunks: List[bytes] = []
+        self._size = 0
 
-    async with websocket_client(url) as client:
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def write(self, data: bytes) -> None:
+        self._chunks.append(data)
+        self._size += len(data)
+        if self._size >= self._flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._chunks:
+            return
+        self._file.write(b''.join(self._chunks))
+        self._file.flush()
+        self._chunks.clear()
+        self._size = 0
+
+
+async def write_messages(
+    client: WebSocketConnection,
+    writer: BatchWriter,
+    formatter: Callable[[AnyStr, float, Optional[str]], bytes],
+    source: Optional[str] = None,
+    counter: Optional[SourceCounter] = None,
+) -> None:
+    deadline = math.inf
+    try:
         while True:
-            message = await client.get_message()
+            # buffered messages do not wait more than the flush interval when the feed is quiet
+            with trio.move_on_at(deadline) as cancel_scope:
+                message = await client.get_message()
+            if cancel_scope.cancelled_caught:
+                writer.flush()
+                deadline = math.inf
+                continue
+
+            if counter is not None:
+                counter.record(message)
+            if not writer.size:
+                deadline = trio.current_time() + FLUSH_INTERVAL
+            writer.write(formatter(message, time.time(), source))
+    finally:
+        writer.flush()
+
+
+async def run_source(
+    url: str,
+    handler: Callable[[WebSocketConnection], Awaitable[None]],
+    max_attempts: Optional[int],
+    statistics: Optional[ReconnectStatistics],
+    counter: SourceCounter,
+    terminal: Console,
+    with_timings: bool = False,
+) -> None:
+    """Runs the connection of one URL, its failure is reported and counted without stopping the other URLs."""
+    try:
+        await run_websocket_client(url, handler, max_attempts, statistics, terminal, with_timings)
+    except RECONNECT_ERRORS as e:
+        counter.errors += 1
+        # the last failed reconnection attempt is already reported
+        if max_attempts is None:
+            terminal.print(f'[error]Connection to {url} ended: {describe_connection_error(e)}')
+
+
+def get_source(url: str, urls: Sequence[str]) -> Optional[str]:
+    """Messages are tagged with their URL only when several URLs are listened."""
+    return url if len(urls) > 1 else None
+
+
+async def write_all_messages(
+    urls: Sequence[str],
+    writer: BatchWriter,
+    formatter: Callable[[AnyStr, float, Optional[str]], bytes],
+    max_attempts: Optional[int],
+    statistics: Dict[str, ReconnectStatistics],
+    counters: Dict[str, SourceCounter],
+    with_timings: bool = False,
+) -> None:
+    # all connections share the same writer, so their messages are merged in reception order
+    async with trio.open_nursery() as nursery:
+        for url in urls:
+            handler = functools.partial(
+                write_messages, writer=writer, formatter=formatter, source=get_source(url, urls), counter=counters[url]
+            )
+            nursery.start_soon(
+                run_source, url, handler, max_attempts, statistics.get(url), counters[url], error_console, with_timings
+            )
+
+
+async def stream_messages(
+    urls: Sequence[str],
+    output_format: str,
+    filename: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+    statistics: Optional[Dict[str, ReconnectStatistics]] = None,
+    counters: Optional[Dict[str, SourceCounter]] = None,
+    with_timings: bool = False,
+) -> None:
+    """Writes messages without rich, so that the terminal rendering is not the bottleneck on busy feeds."""
+    formatter = format_raw_message if output_format == 'raw' else format_ndjson_message
+    statistics = {} if statistics is None else statistics
+    counters = {url: SourceCounter() for url in urls} if counters is None else counters
+
+    if filename is None:
+        writer = BatchWriter(sys.stdout.buffer)
+        await write_all_messages(urls, writer, formatter, max_attempts, statistics, counters, with_timings)
+        return
+
+    with open(filename, 'wb') as f:
+        await write_all_messages(urls, BatchWriter(f), formatter, max_attempts, statistics, counters, with_timings)
+
+
+class MessageRenderer:
+    """
+    Keeps received messages in a bounded buffer which is rendered at a fixed rate, so that a burst of messages never
+    blocks the reception. When the buffer is full, the oldest messages are dropped and their number is printed.
+    """
+
+    def __init__(self, terminal: Console, is_json: bool, buffer_size: int = BUFFER_SIZE):
+        self._terminal = terminal
+        self._is_json = is_json
+        self._messages: Deque[Tuple[float, Optional[str], AnyStr]] = collections.deque()
+        self._buffer_size = buffer_size
+        self._elided = 0
+
+    def add(self, message: AnyStr, source: Optional[str] = None) -> None:
+        if len(self._messages) == self._buffer_size:
+            self._messages.popleft()
+            self._elided += 1
+        # the date is only formatted when the message is rendered
+        self._messages.append((time.time(), source, message))
+
+    def render(self) -> None:
+        if self._elided:
+            self._terminal.print(f'[warning]{self._elided} messages elided')
+            self._elided = 0
+
+        while self._messages:
+            timestamp, source, message = self._messages.popleft()
             is_bytes = isinstance(message, bytes)
-            trace_rule(console, is_bytes)
+            trace_rule(self._terminal, is_bytes, datetime.fromtimestamp(timestamp), source)
+
+            if self._is_json:
+                print_json(self._terminal, message, is_bytes)
+            else:
+                print_message(self._terminal, message, is_bytes)
+
+    async def run(self, refresh_rate: float = REFRESH_RATE) -> None:
+        while True:
+            await trio.sleep(1 / refresh_rate)
+            self.render()
+
 
-            if is_json:
-                print_json(console, message, is_bytes)
+async def receive_messages(
+    client: WebSocketConnection,
+    renderer: MessageRenderer,
+    source: Optional[str] = None,
+    counter: Optional[SourceCounter] = None,
+) -> None:
+    while True:
+        message = await client.get_message()
+        if counter is not None:
+            counter.record(message)
+        renderer.add(message, source)
+
+
+async def listen_messages(
+    urls: Sequence[str],
+    is_json: bool,
+    filename: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+    statistics: Optional[Dict[str, ReconnectStatistics]] = None,
+    counters: Optional[Dict[str, SourceCounter]] = None,
+    with_timings: bool = False,
+) -> None:
+    configure_console_recording(console, get_settings(), filename)
+    renderer = MessageRenderer(console, is_json)
+    statistics = {} if statistics is None else statistics
+    counters = {url: SourceCounter() for url in urls} if counters is None else counters
+
+    try:
+        # the renderer keeps running while connections are opened again, all of them share it
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(renderer.run)
+            async with trio.open_nursery() as connections:
+                for url in urls:
+                    handler = functools.partial(
+                        receive_messages, renderer=renderer, source=get_source(url, urls), counter=counters[url]
+                    )
+                    connections.start_soon(
+                        run_source,
+                        url,
+                        handler,
+                        max_attempts,
+                        statistics.get(url),
+                        counters[url],
+                        console,
+                        with_timings,
+                    )
+            nursery.cancel_scope.cancel()
+    finally:
+        # messages received since the last render are not lost when the program is stopped
+        renderer.render()
+
+
+async def main(
+    urls: Sequence[str],
+    is_json: bool,
+    duration: Optional[float] = None,
+    filename: Optional[str] = None,
+    output_format: str = 'pretty',
+    max_attempts: Optional[int] = None,
+    with_timings: bool = False,
+) -> None:
+    statistics = {} if max_attempts is None else {url: ReconnectStatistics() for url in urls}
+    counters = {url: SourceCounter() for url in urls}
+    # in stream mode, the standard output only contains messages
+    terminal = console if output_format == 'pretty' else error_console
+    try:
+        async with trio.open_nursery() as nursery:
+            if output_format == 'pretty':
+                nursery.start_soon(
+                    function_runner,
+                    nursery.cancel_scope,
+                    listen_messages,
+                    urls,
+                    is_json,
+                    filename,
+                    max_attempts,
+                    statistics,
+                    counters,
+                    with_timings,
+                )
             else:
-                print_message(console, message, is_bytes)
+                nursery.start_soon(
+                    function_runner,
+                    nursery.cancel_scope,
+                    stream_messages,
+                    urls,
+                    output_format,
+                    filename,
+                    max_attempts,
+                    statistics,
+                    counters,
+                    with_timings,
+                )
+            nursery.start_soon(signal_handler, nursery.cancel_scope, terminal)
+            nursery.start_soon(sleep_until, nursery.cancel_scope, duration)
+    finally:
+        for url, url_statistics in statistics.items():
+            print_reconnect_summary(terminal, url, url_statistics)
+        if len(urls) > 1:
+            print_source_summary(terminal, counters)
+        if filename and output_format == 'pretty':
+            save_output(console, filename)
+    if any(counter.errors for counter in counters.values()):
+        raise SystemExit(1)
 
 
-async def main(url: str, is_json: bool, duration: Optional[float] = None, filename: Optional[str] = None) -> None:
-    async with trio.open_nursery() as nursery:
-        nursery.start_soon(function_runner, nursery.cancel_scope, listen_messages, url, is_json, filename)
-        nursery.start_soon(signal_handler, nursery.cancel_scope)
-        nursery.start_soon(sleep_until, nursery.cancel_scope, duration)
+def read_url_file(ctx: click.Context, param: click.Parameter, filename: Optional[str]) -> List[str]:
+    """Returns the URLs of the file, one per line. Empty lines and lines starting with "#" are ignored."""
+    if filename is None:
+        return []
 
-    if filename:
-        save_output(console, filename)
+    with open(filename) as f:
+        lines = [line.strip() for line in f]
+    return [WS_URL.convert(line, param, ctx) for line in lines if line and not line.startswith('#')]
 
 
 @click.command()
-@url_argument
+@click.argument('urls', nargs=-1, type=WS_URL, metavar='[URL]...')
+@click.option(
+    '-u',
+    '--url-file',
+    'file_urls',
+    type=click.Path(exists=True, dir_okay=False),
+    callback=read_url_file,
+    help='File containing URLs to listen, one per line. They are listened in addition to the URL arguments.',
+)
 @click.option('-j', '--json', 'is_json', is_flag=True, help='Pretty print json messages.')
 @duration_option
 @filename_option
-def listen(url: str, is_json: bool, duration: float, filename: str):
-    """Listens messages on a given URL."""
-    trio.run(main, url, is_json, duration, filename)
+@click.option(
+    '--format',
+    'output_format',
+    type=click.Choice(OUTPUT_FORMATS),
+    default='pretty',
+    show_default=True,
+    help=(
+        'Output format. "raw" and "ndjson" write one line per message with its timestamp and type without any '
+        'rendering, they are meant for busy feeds. With these formats, the file option is written as is.'
+    ),
+)
+@click.option(
+    '-r',
+    '--reconnect',
+    is_flag=True,
+    help='Open a new connection when the current one is lost, with an exponential backoff between attempts.',
+)
+@click.option(
+    '--max-attempts',
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help='Maximum number of consecutive failed attempts to reconnect before exiting, used with --reconnect.',
+)
+@timings_option
+def listen(
+    urls: Tuple[str, ...],
+    file_urls: List[str],
+    is_json: bool,
+    duration: float,
+    filename: str,
+    output_format: str,
+    reconnect: bool,
+    max_attempts: int,
+    with_timings: bool,
+):
+    """
+    Listens messages on one or several URLs.
+    With several URLs, all connections are opened in the same process, messages are merged and tagged with their URL,
+    and the number of messages received from each URL is printed at the end.
+    """
+    # a URL given twice is only listened once
+    urls = list(dict.fromkeys([*urls, *file_urls]))
+    if not urls:
+        raise click.UsageError("Missing argument 'URL'.")
+    trio.run(main, urls, is_json, duration, filename, output_format, max_attempts if reconnect else None, with_timings)
@@ -1,7 +1,9 @@
+from dataclasses import dataclass, field
 from typing import Optional
 
 import click
 import trio
+from rich.console import Console
 
 from ws.client import websocket_client
 from ws.console import configure_console_recording, console, save_output
@@ -11,33 +13,71 @@ from ws.options import (
     interval_option,
     message_option,
     number_option,
+    timings_option,
     url_argument,
     validate_number,
 )
 from ws.settings import get_settings
+from ws.utils.compat import DEFAULT_PING_PAYLOAD_SIZE
 from ws.utils.decorators import catch_pydantic_error, catch_too_slow_error
 from ws.utils.io import function_runner, signal_handler, sleep_until
+from ws.utils.statistics import LatencyHistogram, format_milliseconds, print_latency_summary
+
+
+@dataclass
+class PingStatistics:
+    transmitted: int = 0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def received(self) -> int:
+        return self.histogram.count
+
+    @property
+    def loss(self) -> float:
+        if not self.transmitted:
+            return 0.0
+        return (self.transmitted - self.received) / self.transmitted * 100
+
+
+def print_ping_summary(terminal: Console, url: str, statistics: PingStatistics) -> None:
+    terminal.print(f'--- {url} ping statistics ---')
+    terminal.print(
+        f'[number]{statistics.transmitted}[/] pings transmitted, [number]{statistics.received}[/] pongs received,'
+        f' [number]{statistics.loss:.1f}%[/] loss'
+    )
+    if statistics.received:
+        print_latency_summary(terminal, 'rtt', statistics.histogram)
 
 
 @catch_too_slow_error
 @catch_pydantic_error
 async def make_ping(
-    url: str, number: int, interval: float, message: Optional[bytes] = None, filename: Optional[str] = None
+    url: str,
+    number: int,
+    interval: float,
+    message: Optional[bytes] = None,
+    filename: Optional[str] = None,
+    statistics: Optional[PingStatistics] = None,
+    with_timings: bool = False,
 ) -> None:
+    statistics = PingStatistics() if statistics is None else statistics
     settings = get_settings()
     configure_console_recording(console, settings, filename)
-    # trio_websocket by default sends 32 bytes if no payload is given
-    payload_length = len(message) if message is not None else 32
+    payload_length = len(message) if message is not None else DEFAULT_PING_PAYLOAD_SIZE
     console.print(f'PING {url} with {payload_length} bytes of data')
     counter = 0
-    async with websocket_client(url) as client:
+    async with websocket_client(url, with_timings) as client:
         while True:
             counter += 1
+            statistics.transmitted += 1
             beginning = trio.current_time()
             with trio.fail_after(settings.response_timeout):
                 await client.ping(message)
                 duration = trio.current_time() - beginning
-                console.print(f'[label]sequence[/]=[number]{counter}[/], [label]time[/]=[number]{duration:.2f}s[/]')
+                statistics.histogram.record(duration)
+                milliseconds = format_milliseconds(duration)
+                console.print(f'[label]sequence[/]=[number]{counter}[/], [label]time[/]=[number]{milliseconds}ms[/]')
 
             if 0 < number <= counter:
                 break
@@ -52,14 +92,30 @@ async def main(
     message: Optional[bytes] = None,
     duration: Optional[float] = None,
     filename: Optional[str] = None,
+    with_timings: bool = False,
 ) -> None:
-    async with trio.open_nursery() as nursery:
-        nursery.start_soon(function_runner, nursery.cancel_scope, make_ping, url, number, interval, message, filename)
-        nursery.start_soon(signal_handler, nursery.cancel_scope)
-        nursery.start_soon(sleep_until, nursery.cancel_scope, duration)
-
-    if filename:
-        save_output(console, filename)
+    statistics = PingStatistics()
+    try:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(
+                function_runner,
+                nursery.cancel_scope,
+                make_ping,
+                url,
+                number,
+                interval,
+                message,
+                filename,
+                statistics,
+                with_timings,
+            )
+            nursery.start_soon(signal_handler, nursery.cancel_scope)
+            nursery.start_soon(sleep_until, nursery.cancel_scope, duration)
+    finally:
+        # the summary is printed whatever the way the program ends, including interruptions and timeouts
+        print_ping_summary(console, url, statistics)
+        if filename:
+            save_output(console, filename)
 
 
 @click.command()
@@ -71,6 +127,7 @@ async def main(
 @interval_option('Interval between pings in seconds.')
 @duration_option
 @filename_option
-def ping(url: str, message: bytes, number: int, interval: int, duration: float, filename: str):
+@timings_option
+def ping(url: str, message: bytes, number: int, interval: int, duration: float, filename: str, with_timings: bool):
     """Pings a websocket server located at URL."""
-    trio.run(main, url, number, interval, message, duration, filename)
+    trio.run(main, url, number, interval, message, duration, filename, with_timings)
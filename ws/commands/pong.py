@@ -11,6 +11,7 @@ from ws.options import (
     interval_option,
     message_option,
     number_option,
+    timings_option,
     url_argument,
     validate_number,
 )
@@ -19,7 +20,12 @@ from ws.utils.io import function_runner, signal_handler, sleep_until
 
 
 async def make_pong(
-    url: str, number: int, interval: float, message: Optional[bytes] = None, filename: Optional[str] = None
+    url: str,
+    number: int,
+    interval: float,
+    message: Optional[bytes] = None,
+    filename: Optional[str] = None,
+    with_timings: bool = False,
 ) -> None:
     message = b'' if message is None else message
     payload_length = len(message)
@@ -28,7 +34,7 @@ async def make_pong(
     console.print(f'Sent unsolicited PONG of {payload_length} byte{plural} of data to [info]{url}[/]')
 
     counter = 0
-    async with websocket_client(url) as client:
+    async with websocket_client(url, with_timings) as client:
         while True:
             counter += 1
             beginning = trio.current_time()
@@ -49,14 +55,19 @@ async def main(
     message: Optional[bytes] = None,
     duration: Optional[float] = None,
     filename: Optional[str] = None,
+    with_timings: bool = False,
 ) -> None:
-    async with trio.open_nursery() as nursery:
-        nursery.start_soon(function_runner, nursery.cancel_scope, make_pong, url, number, interval, message, filename)
-        nursery.start_soon(signal_handler, nursery.cancel_scope)
-        nursery.start_soon(sleep_until, nursery.cancel_scope, duration)
-
-    if filename:
-        save_output(console, filename)
+    try:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(
+                function_runner, nursery.cancel_scope, make_pong, url, number, interval, message, filename, with_timings
+            )
+            nursery.start_soon(signal_handler, nursery.cancel_scope)
+            nursery.start_soon(sleep_until, nursery.cancel_scope, duration)
+    finally:
+        # the recorded file is completed even when the command ends with an error
+        if filename:
+            save_output(console, filename)
 
 
 @click.command()
@@ -68,9 +79,10 @@ async def main(
 @interval_option('Interval between pongs in seconds.')
 @duration_option
 @filename_option
-def pong(url: str, number: int, interval: float, message: bytes, duration: float, filename: str):
+@timings_option
+def pong(url: str, number: int, interval: float, message: bytes, duration: float, filename: str, with_timings: bool):
     """
     Sends a pong to websocket server located at URL.
     This query does not wait for an answer.
     """
-    trio.run(main, url, number, interval, message, duration, filename)
+    trio.run(main, url, number, interval, message, duration, filename, with_timings)
@@ -0,0 +1,187 @@
+import struct
+from dataclasses import dataclass, field
+from typing import AnyStr, Optional, Set, Tuple
+
+import click
+import trio
+from rich.console import Console
+from trio_websocket import WebSocketConnection
+
+from ws.client import websocket_client
+from ws.console import console
+from ws.options import duration_option, url_argument, validate_number
+from ws.settings import get_settings
+from ws.utils.decorators import catch_pydantic_error, catch_too_slow_error
+from ws.utils.io import function_runner, signal_handler, sleep_until
+from ws.utils.statistics import LatencyHistogram, print_latency_summary
+
+# binary messages start with the sequence number and the sending time, text messages with the hexadecimal form of the
+# same header, so that the size of both headers does not depend on the values
+HEADER = struct.Struct('!Qd')
+TEXT_HEADER_SIZE = 2 * HEADER.size
+
+
+@dataclass
+class RttStatistics:
+    sent: int = 0
+    out_of_order: int = 0
+    unmatched: int = 0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def received(self) -> int:
+        return self.histogram.count
+
+
+def get_header_size(is_bytes: bool) -> int:
+    return HEADER.size if is_bytes else TEXT_HEADER_SIZE
+
+
+def encode_message(sequence: int, timestamp: float, size: int, is_bytes: bool) -> AnyStr:
+    header = HEADER.pack(sequence, timestamp)
+    if is_bytes:
+        return header + b'x' * (size - len(header))
+
+    text_header = header.hex()
+    return text_header + 'x' * (size - len(text_header))
+
+
+def decode_message(message: AnyStr) -> Optional[Tuple[int, float]]:
+    """Returns the sequence number and sending time of an echoed message or None if it cannot be parsed."""
+    try:
+        if isinstance(message, bytes):
+            return HEADER.unpack_from(message)
+        return HEADER.unpack(bytes.fromhex(message[:TEXT_HEADER_SIZE]))
+    except (struct.error, ValueError):
+        return None
+
+
+async def send_messages(
+    client: WebSocketConnection,
+    number: int,
+    size: int,
+    is_bytes: bool,
+    window: trio.Semaphore,
+    in_flight: Set[int],
+    statistics: RttStatistics,
+) -> None:
+    sequence = 0
+    while number < 0 or sequence < number:
+        await window.acquire()
+        sequence += 1
+        in_flight.add(sequence)
+        await client.send_message(encode_message(sequence, trio.current_time(), size, is_bytes))
+        statistics.sent += 1
+
+
+async def receive_messages(
+    client: WebSocketConnection,
+    number: int,
+    response_timeout: float,
+    window: trio.Semaphore,
+    in_flight: Set[int],
+    statistics: RttStatistics,
+) -> None:
+    highest_sequence = 0
+    while number < 0 or statistics.received < number:
+        with trio.fail_after(response_timeout):
+            message = await client.get_message()
+        now = trio.current_time()
+
+        data = decode_message(message)
+        if data is None or data[0] not in in_flight:
+            statistics.unmatched += 1
+            continue
+
+        sequence, timestamp = data
+        in_flight.remove(sequence)
+        statistics.histogram.record(now - timestamp)
+        if sequence < highest_sequence:
+            statistics.out_of_order += 1
+        highest_sequence = max(highest_sequence, sequence)
+        window.release()
+
+
+@catch_too_slow_error
+@catch_pydantic_error
+async def measure_rtt(
+    url: str, number: int, window_size: int, size: int, is_bytes: bool, statistics: RttStatistics
+) -> None:
+    settings = get_settings()
+    # the message must at least contain the sequence number and the timestamp
+    size = max(size, get_header_size(is_bytes))
+    message_type = 'BINARY' if is_bytes else 'TEXT'
+    console.print(f'RTT {url} with {size} bytes {message_type} messages, [number]{window_size}[/] in flight')
+    window = trio.Semaphore(window_size)
+    in_flight: Set[int] = set()
+
+    async with websocket_client(url) as client:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(send_messages, client, number, size, is_bytes, window, in_flight, statistics)
+            nursery.start_soon(
+                receive_messages, client, number, settings.response_timeout, window, in_flight, statistics
+            )
+
+
+def print_rtt_summary(terminal: Console, url: str, statistics: RttStatistics) -> None:
+    terminal.print(f'--- {url} rtt statistics ---')
+    terminal.print(
+        f'[number]{statistics.sent}[/] messages sent, [number]{statistics.received}[/] echoes received,'
+        f' [number]{statistics.out_of_order}[/] out of order, [number]{statistics.unmatched}[/] unmatched'
+    )
+    if statistics.received:
+        print_latency_summary(terminal, 'rtt', statistics.histogram)
+
+
+async def main(
+    url: str, number: int, window_size: int, size: int, is_bytes: bool, duration: Optional[float] = None
+) -> None:
+    statistics = RttStatistics()
+    try:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(
+                function_runner, nursery.cancel_scope, measure_rtt, url, number, window_size, size, is_bytes, statistics
+            )
+            nursery.start_soon(signal_handler, nursery.cancel_scope)
+            nursery.start_soon(sleep_until, nursery.cancel_scope, duration)
+    finally:
+        print_rtt_summary(console, url, statistics)
+
+
+@click.command()
+@url_argument
+@click.option(
+    '-n',
+    '--number',
+    type=int,
+    default=100,
+    show_default=True,
+    callback=validate_number('The number of messages cannot be 0'),
+    help='Number of messages to send, a negative value means infinite.',
+)
+@click.option(
+    '-w',
+    '--window',
+    'window_size',
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help='Maximum number of messages waiting for their echo.',
+)
+@click.option(
+    '-s',
+    '--size',
+    type=click.IntRange(min=0),
+    default=32,
+    show_default=True,
+    help=f'Size of each message in bytes, it cannot be less than {TEXT_HEADER_SIZE} bytes for TEXT messages and'
+    f' {HEADER.size} bytes for BINARY messages.',
+)
+@click.option('-b', '--binary', 'is_bytes', is_flag=True, help='Send BINARY messages instead of TEXT messages.')
+@duration_option
+def rtt(url: str, number: int, window_size: int, size: int, is_bytes: bool, duration: float):
+    """
+    Measures application round trip times against an echo endpoint located at URL.
+    Each message embeds a sequence number and its sending time which are read back from the echo.
+    """
+    trio.run(main, url, number, window_size, size, is_bytes, duration)
@@ -1,39 +1,36 @@
-# ruff: noqa: C901
-from typing import Optional
+import sys
+from typing import List, Optional, TextIO
 
 import click
 import trio
 from prompt_toolkit import PromptSession
 from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.completion import NestedCompleter
 from prompt_toolkit.formatted_text import FormattedText
 from prompt_toolkit.input import Input
 from prompt_toolkit.lexers import PygmentsLexer
 from prompt_toolkit.output import Output
+from prompt_toolkit.patch_stdout import patch_stdout
 from prompt_toolkit.styles import Style, merge_styles, style_from_pygments_cls
 from pygments.styles import get_style_by_name
+from rich.console import Console
+from trio_websocket import ConnectionClosed, WebSocketConnection
 
 from ws.client import websocket_client
+from ws.commands.listen import print_message, trace_rule
 from ws.console import configure_console_recording, console, save_output
-from ws.options import filename_option, url_argument
-from ws.settings import get_settings
-from ws.utils.command import (
-    Command,
-    handle_close,
-    handle_data_command,
-    handle_help_command,
-    handle_ping_command,
-    handle_pong_command,
-    parse_command,
-    print_unknown_command_message,
-)
+from ws.options import filename_option, timings_option, url_argument
+from ws.settings import Settings, get_settings
+from ws.utils.command import Command, CommandContext, CommandRegistry, command_registry
 from ws.utils.decorators import catch_pydantic_error
 from ws.utils.documentation import INTRODUCTION
 from ws.utils.io import function_runner, signal_handler
 from ws.utils.lexer import WSLexer
+from ws.utils.script import ScriptError, ScriptStep, parse_script, print_script_report, run_close, run_steps
 
 
-def get_prompt_session(input_: Optional[Input] = None, output: Optional[Output] = None) -> PromptSession:
+def get_prompt_session(
+    input_: Optional[Input] = None, output: Optional[Output] = None, registry: CommandRegistry = command_registry
+) -> PromptSession:
     style = merge_styles(
         [
             style_from_pygments_cls(get_style_by_name('monokai')),  # type: ignore
@@ -48,95 +45,209 @@ def get_prompt_session(input_: Optional[Input] = None, output: Optional[Output]
             ),
         ]
     )
-    completer = NestedCompleter.from_nested_dict(
-        {
-            'help': {'ping', 'pong', 'close', 'quit', 'text', 'byte'},
-            'text': None,
-            'byte': None,
-            'close': None,
-            'quit': None,
-            'ping': None,
-            'pong': None,
-        }
-    )
     prompt_message = FormattedText([('ansibrightcyan', '>'), ('', ' ')])
     return PromptSession(
         prompt_message,
         lexer=PygmentsLexer(WSLexer),
         style=style,
         include_default_pygments_style=False,
-        completer=completer,
+        completer=registry.get_completer(),
         auto_suggest=AutoSuggestFromHistory(),
         input=input_,
         output=output,
     )
 
 
+# time given to the prompt to restore the terminal when the session ends while the user is typing
+PROMPT_EXIT_TIMEOUT = 1.0
+
+
+def exit_prompt(prompt_session: PromptSession) -> None:
+    """Stops the prompt as if the user typed Ctrl+D, it is called from any thread."""
+    app = prompt_session.app
+
+    def exit_app() -> None:
+        if app.is_running and not app.is_done:
+            app.exit(exception=EOFError)
+
+    if app.is_running and app.loop is not None:
+        app.loop.call_soon_threadsafe(exit_app)
+
+
+async def prompt_user(prompt_session: PromptSession) -> str:
+    """
+    Runs the prompt in a thread, so that the event loop keeps receiving messages while the user types. When the
+    session ends before the user validates the input, the prompt is stopped so that the terminal is restored.
+    """
+    finished = trio.Event()
+    trio_token = trio.lowlevel.current_trio_token()
+
+    def prompt() -> str:
+        try:
+            return prompt_session.prompt()
+        finally:
+            trio_token.run_sync_soon(finished.set)
+
+    try:
+        return await trio.to_thread.run_sync(prompt, cancellable=True)
+    except trio.Cancelled:
+        with trio.CancelScope(shield=True), trio.move_on_after(PROMPT_EXIT_TIMEOUT):
+            # the prompt may not be started yet when the session ends
+            while not finished.is_set():
+                exit_prompt(prompt_session)
+                with trio.move_on_after(0.05):
+                    await finished.wait()
+        raise
+
+
+class Session:
+    """
+    Runs the commands typed by the user or read from a script, while the messages sent by the endpoint are printed as
+    they arrive.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        client: WebSocketConnection,
+        settings: Settings,
+        prompt_session: Optional[PromptSession] = None,
+        terminal: Console = console,
+        registry: CommandRegistry = command_registry,
+    ):
+        self._client = client
+        self._settings = settings
+        self._prompt_session = prompt_session
+        self._terminal = terminal
+        self._registry = registry
+        self._context = CommandContext(url, client, terminal, settings)
+        self._is_closed_by_endpoint = False
+
+    def _print_endpoint_close(self, error: ConnectionClosed) -> None:
+        if self._is_closed_by_endpoint:
+            return
+        self._is_closed_by_endpoint = True
+        self._terminal.print(
+            f'[warning]Connection closed by the endpoint with code [number]{error.reason.code}[/]'
+            f' ({error.reason.name}), bye! :waving_hand:'
+        )
+
+    async def receive_messages(self, cancel_scope: trio.CancelScope) -> None:
+        try:
+            while True:
+                message = await self._client.get_message()
+                is_bytes = isinstance(message, bytes)
+                trace_rule(self._terminal, is_bytes)
+                print_message(self._terminal, message, is_bytes)
+        except ConnectionClosed as e:
+            if self._context.is_closed_by_user:
+                return
+            self._print_endpoint_close(e)
+            # noinspection PyAsyncCall
+            cancel_scope.cancel()
+
+    async def run_command(self, user_input: str) -> bool:
+        """Returns True when the session must end."""
+        return await self._registry.dispatch(self._context, user_input)
+
+    async def run_commands(self) -> None:
+        while True:
+            try:
+                user_input = (await prompt_user(self._prompt_session)).strip()
+            except EOFError:
+                break
+            if user_input and await self.run_command(user_input):
+                break
+        self._terminal.print('[info]Bye! :waving_hand:')
+
+    async def run(self) -> None:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(self.receive_messages, nursery.cancel_scope)
+            await self.run_commands()
+            # noinspection PyAsyncCall
+            nursery.cancel_scope.cancel()
+
+    async def run_script(self, steps: List[ScriptStep]) -> None:
+        """Runs the steps and prints their durations, the program fails when a step fails."""
+        beginning = trio.current_time()
+        try:
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(self.receive_messages, nursery.cancel_scope)
+                await run_steps(self._client, steps, self._settings.response_timeout)
+                if steps and steps[-1].command is Command.CLOSE:
+                    self._context.is_closed_by_user = True
+                    await run_close(self._client, steps[-1])
+                # noinspection PyAsyncCall
+                nursery.cancel_scope.cancel()
+        except ConnectionClosed as e:
+            self._print_endpoint_close(e)
+
+        print_script_report(self._terminal, steps, trio.current_time() - beginning)
+        if self._is_closed_by_endpoint or any(step.error is not None for step in steps):
+            raise SystemExit(1)
+
+
 @catch_pydantic_error
-async def interact(url: str, filename: Optional[str] = None) -> None:
+async def interact(
+    url: str, filename: Optional[str] = None, with_timings: bool = False, steps: Optional[List[ScriptStep]] = None
+) -> None:
     settings = get_settings()
     if filename:
         configure_console_recording(console, settings, filename)
 
+    if steps is not None:
+        async with websocket_client(url, with_timings) as client:
+            await Session(url, client, settings).run_script(steps)
+        return
+
     console.print(INTRODUCTION)
-    good_bye_message = '[info]Bye! :waving_hand:'
     prompt_session = get_prompt_session()
 
-    async with websocket_client(url) as client:
-        # TODO: see how to simplify this code. Mccabe score is 13. The limit is 10 by default.
-        while True:
-            try:
-                user_input = prompt_session.prompt()
-                user_input = user_input.strip()
-                if not user_input:
-                    continue
-
-                command = parse_command(user_input)
-                if command.name == Command.QUIT.value:
-                    console.print(good_bye_message)
-                    break
-
-                elif command.name == Command.CLOSE.value:
-                    ok = await handle_close(command.args, console, client)
-                    if ok:
-                        console.print(good_bye_message)
-                        break
-
-                elif command.name == Command.HELP.value:
-                    handle_help_command(command.args, console)
-
-                elif command.name == Command.PING.value:
-                    await handle_ping_command(url, command.args, console, client, settings)
-
-                elif command.name == Command.PONG.value:
-                    await handle_pong_command(url, command.args, console, client)
-
-                elif command.name == Command.TEXT.value:
-                    await handle_data_command(command.args, console, client)
-
-                elif command.name == Command.BYTE.value:
-                    await handle_data_command(command.args, console, client, is_byte=True)
-
-                else:
-                    commands = [command.value for command in Command]
-                    print_unknown_command_message(command.name, commands, console)
-            except EOFError:
-                console.print(good_bye_message)
-                break
-
-
-async def main(url: str, filename: Optional[str] = None) -> None:
-    async with trio.open_nursery() as nursery:
-        nursery.start_soon(function_runner, nursery.cancel_scope, interact, url, filename)
-        nursery.start_soon(signal_handler, nursery.cancel_scope)
-
-    if filename:
-        save_output(console, filename)
+    async with websocket_client(url, with_timings) as client:
+        interactive_session = Session(url, client, settings, prompt_session)
+        # in a terminal, messages printed while the user types are written above the prompt
+        if sys.stdout.isatty():
+            with patch_stdout(raw=True):
+                await interactive_session.run()
+        else:
+            await interactive_session.run()
+
+
+async def main(
+    url: str, filename: Optional[str] = None, with_timings: bool = False, steps: Optional[List[ScriptStep]] = None
+) -> None:
+    try:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(function_runner, nursery.cancel_scope, interact, url, filename, with_timings, steps)
+            nursery.start_soon(signal_handler, nursery.cancel_scope)
+    finally:
+        # the recorded file is completed even when the command ends with an error
+        if filename:
+            save_output(console, filename)
+
+
+def read_script(ctx: click.Context, param: click.Parameter, file: Optional[TextIO]) -> Optional[List[ScriptStep]]:
+    if file is None:
+        return None
+    try:
+        return parse_script(file)
+    except ScriptError as e:
+        raise click.BadParameter(str(e)) from None
 
 
 @click.command()
 @url_argument
 @filename_option
-def session(url: str, filename: str):
+@timings_option
+@click.option(
+    '-s',
+    '--script',
+    'steps',
+    type=click.File('r'),
+    callback=read_script,
+    help='File of session commands (text, byte, ping, pong, close) run one after the other without prompt, use - to'
+    ' read them from the standard input. The duration of each step is printed at the end.',
+)
+def session(url: str, filename: str, with_timings: bool, steps: Optional[List[ScriptStep]]):
     """Opens an interactive session to communicate with endpoint located at URL."""
-    trio.run(main, url, filename)
+    trio.run(main, url, filename, with_timings, steps)
@@ -1,14 +1,51 @@
 from __future__ import annotations
 
+import glob
+import math
 import os
+from typing import Sequence
 
 import click
 import trio
 
-from ws.utils.io import function_runner, reverse_read_lines, signal_handler
+from ws.utils.io import BLOCK_SIZE, function_runner, reverse_read_lines, signal_handler
+from ws.utils.watcher import watch_file
 
+# interval at which we check if a file followed by name has been replaced
+NAME_CHECK_INTERVAL = 1.0
 
-async def tail_file(filename: str, lines_count: int, follow: bool) -> None:
+
+class FileOutput:
+    """
+    Writes data read from a file on the standard output. When a prefix is given, it is added at the beginning of each
+    line and partial lines are kept until they are complete, so that lines of different files are never mixed.
+    """
+
+    def __init__(self, prefix: bytes = b''):
+        self._prefix = prefix
+        self._pending = b''
+
+    def write(self, data: bytes) -> None:
+        if not self._prefix:
+            click.echo(data, nl=False)
+            return
+
+        *lines, self._pending = (self._pending + data).split(b'\n')
+        if lines:
+            click.echo(b''.join(self._prefix + line + b'\n' for line in lines), nl=False)
+
+    @property
+    def is_prefixed(self) -> bool:
+        return bool(self._prefix)
+
+    def flush(self) -> None:
+        """Writes the pending partial line, it is called when the rest of the line will never come."""
+        if self._pending:
+            self.write(b'\n')
+
+
+async def print_last_lines(filename: str, lines_count: int, output: FileOutput | None = None) -> None:
+    output = FileOutput() if output is None else output
     count = 0
     lines: list[bytes] = []
 
@@ -18,40 +55,128 @@ async def tail_file(filename: str, lines_count: int, follow: bool) -> None:
         if count == lines_count:
             break
 
+    # the empty line after the final newline of the file is not worth a prefixed line
+    if output.is_prefixed and lines[:1] == [b'']:
+        lines.pop(0)
+
     for line in lines[::-1]:
-        click.echo(line)
+        output.write(line + b'\n')
+
+
+def get_file_id(file_stat: os.stat_result) -> tuple[int, int]:
+    return file_stat.st_dev, file_stat.st_ino
+
+
+def is_replaced(filename: str, file_id: tuple[int, int]) -> bool:
+    try:
+        return get_file_id(os.stat(filename)) != file_id
+    except FileNotFoundError:
+        # the file was moved or removed, and it has not been created again yet
+        return False
 
-    if follow:
-        file_size = os.stat(filename).st_size
-        while True:
-            size = os.stat(filename).st_size
-            if file_size < size:
-                async with await trio.open_file(filename) as f:
-                    await f.seek(file_size)
-                    async for line in f:
-                        click.echo(line, nl=False)
 
-                file_size = size
-            else:
-                await trio.sleep(0.1)
+async def follow_until_replaced(filename: str, position: int, by_name: bool, output: FileOutput) -> None:
+    """Prints data appended to the file until it is replaced by another file when following by name."""
+    # the file stays open while it is followed, appended data is read in large binary chunks
+    async with await trio.open_file(filename, 'rb') as f:
+        await f.seek(position)
+        file_id = get_file_id(os.fstat(f.fileno()))
+        with watch_file(filename) as watcher:
+            while True:
+                data = await f.read(BLOCK_SIZE)
+                if data:
+                    output.write(data)
+                    continue
 
+                position = await f.tell()
+                if os.fstat(f.fileno()).st_size < position:
+                    output.flush()
+                    click.echo(f'ws tail: {filename}: file truncated', err=True)
+                    await f.seek(0)
+                    continue
 
-async def main(filename: str, lines_count: int, follow: bool) -> None:
+                # all the data of the previous file has been read at this point
+                if by_name and is_replaced(filename, file_id):
+                    output.flush()
+                    click.echo(f'ws tail: {filename} has been replaced; following new file', err=True)
+                    return
+
+                # the watcher follows the opened file, it is not notified when a new file is created with the same name
+                with trio.move_on_after(NAME_CHECK_INTERVAL if by_name else math.inf):
+                    await watcher.wait(position)
+
+
+async def follow_file(filename: str, position: int, by_name: bool = False, output: FileOutput | None = None) -> None:
+    output = FileOutput() if output is None else output
+    while True:
+        await follow_until_replaced(filename, position, by_name, output)
+        # the new file is read from its beginning, only once
+        position = 0
+
+
+async def tail_files(filenames: Sequence[str], lines_count: int, follow: bool, follow_name: bool = False) -> None:
+    # lines are prefixed with their filename only when there are several files, like the builtin command does
+    outputs = [FileOutput(f'[{filename}] '.encode() if len(filenames) > 1 else b'') for filename in filenames]
+    positions = []
+    for filename, output in zip(filenames, outputs):
+        # the size is taken before reading the last lines, so nothing written in the meantime is lost when following
+        positions.append(os.stat(filename).st_size)
+        await print_last_lines(filename, lines_count, output)
+
+    if not (follow or follow_name):
+        return
+
+    # all files are followed concurrently, so their lines are printed in the order they are written
     async with trio.open_nursery() as nursery:
-        nursery.start_soon(function_runner, nursery.cancel_scope, tail_file, filename, lines_count, follow)
+        for filename, position, output in zip(filenames, positions, outputs):
+            nursery.start_soon(follow_file, filename, position, follow_name, output)
+
+
+async def main(filenames: Sequence[str], lines_count: int, follow: bool, follow_name: bool = False) -> None:
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(
+            function_runner, nursery.cancel_scope, tail_files, filenames, lines_count, follow, follow_name
+        )
         nursery.start_soon(signal_handler, nursery.cancel_scope)
 
 
+def expand_filenames(_ctx: click.Context, _param: click.Parameter, values: tuple[str, ...]) -> list[str]:
+    """Expands glob patterns not expanded by the shell and checks that all the files exist."""
+    filenames: list[str] = []
+    for value in values:
+        if glob.has_magic(value) and not os.path.exists(value):
+            matches = sorted(path for path in glob.glob(value) if os.path.isfile(path))
+            if not matches:
+                raise click.BadParameter(f"No file matches the pattern '{value}'.")
+        elif os.path.isdir(value):
+            raise click.BadParameter(f"File '{value}' is a directory.")
+        elif not os.path.exists(value):
+            raise click.BadParameter(f"File '{value}' does not exist.")
+        else:
+            matches = [value]
+        # a file given twice is only followed once
+        filenames.extend(match for match in matches if match not in filenames)
+    return filenames
+
+
 @click.command()
-@click.argument('filename', type=click.Path(exists=True, dir_okay=False))
+@click.argument('filenames', nargs=-1, required=True, metavar='FILENAME', callback=expand_filenames)
 @click.option(
     '-n', 'lines_count', type=click.IntRange(min=1), default=10, show_default=True, help='number of lines to print'
 )
-@click.option('-f', '--follow', is_flag=True)
-def tail(filename: str, lines_count: int, follow: bool):
+@click.option('-f', '--follow', is_flag=True, help='Output appended data as the file grows.')
+@click.option(
+    '-F',
+    '--follow-name',
+    is_flag=True,
+    help='Like --follow, but the file is reopened when it is rotated, i.e. replaced by a new file with the same name.',
+)
+def tail(filenames: list[str], lines_count: int, follow: bool, follow_name: bool):
     """
-    An emulator of the tail unix command that output the last lines of FILENAME.
-    It is a light implementation of the tail command. It only handles one file at a time and only
-    supports two options, so for linux/unix users, you should use the builtin command.
+    An emulator of the tail unix command that output the last lines of each FILENAME.
+    FILENAME can be a glob pattern like "logs/*.log". When there are several files, each line is prefixed with the
+    name of its file and followed lines are printed in the order they are written.
+    It is a light implementation of the tail command supporting only a few options, so for linux/unix users, you
+    should use the builtin command.
     """
-    trio.run(main, filename, lines_count, follow)
+    trio.run(main, filenames, lines_count, follow, follow_name)
@@ -1,43 +1,251 @@
-from typing import AnyStr
+import codecs
+import sys
+from dataclasses import dataclass
+from typing import Any, AnyStr, AsyncIterator, List, Optional, Tuple, Union
 
 import click
 import trio
+from trio_websocket import ConnectionClosed, DisconnectionTimeout, WebSocketConnection
+from wsproto.events import BytesMessage, TextMessage
 
 from ws.client import websocket_client
 from ws.console import console
 from ws.options import url_argument
-from ws.parameters import ByteParamType, TextParamType
+from ws.parameters import ByteParamType, FileMessage, TextParamType
+from ws.settings import get_settings
+from ws.utils.compat import encode_event, send_event, send_frame
 from ws.utils.io import function_runner, signal_handler
 from ws.utils.size import get_readable_size
 
+# size of the frames of a file message, the memory needed to send a file does not depend on its size
+FRAME_SIZE = 64 * 1024
+# the close handshake after sending lines waits longer than the disconnect timeout, the endpoint may have a backlog of
+# messages to read before the close frame
+LINES_CLOSE_TIMEOUT_FACTOR = 4
 
-async def send_message(url: str, message: AnyStr) -> None:
+
+@dataclass(frozen=True)
+class LineMessages:
+    """Lines of a file, or of the standard input when there is no path, each of them is sent as a message."""
+
+    path: Optional[str]
+    is_bytes: bool
+    # messages per second, they are sent as fast as possible without rate
+    rate: Optional[float] = None
+
+
+async def send_fragment(client: WebSocketConnection, data: AnyStr, is_last: bool) -> None:
+    """Sends a fragment of a message, trio-websocket only sends whole messages."""
+    if client.closed:
+        raise ConnectionClosed(client.closed)
+    event_class = BytesMessage if isinstance(data, bytes) else TextMessage
+    await send_event(client, event_class(data=data, message_finished=is_last))
+
+
+async def send_file(client: WebSocketConnection, message: FileMessage, frame_size: int = FRAME_SIZE) -> int:
+    """
+    Sends the file as one message fragmented in frames of frame_size bytes, and returns the number of bytes read. The
+    next chunk is read before a frame is sent, to know if the frame is the last one.
+    """
+    decoder = None if message.is_bytes else codecs.getincrementaldecoder('utf-8')()
+    sent = 0
+    async with await trio.open_file(message.path, 'rb') as f:
+        chunk = await f.read(frame_size)
+        while True:
+            next_chunk = await f.read(frame_size) if chunk else b''
+            is_last = not next_chunk
+            data = chunk if decoder is None else decoder.decode(chunk, final=is_last)
+            await send_fragment(client, data, is_last)
+            sent += len(chunk)
+            if is_last:
+                return sent
+            chunk = next_chunk
+
+
+async def read_lines(f: Any, chunk_size: int = FRAME_SIZE) -> AsyncIterator[List[bytes]]:
+    """
+    Yields the non-empty lines of an async binary file without their line ending. The file is read by chunks, and the
+    lines completed by a chunk are yielded together. A chunk is what is available, up to chunk_size bytes, so that the
+    lines written in a pipe are yielded as soon as they arrive instead of waiting for a full chunk.
+    """
+    rest = b''
+    while True:
+        chunk = await f.read1(chunk_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        yield [line for line in (line.rstrip(b'\r') for line in lines) if line]
+
+    rest = rest.rstrip(b'\r')
+    if rest:
+        yield [rest]
+
+
+async def send_batch(client: WebSocketConnection, messages: List[AnyStr]) -> None:
+    """Sends the messages with one write, WebSocketConnection.send_message makes a system call per message."""
+    if client.closed:
+        raise ConnectionClosed(client.closed)
+    data = b''.join(
+        encode_event(client, BytesMessage(data=message) if isinstance(message, bytes) else TextMessage(data=message))
+        for message in messages
+    )
+    await send_frame(client, data)
+
+
+async def send_lines_of_file(client: WebSocketConnection, messages: LineMessages, f: Any) -> Tuple[int, int]:
+    """
+    Returns the number of messages sent and their size. With a rate, messages are sent one by one on a fixed schedule,
+    so that a late message does not delay the following ones. Otherwise, the lines of a chunk are sent together.
+    """
+    count = size = 0
+    beginning = trio.current_time()
+    async for lines in read_lines(f):
+        batch = lines if messages.is_bytes else [line.decode() for line in lines]
+        if messages.rate is None:
+            await send_batch(client, batch)
+        else:
+            for index, message in enumerate(batch):
+                await trio.sleep_until(beginning + (count + index) / messages.rate)
+                await client.send_message(message)
+        count += len(lines)
+        size += sum(len(line) for line in lines)
+    return count, size
+
+
+async def discard_messages(client: WebSocketConnection) -> None:
+    """Reads the messages of the endpoint, an echo server stops reading ours when its answers are not read."""
+    try:
+        while True:
+            await client.get_message()
+    except ConnectionClosed:
+        pass
+
+
+async def send_lines(client: WebSocketConnection, messages: LineMessages) -> Tuple[int, int]:
+    """
+    Sends the lines and closes the connection while the messages of the endpoint are still read. The close handshake
+    is limited to LINES_CLOSE_TIMEOUT_FACTOR times the disconnect timeout, DisconnectionTimeout is raised when it lasts
+    longer.
+    """
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(discard_messages, client)
+        if messages.path is None:
+            # the standard input does not belong to the command, it is not closed
+            result = await send_lines_of_file(client, messages, trio.wrap_file(sys.stdin.buffer))
+        else:
+            async with await trio.open_file(messages.path, 'rb') as f:
+                result = await send_lines_of_file(client, messages, f)
+        with trio.move_on_after(LINES_CLOSE_TIMEOUT_FACTOR * get_settings().disconnect_timeout) as scope:
+            await client.aclose()
+        if scope.cancelled_caught:
+            raise DisconnectionTimeout
+    return result
+
+
+async def send_from_file(client: WebSocketConnection, message: Union[FileMessage, LineMessages]) -> None:
+    """Sends the file or its lines and prints the throughput, the program exits when the file cannot be sent."""
+    source = 'the standard input' if message.path is None else message.path
+    beginning = trio.current_time()
+    try:
+        if isinstance(message, LineMessages):
+            count, size = await send_lines(client, message)
+        else:
+            count, size = 1, await send_file(client, message)
+    except UnicodeDecodeError:
+        console.print(f'[error]{source} is not a valid UTF-8 text')
+        raise SystemExit(1) from None
+    except ConnectionClosed as e:
+        console.print(
+            f'[error]Connection closed by the endpoint with code [number]{e.reason.code}[/] ({e.reason.name})'
+            f' while sending {source}'
+        )
+        raise SystemExit(1) from None
+
+    duration = trio.current_time() - beginning
+    throughput = get_readable_size(int(size / duration)) if duration else 'n/a'
+    if isinstance(message, LineMessages):
+        message_rate = f'{count / duration:.1f}' if duration else 'n/a'
+        console.print(
+            f'Sent [number]{count}[/] messages, [number]{get_readable_size(size)}[/] of data over the wire in'
+            f' [number]{duration:.3f}s[/] ([number]{message_rate}[/] messages/s, [number]{throughput}/s[/]).'
+        )
+    else:
+        console.print(
+            f'Sent [number]{get_readable_size(size)}[/] of data over the wire in [number]{duration:.3f}s[/]'
+            f' ([number]{throughput}/s[/]).'
+        )
+
+
+async def send_message(url: str, message: Union[AnyStr, FileMessage, LineMessages]) -> None:
     async with websocket_client(url) as client:
-        await client.send_message(message)
-        length = len(message)
-        console.print(f'Sent [number]{get_readable_size(length)}[/] of data over the wire.')
-        # the sleep is to give time to the server to handle the message before closing the client
-        # and also to make the tests passed :D
-        await trio.sleep(0.1)
+        # no need to wait before leaving, the close handshake is only done once the messages are written
+        if isinstance(message, (FileMessage, LineMessages)):
+            await send_from_file(client, message)
+        else:
+            await client.send_message(message)
+            console.print(f'Sent [number]{get_readable_size(len(message))}[/] of data over the wire.')
 
 
-async def main(url: str, message: AnyStr) -> None:
+async def main(url: str, message: Union[AnyStr, FileMessage, LineMessages]) -> None:
     async with trio.open_nursery() as nursery:
         nursery.start_soon(function_runner, nursery.cancel_scope, send_message, url, message)
         nursery.start_soon(signal_handler, nursery.cancel_scope)
 
 
+def get_message(
+    message: Union[AnyStr, FileMessage, None], from_stdin: bool, lines: bool, rate: Optional[float], is_bytes: bool
+) -> Union[AnyStr, FileMessage, LineMessages]:
+    if from_stdin:
+        if message is not None:
+            raise click.UsageError('A message cannot be given with the --from-stdin option.')
+        return LineMessages(None, is_bytes, rate)
+
+    if message is None:
+        raise click.UsageError("Missing argument 'MESSAGE'.")
+    if lines:
+        if not isinstance(message, FileMessage):
+            raise click.UsageError('The --lines option needs a file@ message.')
+        return LineMessages(message.path, is_bytes, rate)
+    if rate is not None:
+        raise click.UsageError('The --rate option only applies to the --from-stdin and --lines options.')
+    return message
+
+
+from_stdin_option = click.option(
+    '--from-stdin',
+    is_flag=True,
+    help='Send each line of the standard input as a message instead of MESSAGE. Empty lines are ignored.',
+)
+lines_option = click.option(
+    '-l', '--lines', is_flag=True, help='Send each line of the file@ message as a message. Empty lines are ignored.'
+)
+rate_option = click.option(
+    '-r',
+    '--rate',
+    type=click.FloatRange(min=0, min_open=True),
+    help='Number of messages sent per second with the --from-stdin and --lines options, as many as possible when not'
+    ' given.',
+)
+
+
 @click.command()
 @url_argument
-@click.argument('message', type=ByteParamType())
-def byte(url: str, message: bytes):
+@click.argument('message', type=ByteParamType(stream_files=True), required=False)
+@from_stdin_option
+@lines_option
+@rate_option
+def byte(url: str, message: Union[bytes, FileMessage, None], from_stdin: bool, lines: bool, rate: Optional[float]):
     """Sends binary message to URL endpoint."""
-    trio.run(main, url, message)
+    trio.run(main, url, get_message(message, from_stdin, lines, rate, is_bytes=True))
 
 
 @click.command()
 @url_argument
-@click.argument('message', type=TextParamType())
-def text(url: str, message: str):
+@click.argument('message', type=TextParamType(stream_files=True), required=False)
+@from_stdin_option
+@lines_option
+@rate_option
+def text(url: str, message: Union[str, FileMessage, None], from_stdin: bool, lines: bool, rate: Optional[float]):
     """Sends text message on URL endpoint."""
-    trio.run(main, url, message)
+    trio.run(main, url, get_message(message, from_stdin, lines, rate, is_bytes=False))
@@ -1,8 +1,13 @@
+import html
+import math
 import pathlib
-from typing import Optional
+import threading
+import time
+from typing import IO, Dict, List, Optional
 
-from rich.console import Console
+from rich.console import CONSOLE_HTML_FORMAT, CONSOLE_SVG_FORMAT, Console, ConsoleRenderable, RenderHook
 from rich.style import Style
+from rich.terminal_theme import DEFAULT_TERMINAL_THEME, SVG_EXPORT_THEME
 from rich.theme import Theme
 
 from ws.settings import Settings
@@ -19,15 +24,249 @@ data = {
 custom_theme = Theme(data)
 
 console = Console(theme=custom_theme)
+# used for messages which must not be mixed with the data written on the standard output
+error_console = Console(theme=custom_theme, stderr=True)
+
+# recorded output is appended to the file at most every FLUSH_INTERVAL seconds, so memory usage stays bounded
+FLUSH_INTERVAL = 1.0
+
+# values used by rich to compute the size of the svg terminal
+SVG_CHAR_HEIGHT = 20
+SVG_CHAR_WIDTH = SVG_CHAR_HEIGHT * 0.61
+SVG_LINE_HEIGHT = SVG_CHAR_HEIGHT * 1.22
+SVG_UNIQUE_ID = 'ws-terminal'
+# each flush of an svg file is exported with this format, the first line gives the height of the chunk
+SVG_CHUNK_FORMAT = """\
+{{terminal_height}}
+<g transform="translate(0, {offset:g})">
+<style>
+{{styles}}
+</style>
+<defs>
+{{lines}}
+</defs>
+{{backgrounds}}
+<g class="{unique_id}-matrix">
+{{matrix}}
+</g>
+</g>
+"""
+SVG_CHUNKS_MARKER = '<!-- ws chunks -->'
+# room left after the svg header for the size of the image to grow, the header is rewritten in place after each flush
+SVG_HEADER_PADDING = 64
+
+
+class OutputRecorder(RenderHook):
+    """
+    Appends the output recorded by a console to a file while the program is running, instead of keeping all of it in
+    memory until the end. The file is completed when the recorder is closed.
+    Output is flushed by the next print once the flush interval is elapsed, and by a background thread every flush
+    interval, so that the output of a burst of prints followed by a quiet period is also written.
+    """
+
+    def __init__(self, terminal: Console, filename: str, flush_interval: float = FLUSH_INTERVAL):
+        self._terminal = terminal
+        self._file: IO[str] = open(filename, 'w', encoding='utf-8')
+        self._flush_interval = flush_interval
+        self._next_flush = time.monotonic() + flush_interval
+        # flushes happen in the thread of the prints and in the background thread
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._write_header()
+        self._thread: Optional[threading.Thread] = None
+        if 0 < flush_interval < math.inf:
+            self._thread = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._thread.start()
+
+    def _write_header(self) -> None:
+        pass
+
+    def _write_footer(self) -> None:
+        pass
+
+    def _write(self, data: str) -> None:
+        self._file.write(data)
+
+    def _export(self) -> str:
+        return self._terminal.export_text(clear=True)
+
+    def _has_output(self) -> bool:
+        # rich has no public way to know if something was recorded, and an empty svg export is a one line terminal
+        return bool(self._terminal._record_buffer)
+
+    def _flush_periodically(self) -> None:
+        while not self._stopped.wait(self._flush_interval):
+            self.flush()
+
+    def process_renderables(self, renderables: List[ConsoleRenderable]) -> List[ConsoleRenderable]:
+        # the hook is called before rendering, so the output of the current print is flushed on a later call
+        if time.monotonic() >= self._next_flush:
+            self.flush()
+        return renderables
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._file.closed and self._has_output():
+                self._write(self._export())
+                self._file.flush()
+            self._next_flush = time.monotonic() + self._flush_interval
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        with self._lock:
+            self._write_footer()
+            self._file.close()
+
+
+class HtmlOutputRecorder(OutputRecorder):
+    """Writes an html file where styles are inlined in the recorded output."""
+
+    def __init__(self, terminal: Console, filename: str, flush_interval: float = FLUSH_INTERVAL):
+        header, self._footer = CONSOLE_HTML_FORMAT.split('{code}')
+        self._header = header.format(
+            stylesheet='',
+            foreground=DEFAULT_TERMINAL_THEME.foreground_color.hex,
+            background=DEFAULT_TERMINAL_THEME.background_color.hex,
+        )
+        super().__init__(terminal, filename, flush_interval)
+
+    def _write_header(self) -> None:
+        self._file.write(self._header)
+
+    def _write_footer(self) -> None:
+        self._file.write(self._footer)
+
+    def _export(self) -> str:
+        return self._terminal.export_html(clear=True, inline_styles=True, code_format='{code}')
+
+
+class SvgOutputRecorder(OutputRecorder):
+    """
+    Writes an svg file. The size of the image depends on the number of recorded lines, so each flush appends a chunk
+    of the image, writes the footer after it and rewrites the header in place with the new size. The file is a valid
+    svg image after each flush, even if the program does not close the recorder.
+    """
+
+    def __init__(self, terminal: Console, filename: str, flush_interval: float = FLUSH_INTERVAL):
+        self._title = pathlib.Path(filename).name
+        self._chunk_count = 0
+        self._height = 0.0
+        self._header_size = 0
+        # position of the footer, where the next chunk is written
+        self._chunks_end = 0
+        super().__init__(terminal, filename, flush_interval)
+
+    def _export(self) -> str:
+        code_format = SVG_CHUNK_FORMAT.format(offset=self._height, unique_id=SVG_UNIQUE_ID)
+        self._chunk_count += 1
+        svg = self._terminal.export_svg(
+            title=self._title, clear=True, code_format=code_format, unique_id=f'{SVG_UNIQUE_ID}-{self._chunk_count}'
+        )
+        height, chunk = svg.split('\n', 1)
+        # rich removes one pixel from the height of the lines
+        self._height += float(height) + 1
+        return chunk
+
+    def _get_chrome(self, width: float, height: float) -> str:
+        """Returns the window decoration drawn by rich around the terminal."""
+        title = html.escape(self._title).replace(' ', '&#160;')
+        return (
+            f'<rect fill="{SVG_EXPORT_THEME.background_color.hex}" stroke="rgba(255,255,255,0.35)" stroke-width="1"'
+            f' x="1" y="1" width="{width:g}" height="{height:g}" rx="8"/>'
+            f'<text class="{SVG_UNIQUE_ID}-title" fill="{SVG_EXPORT_THEME.foreground_color.hex}" text-anchor="middle"'
+            f' x="{width // 2:g}" y="{1 + SVG_CHAR_HEIGHT + 6}">{title}</text>'
+            '<g transform="translate(26,22)">'
+            '<circle cx="0" cy="0" r="7" fill="#ff5f57"/>'
+            '<circle cx="22" cy="0" r="7" fill="#febc2e"/>'
+            '<circle cx="44" cy="0" r="7" fill="#28c840"/>'
+            '</g>'
+        )
+
+    def _get_header_and_footer(self) -> List[str]:
+        # like rich, an empty output is drawn as a terminal of one line
+        height = max(self._height, SVG_LINE_HEIGHT)
+        # 16 and 48 are the horizontal and vertical paddings used by rich
+        terminal_width = math.ceil(self._terminal.width * SVG_CHAR_WIDTH + 16)
+        terminal_height = height + 48
+        svg = CONSOLE_SVG_FORMAT.format(
+            unique_id=SVG_UNIQUE_ID,
+            char_width=SVG_CHAR_WIDTH,
+            char_height=SVG_CHAR_HEIGHT,
+            line_height=SVG_LINE_HEIGHT,
+            # sizes are rounded so that the length of the header barely changes when it is rewritten
+            terminal_width=round(SVG_CHAR_WIDTH * self._terminal.width - 1, 1),
+            terminal_height=round(height - 1, 1),
+            width=terminal_width + 2,
+            height=round(terminal_height + 2, 1),
+            terminal_x=9,
+            terminal_y=41,
+            styles='',
+            chrome=self._get_chrome(terminal_width, terminal_height),
+            backgrounds=SVG_CHUNKS_MARKER,
+            matrix='',
+            lines='',
+        )
+        return svg.split(SVG_CHUNKS_MARKER)
+
+    def _write_header(self) -> None:
+        header, footer = self._get_header_and_footer()
+        if not self._header_size:
+            self._header_size = len(header) + SVG_HEADER_PADDING
+        # the header keeps the same size, so that it can be rewritten without moving the chunks
+        padding = self._header_size - len(header) - len('<!---->')
+        if padding < 0:
+            raise ValueError('the svg header does not fit in the room reserved for it')
+        self._file.seek(0)
+        self._file.write(f'{header}<!--{" " * padding}-->')
+        if not self._chunks_end:
+            self._chunks_end = self._file.tell()
+            self._file.write(footer)
+            # the file is a valid image even if the program stops before the first periodic flush
+            self._file.flush()
+
+    def _write(self, data: str) -> None:
+        self._file.seek(self._chunks_end)
+        self._file.write(data)
+        self._chunks_end = self._file.tell()
+        self._file.write(self._get_header_and_footer()[1])
+        self._write_header()
+
+
+_recorders: Dict[Console, OutputRecorder] = {}
+
+
+def create_output_recorder(terminal: Console, filename: str) -> OutputRecorder:
+    suffix = pathlib.Path(filename).suffix
+    if suffix == '.html':
+        return HtmlOutputRecorder(terminal, filename)
+    if suffix == '.svg':
+        return SvgOutputRecorder(terminal, filename)
+    return OutputRecorder(terminal, filename)
 
 
 def configure_console_recording(terminal: Console, settings: Settings, filename: Optional[str] = None) -> None:
     if filename is not None:
         terminal.record = True
+        if terminal in _recorders:
+            _recorders.pop(terminal).close()
+            terminal.pop_render_hook()
+        recorder = create_output_recorder(terminal, filename)
+        terminal.push_render_hook(recorder)
+        _recorders[terminal] = recorder
     terminal.width = settings.terminal_width
 
 
 def save_output(terminal: Console, filename: str) -> None:
+    recorder = _recorders.pop(terminal, None)
+    if recorder is not None:
+        terminal.pop_render_hook()
+        recorder.close()
+        return
+
+    # the recording was not configured with a file, so all the output is still in memory
     file_path = pathlib.Path(filename)
     if file_path.suffix == '.html':
         terminal.save_html(filename)
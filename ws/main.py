@@ -1,21 +1,86 @@
+import importlib
+import sys
+from typing import Dict, List, Optional, Tuple
+
 import click
 from click_didyoumean import DYMGroup
-from rich.traceback import install
 
-from ws.commands.completion import install_completion
-from ws.commands.echo_server import echo_server
-from ws.commands.listen import listen
-from ws.commands.ping import ping
-from ws.commands.pong import pong
-from ws.commands.session import session
-from ws.commands.tail import tail
-from ws.commands.text_byte import byte, text
+# name of each command, with the location of its function and its short help. Command modules are imported only when
+# their command runs, and the short help is written here so that the help of the program does not import them all.
+LAZY_COMMANDS: Dict[str, Tuple[str, str]] = {
+    'bench': ('ws.commands.bench:bench', 'Benchmarks a websocket echo server located at URL.'),
+    'broadcast-server': ('ws.commands.broadcast_server:broadcast_server', 'Runs a broadcast websocket server.'),
+    'byte': ('ws.commands.text_byte:byte', 'Sends binary message to URL endpoint.'),
+    'echo-server': ('ws.commands.echo_server:echo_server', 'Runs an echo websocket server.'),
+    'install-completion': (
+        'ws.commands.completion:install_completion',
+        'Install completion script for bash, zsh and fish shells.',
+    ),
+    'listen': ('ws.commands.listen:listen', 'Listens messages on one or several URLs.'),
+    'ping': ('ws.commands.ping:ping', 'Pings a websocket server located at URL.'),
+    'pong': ('ws.commands.pong:pong', 'Sends a pong to websocket server located at URL.'),
+    'rtt': ('ws.commands.rtt:rtt', 'Measures application round trip times against an echo endpoint located at URL.'),
+    'session': (
+        'ws.commands.session:session',
+        'Opens an interactive session to communicate with endpoint located at URL.',
+    ),
+    'tail': (
+        'ws.commands.tail:tail',
+        'An emulator of the tail unix command that output the last lines of each FILENAME.',
+    ),
+    'text': ('ws.commands.text_byte:text', 'Sends text message on URL endpoint.'),
+}
+
+
+def excepthook(*args) -> None:
+    """Installs rich tracebacks on the first uncaught exception, since rich.traceback imports pygments."""
+    from rich.traceback import install
+
+    install(show_locals=True)
+    sys.excepthook(*args)
+
+
+sys.excepthook = excepthook
+
+
+class LazyGroup(DYMGroup):
+    """Group importing the module of a command only when the command is used."""
 
-install(show_locals=True)
+    def __init__(self, *args, lazy_commands: Optional[Dict[str, Tuple[str, str]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = {} if lazy_commands is None else lazy_commands
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name in self.commands or cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+
+        module_name, attribute = self.lazy_commands[cmd_name][0].split(':')
+        command = getattr(importlib.import_module(module_name), attribute)
+        # the command is kept, so the module is looked up only once
+        self.add_command(command, cmd_name)
+        return command
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        """Same output as click, the short help of lazy commands is taken from their declaration."""
+        rows = []
+        names = self.list_commands(ctx)
+        limit = formatter.width - 6 - max((len(name) for name in names), default=0)
+        for name in names:
+            # a command without callback is enough to shorten the help like click does
+            command = self.commands.get(name) or click.Command(name, help=self.lazy_commands[name][1])
+            if not command.hidden:
+                rows.append((name, command.get_short_help_str(limit)))
+
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
 
 
 @click.version_option('0.1.0', message='%(prog)s version %(version)s')
-@click.group(cls=DYMGroup, context_settings={'help_option_names': ['-h', '--help']})
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS, context_settings={'help_option_names': ['-h', '--help']})
 def cli():
     """
     A convenient websocket cli.
@@ -36,9 +101,5 @@ def cli():
     """
 
 
-for command in [tail, ping, pong, echo_server, listen, byte, text, install_completion, session]:
-    cli.add_command(command)
-
-
 if __name__ == '__main__':  # pragma: no cover
     cli()
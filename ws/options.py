@@ -69,3 +69,11 @@ filename_option = click.option(
         'extensions will be considered as text files.'
     ),
 )
+
+timings_option = click.option(
+    '--timings',
+    'with_timings',
+    is_flag=True,
+    help='Print the duration of each step of the connection: DNS resolution, TCP connect, TLS handshake, HTTP upgrade'
+    ' and close.',
+)
@@ -1,5 +1,7 @@
 import ipaddress
+import os
 import re
+from dataclasses import dataclass
 from typing import AnyStr, Optional, Union
 
 import click
@@ -30,6 +32,27 @@ class WsUrlParamType(click.ParamType):
             self.fail(f'{value} is not a valid websocket url', param, ctx)
 
 
+@dataclass(frozen=True)
+class FileMessage:
+    """A file@ message, its content is read while it is sent instead of when the command line is parsed."""
+
+    path: str
+    size: int
+    is_bytes: bool
+
+
+def get_file_message(message: str, is_bytes: bool) -> FileMessage:
+    """Checks that the file of a file@ message can be read, without reading it."""
+    file = message[5:]
+    try:
+        with open(file, 'rb') as f:
+            return FileMessage(file, os.fstat(f.fileno()).st_size, is_bytes)
+    except FileNotFoundError:
+        raise click.BadParameter(f'file {file} does not exist') from None
+    except OSError:
+        raise click.BadParameter(f'file {file} cannot be opened') from None
+
+
 def get_normalized_message(message: str, is_bytes: bool) -> AnyStr:
     if message.startswith('file@'):
         file = message[5:]
@@ -46,12 +69,20 @@ def get_normalized_message(message: str, is_bytes: bool) -> AnyStr:
 
 
 class ByteParamType(click.ParamType):
+    """With stream_files, a file@ value is returned as a FileMessage, the length of files is not checked."""
+
     name = 'bytes'
 
-    def __init__(self, max_length: Optional[int] = None):
+    def __init__(self, max_length: Optional[int] = None, stream_files: bool = False):
         self._max_length = max_length
+        self._stream_files = stream_files
+
+    def convert(
+        self, value: str, param: Optional[click.Parameter], ctx: Optional[click.Context]
+    ) -> Union[bytes, FileMessage]:
+        if self._stream_files and value.startswith('file@'):
+            return get_file_message(value, is_bytes=True)
 
-    def convert(self, value: str, param: Optional[click.Parameter], ctx: Optional[click.Context]) -> bytes:
         original_value = value
         value = get_normalized_message(value, is_bytes=True)
         if self._max_length is not None:
@@ -62,12 +93,20 @@ class ByteParamType(click.ParamType):
 
 
 class TextParamType(click.ParamType):
+    """With stream_files, a file@ value is returned as a FileMessage, the length of files is not checked."""
+
     name = 'text'
 
-    def __init__(self, max_length: Optional[int] = None):
+    def __init__(self, max_length: Optional[int] = None, stream_files: bool = False):
         self._max_length = max_length
+        self._stream_files = stream_files
+
+    def convert(
+        self, value: str, param: Optional[click.Parameter], ctx: Optional[click.Context]
+    ) -> Union[str, FileMessage]:
+        if self._stream_files and value.startswith('file@'):
+            return get_file_message(value, is_bytes=False)
 
-    def convert(self, value: str, param: Optional[click.Parameter], ctx: Optional[click.Context]) -> str:
         original_value = value
         value = get_normalized_message(value, is_bytes=False)
         if self._max_length is not None:
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import functools
 import math
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import Any, List, Optional, Tuple, Union
 
 import tomli
 from pydantic import Field, FilePath, field_validator
@@ -20,11 +21,16 @@ class Settings(BaseSettings):
     message_queue_size: int = Field(1, ge=0)
     max_message_size: int = Field(1024 * 1024, gt=0)
     extra_headers: Optional[List[Tuple[str, str]]] = None
-    terminal_width: int = Field(Console().width, gt=0)
+    terminal_width: int = Field(default_factory=lambda: Console().width, gt=0)
     tls_ca_file: Optional[FilePath] = None
     tls_certificate_file: Optional[FilePath] = None
     tls_key_file: Optional[FilePath] = None
     tls_password: Optional[str] = None
+    compression: bool = False
+    compression_client_max_window_bits: Optional[int] = Field(None, ge=9, le=15)
+    compression_server_max_window_bits: Optional[int] = Field(None, ge=9, le=15)
+    compression_client_no_context_takeover: bool = False
+    compression_server_no_context_takeover: bool = False
 
     @field_validator('response_timeout', mode='before')
     @classmethod
@@ -45,22 +51,20 @@ def get_config_from_toml(filename: Union[str, Path]) -> Optional[dict[str, float
         return data['tool']['ws']
 
 
-def get_settings() -> Settings:
+@functools.lru_cache(maxsize=None)
+def _resolve_settings() -> Settings:
     pyproject_file = Path.cwd() / 'pyproject.toml'
     local_env_file = Path.cwd() / ENV_FILE
     home_env_file = Path.home() / ENV_FILE
 
     if pyproject_file.exists():
-        settings = Settings()
         config = get_config_from_toml(pyproject_file)
         if config is None:
-            return settings
+            return Settings()
 
-        for item in Settings.model_fields.keys():
-            if item in config:
-                setattr(settings, item, config[item])
-
-        return settings
+        # values of the toml file are given to the constructor, so they are validated and take precedence over the
+        # environment in a single pass
+        return Settings(**{key: value for key, value in config.items() if key in Settings.model_fields})
 
     if local_env_file.exists():
         return Settings(_env_file=local_env_file)
@@ -69,3 +73,19 @@ def get_settings() -> Settings:
         return Settings(_env_file=home_env_file)
 
     return Settings()
+
+
+def get_settings(**overrides: Any) -> Settings:
+    """
+    Returns the settings of the program. Configuration files and the environment are read once per process, the
+    result is cached and must not be modified. Overrides are validated and applied on a copy of the cached settings.
+    """
+    settings = _resolve_settings()
+    if not overrides:
+        return settings
+    return Settings.model_validate({**settings.model_dump(), **overrides})
+
+
+def clear_settings_cache() -> None:
+    """Forgets the resolved settings, the next call to get_settings reads the configuration again."""
+    _resolve_settings.cache_clear()
@@ -1,11 +1,12 @@
 import argparse
+import dataclasses
 import enum
-from typing import List, Sequence
+from typing import AnyStr, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 
 import click
 import trio
 from click.parser import split_arg_string
-from pydantic import ConfigDict
+from prompt_toolkit.completion import NestedCompleter
 from pydantic.dataclasses import dataclass
 from rich.console import Console
 from rich.markdown import Markdown
@@ -13,6 +14,7 @@ from trio_websocket import WebSocketConnection
 
 from ws.parameters import get_normalized_message
 from ws.settings import Settings
+from ws.utils.compat import DEFAULT_PING_PAYLOAD_SIZE
 from ws.utils.documentation import BYTE_HELP, CLOSE_HELP, HELP, PING_HELP, PONG_HELP, QUIT_HELP, TEXT_HELP
 from ws.utils.size import get_readable_size
 
@@ -23,10 +25,16 @@ class CommandHelper:
     args: List[str]
 
 
-@dataclass(frozen=True, config=ConfigDict(arbitrary_types_allowed=True))
-class NamespaceData:
-    obj: argparse.Namespace
-    unknown_arguments: List[str]
+@dataclasses.dataclass
+class CommandContext:
+    """What the commands of a session act on."""
+
+    url: str
+    client: WebSocketConnection
+    terminal: Console
+    settings: Settings
+    # set before the close handshake, so that the end of the connection is not reported as unexpected
+    is_closed_by_user: bool = False
 
 
 class Command(str, enum.Enum):
@@ -48,15 +56,17 @@ def plural_form(sequence: Sequence) -> str:
     return 's' if len(sequence) > 1 else ''
 
 
-def handle_unknown_arguments(unknown_arguments: List[str], terminal: Console) -> None:
-    arguments = ' '.join(unknown_arguments)
-    terminal.print(f'Unknown argument{plural_form(unknown_arguments)}: [warning]{arguments}[/]')
+class CommandError(Exception):
+    """Raised when the arguments of a session command are not valid, the message contains rich markup."""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
 
 
-def get_namespace_data(arguments: List[str], argument: str, nargs: str = '?') -> NamespaceData:
-    parser = argparse.ArgumentParser()
-    parser.add_argument(argument, nargs=nargs)
-    return NamespaceData(*parser.parse_known_args(arguments))
+def get_unknown_arguments_message(unknown_arguments: List[str]) -> str:
+    arguments = ' '.join(unknown_arguments)
+    return f'Unknown argument{plural_form(unknown_arguments)}: [warning]{arguments}[/]'
 
 
 def print_unknown_command_message(unknown_command: str, commands: List[str], terminal: Console) -> None:
@@ -66,153 +76,250 @@ def print_unknown_command_message(unknown_command: str, commands: List[str], ter
     terminal.print()
 
 
-def handle_help_command(arguments: List[str], terminal: Console) -> None:
-    namespace_data = get_namespace_data(arguments, 'command')
-    if namespace_data.unknown_arguments:
-        handle_unknown_arguments(namespace_data.unknown_arguments, terminal)
-        return
-
-    if namespace_data.obj.command is None:
-        terminal.print(HELP)
-        return
-
-    commands = [command.value for command in Command if command.value != 'help']
-    if namespace_data.obj.command not in commands:
-        print_unknown_command_message(namespace_data.obj.command, commands, terminal)
-        return
-
-    help_messages = {
-        Command.PING.value: PING_HELP,
-        Command.PONG.value: PONG_HELP,
-        Command.QUIT.value: QUIT_HELP,
-        Command.CLOSE.value: CLOSE_HELP,
-        Command.TEXT.value: TEXT_HELP,
-        Command.BYTE.value: BYTE_HELP,
-    }
-
-    for key, value in help_messages.items():
-        if key == namespace_data.obj.command:
-            terminal.print(Markdown(value))
-            return
-
-
-async def handle_ping_command(
-    url: str, arguments: List[str], terminal: Console, client: WebSocketConnection, settings: Settings
-) -> None:
-    namespace_data = get_namespace_data(arguments, 'message')
-    if namespace_data.unknown_arguments:
-        handle_unknown_arguments(namespace_data.unknown_arguments, terminal)
-        return
-
-    # trio_websocket by default sends 32 bytes if no payload is given
-    if namespace_data.obj.message is None:
-        payload_length = 32
-        message = None
-    else:
-        message = namespace_data.obj.message.encode()
-        payload_length = len(message)
+CommandHandler = Callable[[CommandContext, argparse.Namespace], Awaitable[bool]]
+
+
+class SessionCommand:
+    """
+    A command of the session. Its arguments are all optional positional arguments, given with their default value, and
+    its parser is built once when the command is created. The handler returns True when the session must end.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: CommandHandler,
+        summary: str,
+        help_text: Optional[str] = None,
+        arguments: Optional[Dict[str, Optional[str]]] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.summary = summary
+        self.help_text = help_text
+        # without help option, "-h" is reported as an unknown argument instead of exiting the program
+        self._parser = argparse.ArgumentParser(prog=name, add_help=False)
+        for argument, default in (arguments or {}).items():
+            self._parser.add_argument(argument, nargs='?', default=default)
+        self._help: Optional[Markdown] = None
+
+    def parse_arguments(self, arguments: List[str]) -> argparse.Namespace:
+        namespace, unknown_arguments = self._parser.parse_known_args(arguments)
+        if unknown_arguments:
+            raise CommandError(get_unknown_arguments_message(unknown_arguments))
+        return namespace
+
+    def get_help(self) -> Optional[Markdown]:
+        if self._help is None and self.help_text is not None:
+            self._help = Markdown(self.help_text)
+        return self._help
+
+
+class CommandRegistry:
+    """
+    Session commands by name, it dispatches user inputs and drives the completion and help of the session. The help
+    command is registered with the registry, it documents the commands registered afterwards.
+    """
+
+    def __init__(self):
+        self._commands: Dict[str, SessionCommand] = {}
+        self.register(SessionCommand(Command.HELP.value, self.handle_help_command, '', arguments={'command': None}))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._commands
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._commands)
+
+    def register(self, command: SessionCommand) -> None:
+        if command.name in self._commands:
+            raise ValueError(f'session command {command.name} is already registered')
+        self._commands[command.name] = command
+
+    def get(self, name: str) -> SessionCommand:
+        return self._commands[name]
+
+    def get_completer(self) -> NestedCompleter:
+        commands_with_help = {name for name, command in self._commands.items() if command.help_text is not None}
+        return NestedCompleter.from_nested_dict(
+            {name: commands_with_help if name == Command.HELP.value else None for name in self._commands}
+        )
+
+    def get_general_help(self) -> str:
+        summaries = [command.summary for command in self._commands.values() if command.name != Command.HELP.value]
+        return '\n'.join([HELP, *summaries]) + '\n'
+
+    async def handle_help_command(self, context: CommandContext, arguments: argparse.Namespace) -> bool:
+        if arguments.command is None:
+            context.terminal.print(self.get_general_help())
+            return False
+
+        commands = [name for name, command in self._commands.items() if command.help_text is not None]
+        if arguments.command not in commands:
+            print_unknown_command_message(arguments.command, commands, context.terminal)
+            return False
+
+        context.terminal.print(self._commands[arguments.command].get_help())
+        return False
+
+    async def dispatch(self, context: CommandContext, user_input: str) -> bool:
+        """Runs the command typed by the user, returns True when the session must end."""
+        command_line = parse_command(user_input)
+        command = self._commands.get(command_line.name)
+        if command is None:
+            print_unknown_command_message(command_line.name, self.names, context.terminal)
+            return False
+
+        try:
+            namespace = command.parse_arguments(command_line.args)
+            return await command.handler(context, namespace)
+        except CommandError as e:
+            context.terminal.print(e.message)
+            return False
+
+
+def check_control_payload(message: Optional[str], frame_type: str) -> Optional[bytes]:
+    """Returns the payload of a PING or PONG frame, None when no message is given."""
+    if message is None:
+        return None
+
+    payload = message.encode()
+    if len(payload) > 125:
+        raise CommandError(
+            f'[error]The message of a {frame_type} must not exceed a length'
+            f' of [number]125[/] bytes but you provided [number]{len(payload)}[/] bytes.\n'
+        )
+    return payload
+
+
+def check_data_message(message: Optional[str], is_byte: bool = False) -> AnyStr:
+    if message is None:
+        raise CommandError('[error]The message is mandatory.\n')
+
+    try:
+        return get_normalized_message(message, is_bytes=is_byte)
+    except click.BadParameter as e:
+        raise CommandError(f'[error]{e.message}\n') from None
+
+
+def check_close_arguments(code: str, reason: Optional[str]) -> Tuple[int, Optional[str]]:
+    """Returns the code and the optional reason of a close frame."""
+    try:
+        close_code = int(code)
+    except ValueError:
+        raise CommandError(f'[error]code "{code}" is not an integer.\n') from None
+
+    if not 0 <= close_code < 5000:
+        raise CommandError(f'[error]code {close_code} is not in the range [0, 4999].\n')
 
-    if payload_length > 125:
-        terminal.print(
-            '[error]The message of a PING must not exceed a length'
-            f' of [number]125[/] bytes but you provided [number]{payload_length}[/] bytes.\n'
+    if reason is not None and len(reason) > 123:
+        raise CommandError(
+            '[error]reason must not exceed a length of [number]123[/]'
+            f' bytes but you provided [number]{len(reason)}[/] bytes.\n'
         )
-        return
+    return close_code, reason
+
+
+async def handle_quit_command(context: CommandContext, arguments: argparse.Namespace) -> bool:
+    return True
+
 
+async def handle_ping_command(context: CommandContext, arguments: argparse.Namespace) -> bool:
+    message = check_control_payload(arguments.message, 'PING')
+    payload_length = DEFAULT_PING_PAYLOAD_SIZE if message is None else len(message)
     plural = 's' if payload_length > 1 else ''
-    terminal.print(f'PING {url} with {payload_length} byte{plural} of data')
+    context.terminal.print(f'PING {context.url} with {payload_length} byte{plural} of data')
 
+    response_timeout = context.settings.response_timeout
     beginning = trio.current_time()
-    with trio.move_on_after(settings.response_timeout) as scope:
-        await client.ping(message)
+    with trio.move_on_after(response_timeout) as scope:
+        await context.client.ping(message)
         duration = trio.current_time() - beginning
 
     if scope.cancelled_caught:
-        terminal.print(
+        context.terminal.print(
             f'[warning]Unable to receive pong before configured response timeout'
-            f' ([/][number]{settings.response_timeout}[/]s).\n'
+            f' ([/][number]{response_timeout}[/]s).\n'
         )
     else:
-        terminal.print(f'Took [number]{duration:.2f}s[/] to receive a PONG.\n')
-
-
-async def handle_pong_command(url: str, arguments: List[str], terminal: Console, client: WebSocketConnection) -> None:
-    namespace_data = get_namespace_data(arguments, 'message')
-    if namespace_data.unknown_arguments:
-        handle_unknown_arguments(namespace_data.unknown_arguments, terminal)
-        return
-
-    if namespace_data.obj.message is None:
-        message = b''
-        payload_length = 0
-    else:
-        message = namespace_data.obj.message.encode()
-        payload_length = len(message)
+        context.terminal.print(f'Took [number]{duration:.2f}s[/] to receive a PONG.\n')
+    return False
 
-    if payload_length > 125:
-        terminal.print(
-            '[error]The message of a PONG must not exceed a length'
-            f' of [number]125[/] bytes but you provided [number]{payload_length}[/] bytes.\n'
-        )
-        return
 
+async def handle_pong_command(context: CommandContext, arguments: argparse.Namespace) -> bool:
+    message = check_control_payload(arguments.message, 'PONG') or b''
+    payload_length = len(message)
     plural = 's' if payload_length > 1 else ''
-    terminal.print(f'PONG {url} with {payload_length} byte{plural} of data')
+    context.terminal.print(f'PONG {context.url} with {payload_length} byte{plural} of data')
 
     before = trio.current_time()
-    await client.pong(message)
+    await context.client.pong(message)
     duration = trio.current_time() - before
-    terminal.print(f'Took [number]{duration:.2f}s[/] to send the PONG.\n')
+    context.terminal.print(f'Took [number]{duration:.2f}s[/] to send the PONG.\n')
+    return False
 
 
-async def handle_data_command(
-    arguments: List[str], terminal: Console, client: WebSocketConnection, is_byte: bool = False
-) -> None:
-    namespace_data = get_namespace_data(arguments, 'message')
-    if namespace_data.unknown_arguments:
-        handle_unknown_arguments(namespace_data.unknown_arguments, terminal)
-        return
+async def send_data_message(context: CommandContext, message: AnyStr) -> bool:
+    await context.client.send_message(message)
+    context.terminal.print(f'Sent [number]{get_readable_size(len(message))}[/] of data over the wire.\n')
+    return False
 
-    if namespace_data.obj.message is None:
-        terminal.print('[error]The message is mandatory.\n')
-        return
 
-    try:
-        message = get_normalized_message(namespace_data.obj.message, is_bytes=is_byte)
-    except click.BadParameter as e:
-        terminal.print(f'[error]{e.message}\n')
-        return
+async def handle_text_command(context: CommandContext, arguments: argparse.Namespace) -> bool:
+    return await send_data_message(context, check_data_message(arguments.message))
 
-    await client.send_message(message)
-    length = len(message)
-    terminal.print(f'Sent [number]{get_readable_size(length)}[/] of data over the wire.\n')
 
+async def handle_byte_command(context: CommandContext, arguments: argparse.Namespace) -> bool:
+    return await send_data_message(context, check_data_message(arguments.message, is_byte=True))
 
-async def handle_close(arguments: List[str], terminal: Console, client: WebSocketConnection) -> bool:
-    parser = argparse.ArgumentParser()
-    parser.add_argument('code', default='1000')
-    parser.add_argument('reason', nargs='?')
-    obj, unknown_arguments = parser.parse_known_args(arguments)
-    if unknown_arguments:
-        handle_unknown_arguments(unknown_arguments, terminal)
-        return False
-
-    try:
-        code = int(obj.code)
-    except ValueError:
-        terminal.print(f'[error]code "{obj.code}" is not an integer.\n')
-        return False
 
-    if not 0 <= code < 5000:
-        terminal.print(f'[error]code {code} is not in the range [0, 4999].\n')
-        return False
+async def handle_close_command(context: CommandContext, arguments: argparse.Namespace) -> bool:
+    code, reason = check_close_arguments(arguments.code, arguments.reason)
+    context.is_closed_by_user = True
+    await context.client.aclose(code, reason)  # type: ignore
+    return True
 
-    if obj.reason is not None and len(obj.reason) > 123:
-        terminal.print(
-            '[error]reason must not exceed a length of [number]123[/]'
-            f' bytes but you provided [number]{len(obj.reason)}[/] bytes.\n'
-        )
-        return False
 
-    await client.aclose(code, obj.reason)  # type: ignore
-    return True
+command_registry = CommandRegistry()
+for _command in [
+    SessionCommand(
+        Command.PING.value,
+        handle_ping_command,
+        '• [info]ping[/] <message>: Sends a ping with an optional message.',
+        PING_HELP,
+        {'message': None},
+    ),
+    SessionCommand(
+        Command.PONG.value,
+        handle_pong_command,
+        '• [info]pong[/] <message>: Sends a pong with an optional message.',
+        PONG_HELP,
+        {'message': None},
+    ),
+    SessionCommand(
+        Command.TEXT.value,
+        handle_text_command,
+        '• [info]text[/] [green]message[/]: Sends text message.',
+        TEXT_HELP,
+        {'message': None},
+    ),
+    SessionCommand(
+        Command.BYTE.value,
+        handle_byte_command,
+        '• [info]byte[/] [green]message[/]: Sends byte message.',
+        BYTE_HELP,
+        {'message': None},
+    ),
+    SessionCommand(
+        Command.CLOSE.value,
+        handle_close_command,
+        '• [info]close[/] <code> <reason>: Closes the websocket connection with an optional code and message.',
+        CLOSE_HELP,
+        {'code': '1000', 'reason': None},
+    ),
+    SessionCommand(
+        Command.QUIT.value, handle_quit_command, '• [info]quit[/]: equivalent to [bold]close 1000[/].', QUIT_HELP
+    ),
+]:
+    command_registry.register(_command)
@@ -0,0 +1,62 @@
+"""
+Features missing from trio-websocket, built on its private attributes. They are copied from trio-websocket 0.11.1, the
+version pinned in pyproject.toml, and must be checked against its source code when it is upgraded.
+"""
+import dataclasses
+from typing import Dict, List
+
+import trio
+from trio_websocket import ConnectionClosed, WebSocketConnection, WebSocketRequest
+from wsproto.events import AcceptConnection, Event
+from wsproto.extensions import Extension
+
+# trio-websocket sends a random payload of 32 bits when a ping is given no payload
+DEFAULT_PING_PAYLOAD_SIZE = 4
+
+
+def add_request_extensions(connection: WebSocketConnection, extensions: List[Extension]) -> None:
+    """Adds extensions to the opening handshake request of a client connection, before the reader task sends it."""
+    connection._initial_request = dataclasses.replace(connection._initial_request, extensions=extensions)
+
+
+async def open_client_handshake(nursery: trio.Nursery, connection: WebSocketConnection) -> None:
+    """Starts the reader task of a client connection and waits for the opening handshake, like connect_websocket."""
+    nursery.start_soon(connection._reader_task)
+    await connection._open_handshake.wait()
+
+
+async def accept_request_with_extensions(request: WebSocketRequest, extensions: List[Extension]) -> WebSocketConnection:
+    """Accepts the request like WebSocketRequest.accept does, with the extensions added to the handshake response."""
+    connection = request._connection
+    connection._subprotocol = None
+    connection._path = request.path
+    await connection._send(AcceptConnection(extensions=extensions))
+    connection._open_handshake.set()
+    return connection
+
+
+async def send_event(connection: WebSocketConnection, event: Event) -> None:
+    """Sends a wsproto event, for the frames trio-websocket has no method for."""
+    await connection._send(event)
+
+
+def encode_event(connection: WebSocketConnection, event: Event) -> bytes:
+    """Returns the frame of a wsproto event without sending it, to write several frames at once with send_frame."""
+    return connection._wsproto.send(event)
+
+
+def get_pending_pings(connection: WebSocketConnection) -> Dict[bytes, trio.Event]:
+    """Returns the events set when the pong of each pending ping payload is received."""
+    return connection._pings
+
+
+async def send_frame(connection: WebSocketConnection, frame: bytes) -> None:
+    """Sends an already encoded frame, like WebSocketConnection.send_message does after encoding the message."""
+    if connection.closed:
+        raise ConnectionClosed(connection.closed)
+    async with connection._stream_lock:
+        try:
+            await connection._stream.send_all(frame)
+        except (trio.BrokenResourceError, trio.ClosedResourceError):
+            await connection._abort_web_socket()
+            raise ConnectionClosed(connection.closed) from None
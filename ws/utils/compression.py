@@ -0,0 +1,98 @@
+"""permessage-deflate compression (RFC 7692) of websocket messages."""
+from typing import Optional, Tuple, Union
+
+from rich.console import Console
+from wsproto.extensions import PerMessageDeflate
+from wsproto.frame_protocol import CloseReason, FrameDecoder, FrameProtocol, Opcode, RsvBits
+
+from ws.settings import Settings
+from ws.utils.size import get_readable_size
+
+
+class MeasuredPerMessageDeflate(PerMessageDeflate):
+    """Counts the size of messages before and after compression, to report the compression ratio of a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent_size = 0
+        self.sent_compressed_size = 0
+        self.received_size = 0
+        self.received_compressed_size = 0
+
+    def frame_outbound(
+        self, proto: Union[FrameDecoder, FrameProtocol], opcode: Opcode, rsv: RsvBits, data: bytes, fin: bool
+    ) -> Tuple[RsvBits, bytes]:
+        rsv, compressed_data = super().frame_outbound(proto, opcode, rsv, data, fin)
+        if self._compressible_opcode(opcode):
+            self.sent_size += len(data)
+            self.sent_compressed_size += len(compressed_data)
+        return rsv, compressed_data
+
+    def frame_inbound_payload_data(
+        self, proto: Union[FrameDecoder, FrameProtocol], data: bytes
+    ) -> Union[bytes, CloseReason]:
+        result = super().frame_inbound_payload_data(proto, data)
+        if self._inbound_is_compressible and isinstance(result, (bytes, bytearray)):
+            self.received_compressed_size += len(data)
+            self.received_size += len(result)
+        return result
+
+    def frame_inbound_complete(
+        self, proto: Union[FrameDecoder, FrameProtocol], fin: bool
+    ) -> Union[bytes, CloseReason, None]:
+        result = super().frame_inbound_complete(proto, fin)
+        # the end of a compressed message may still be in the decompressor
+        if isinstance(result, (bytes, bytearray)):
+            self.received_size += len(result)
+        return result
+
+    @property
+    def sent_ratio(self) -> float:
+        return self.sent_size / self.sent_compressed_size if self.sent_compressed_size else 1.0
+
+    @property
+    def received_ratio(self) -> float:
+        return self.received_size / self.received_compressed_size if self.received_compressed_size else 1.0
+
+    @property
+    def parameters(self) -> str:
+        """Returns the negotiated parameters in the format of the Sec-WebSocket-Extensions header."""
+        return str(self.offer())
+
+
+def create_compression_extension(settings: Settings) -> Optional[MeasuredPerMessageDeflate]:
+    """Returns a new extension for each connection when compression is enabled, since it holds the zlib context."""
+    if not settings.compression:
+        return None
+
+    return MeasuredPerMessageDeflate(
+        client_no_context_takeover=settings.compression_client_no_context_takeover,
+        client_max_window_bits=settings.compression_client_max_window_bits,
+        server_no_context_takeover=settings.compression_server_no_context_takeover,
+        server_max_window_bits=settings.compression_server_max_window_bits,
+    )
+
+
+def print_compression_parameters(terminal: Console, extension: Optional[MeasuredPerMessageDeflate]) -> None:
+    if extension is None:
+        return
+
+    if extension.enabled():
+        terminal.print(f'[label]permessage-deflate[/]: {extension.parameters}')
+    else:
+        terminal.print('[warning]The server did not accept permessage-deflate compression')
+
+
+def format_compression_summary(extension: MeasuredPerMessageDeflate) -> str:
+    return (
+        f'[label]compression[/]: sent [number]{get_readable_size(extension.sent_size)}[/] as '
+        f'[number]{get_readable_size(extension.sent_compressed_size)}[/] (ratio [number]{extension.sent_ratio:.2f}[/]),'
+        f' received [number]{get_readable_size(extension.received_size)}[/] as '
+        f'[number]{get_readable_size(extension.received_compressed_size)}[/] '
+        f'(ratio [number]{extension.received_ratio:.2f}[/])'
+    )
+
+
+def print_compression_summary(terminal: Console, extension: Optional[MeasuredPerMessageDeflate]) -> None:
+    if extension is not None and extension.enabled():
+        terminal.print(format_compression_summary(extension))
@@ -7,14 +7,8 @@ To know more about a particular command type [info]help[/] <command>.
 To close the session, you can type [bold]Ctrl+D[/] or the [info]quit[/] command.
 """
 
+# the summary of each command registered in the session follows
 HELP = """The session program lets you interact with a websocket endpoint with the following commands:
-
-• [info]ping[/] <message>: Sends a ping with an optional message.
-• [info]pong[/] <message>: Sends a pong with an optional message.
-• [info]text[/] [green]message[/]: Sends text message.
-• [info]byte[/] [green]message[/]: Sends byte message.
-• [info]close[/] <code> <reason>: Closes the websocket connection with an optional code and message.
-• [info]quit[/]: equivalent to [bold]close 1000[/].
 """
 
 
@@ -22,7 +16,7 @@ PING_HELP = """The ping command sends a PING control frame with an optional mess
 
 Example usage:
 
-A random 32 bytes of data will be sent to the server as ping payload.
+A random 4 bytes of data will be sent to the server as ping payload.
 ```shell
 > ping
 ```
@@ -1,17 +1,24 @@
 import io
+import mmap
+import os
 import signal
-from typing import Any, AsyncIterator, Callable, Optional
+import stat
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Union
 
 import trio
+from rich.console import Console
 
 from ws.console import console
 
+BLOCK_SIZE = 64 * 1024
 
-async def signal_handler(scope: trio.CancelScope) -> None:
+
+async def signal_handler(scope: trio.CancelScope, terminal: Console = console) -> None:
+    """Cancels the scope when the program receives SIGINT or SIGTERM, the goodbye message is printed on the terminal."""
     with trio.open_signal_receiver(signal.SIGINT, signal.SIGTERM) as signals:
         async for signum in signals:
             key = 'Ctrl+C' if signum == signal.SIGINT else 'SIGTERM'
-            console.print(f'[info]Program was interrupted by {key}, good bye! :waving_hand:')
+            terminal.print(f'[info]Program was interrupted by {key}, good bye! :waving_hand:')
 
             # noinspection PyAsyncCall
             scope.cancel()
@@ -24,30 +31,66 @@ async def function_runner(scope: trio.CancelScope, function: Callable, *args: An
     scope.cancel()
 
 
+def _reverse_split_lines(data: Union[bytes, mmap.mmap], end: int, parts: List[bytes]) -> Iterator[bytes]:
+    """
+    Yields lines of data[:end] from the last to the first one.
+    The first line of the data is not yielded but appended to parts since it can be the end of a line started in a
+    previous chunk of the file.
+    """
+    while True:
+        index = data.rfind(b'\n', 0, end)
+        if index == -1:
+            parts.append(data[:end])
+            return
+
+        parts.append(data[index + 1 : end])
+        yield b''.join(reversed(parts))
+        parts.clear()
+        end = index
+
+
+def _reverse_read_mmap_lines(file: str) -> Iterator[bytes]:
+    with open(file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            parts: List[bytes] = []
+            yield from _reverse_split_lines(data, len(data), parts)
+            # like for the block reader, an empty first line is not returned
+            first_line = b''.join(reversed(parts))
+            if first_line:
+                yield first_line
+
+
 # it is a good idea to read the file in byte mode, more information can be found
 # in the answers of this post: https://stackoverflow.com/a/23646049/7181806
-async def reverse_read_lines(file: str) -> AsyncIterator[bytes]:
+async def reverse_read_lines(file: str, block_size: int = BLOCK_SIZE, use_mmap: bool = True) -> AsyncIterator[bytes]:
+    file_stat = os.stat(file)
+    if file_stat.st_size == 0:
+        return
+
+    # a regular file is mapped in memory, so we only touch the pages containing the lines we read
+    if use_mmap and stat.S_ISREG(file_stat.st_mode):
+        for line in _reverse_read_mmap_lines(file):
+            yield line
+        return
+
     async with await trio.open_file(file, 'rb') as f:
-        await f.seek(0, io.SEEK_END)
-        pointer = await f.tell()
-        buffer = bytearray()
-
-        while pointer >= 0:
-            await f.seek(pointer)
-            # we read character by character
-            pointer -= 1
-            char = await f.read(1)
-
-            # if we reach '\n' this means we have read one line and can return it
-            if char == b'\n':
-                yield buffer[::-1]
-                buffer.clear()
-            else:
-                buffer += char
-
-        # if the buffer is not empty, it is the first line, so we return it
-        if buffer:
-            yield buffer[::-1]
+        pointer = await f.seek(0, io.SEEK_END)
+        # pieces of the line being read, from the end to the beginning
+        parts: List[bytes] = []
+
+        while pointer > 0:
+            # we read blocks aligned on the block size, the last block of the file is the only partial one
+            start = (pointer - 1) // block_size * block_size
+            await f.seek(start)
+            block = await f.read(pointer - start)
+            pointer = start
+            for line in _reverse_split_lines(block, len(block), parts):
+                yield line
+
+        # if the remaining line is not empty, it is the first line, so we return it
+        first_line = b''.join(reversed(parts))
+        if first_line:
+            yield first_line
 
 
 async def sleep_until(cancel_scope: trio.CancelScope, duration: Optional[float] = None) -> None:
@@ -0,0 +1,97 @@
+"""Prometheus text exposition of counters kept by a server, served over HTTP on a separate port."""
+import functools
+from bisect import bisect_left
+from typing import Any, Callable, List, Sequence
+
+import trio
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# a scrape request is small, anything larger is not a request we want to answer
+MAX_REQUEST_SIZE = 8192
+REQUEST_TIMEOUT = 5.0
+
+
+class Histogram:
+    """
+    Counts observed values in fixed buckets like a Prometheus histogram. Observing a value is a binary search and two
+    additions, the cumulative counts are only computed when the histogram is rendered.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        # the last count is for values greater than the highest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_metric(name: str, kind: str, description: str, value: float) -> List[str]:
+    """Returns the lines of a counter or gauge metric."""
+    return [f'# HELP {name} {description}', f'# TYPE {name} {kind}', f'{name} {_format_value(value)}']
+
+
+def format_histogram(name: str, description: str, histogram: Histogram) -> List[str]:
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+    cumulative_count = 0
+    for bucket, count in zip(histogram.buckets, histogram.counts):
+        cumulative_count += count
+        lines.append(f'{name}_bucket{{le="{_format_value(bucket)}"}} {cumulative_count}')
+    lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum {_format_value(histogram.sum)}')
+    lines.append(f'{name}_count {histogram.count}')
+    return lines
+
+
+def _build_response(status: str, body: str, content_type: str = 'text/plain; charset=utf-8') -> bytes:
+    data = body.encode()
+    headers = (
+        f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n'
+    )
+    return headers.encode() + data
+
+
+async def _read_request_line(stream: trio.abc.Stream) -> str:
+    data = b''
+    while b'\r\n\r\n' not in data and len(data) < MAX_REQUEST_SIZE:
+        chunk = await stream.receive_some(MAX_REQUEST_SIZE)
+        if not chunk:
+            break
+        data += chunk
+    return data.split(b'\r\n', 1)[0].decode('latin-1')
+
+
+async def _handle_scrape(stream: trio.abc.Stream, render: Callable[[], str]) -> None:
+    try:
+        with trio.move_on_after(REQUEST_TIMEOUT):
+            parts = (await _read_request_line(stream)).split()
+            if len(parts) != 3:
+                response = _build_response('400 Bad Request', 'bad request\n')
+            elif parts[0] != 'GET':
+                response = _build_response('405 Method Not Allowed', 'only GET is allowed\n')
+            elif parts[1].split('?', 1)[0] != '/metrics':
+                response = _build_response('404 Not Found', 'metrics are served on /metrics\n')
+            else:
+                response = _build_response('200 OK', render(), CONTENT_TYPE)
+            await stream.send_all(response)
+    except trio.BrokenResourceError:
+        pass
+    finally:
+        await trio.aclose_forcefully(stream)
+
+
+async def serve_metrics(
+    host: str, port: int, render: Callable[[], str], task_status: Any = trio.TASK_STATUS_IGNORED
+) -> None:
+    """Answers GET /metrics requests with the text returned by render, until the task is cancelled."""
+    listeners = await trio.open_tcp_listeners(port, host=host)
+    task_status.started(listeners)
+    await trio.serve_listeners(functools.partial(_handle_scrape, render=render), listeners)
@@ -0,0 +1,189 @@
+"""Reconnection of long-running commands when the connection is lost."""
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import trio
+from rich.console import Console
+from trio_websocket import (
+    ConnectionClosed,
+    ConnectionRejected,
+    ConnectionTimeout,
+    DisconnectionTimeout,
+    HandshakeError,
+    WebSocketConnection,
+)
+
+from ws.client import open_websocket_client
+from ws.console import console
+from ws.settings import get_settings
+from ws.utils.compression import print_compression_parameters, print_compression_summary
+from ws.utils.statistics import LatencyHistogram, print_latency_summary
+from ws.utils.timings import ConnectionTimings, print_connection_timings
+from ws.utils.tls import TlsHandshakeStatistics, print_tls_summary
+
+# delays between two connection attempts, in seconds
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+# errors after which a new connection is attempted, HandshakeError covers timeouts and rejected connections
+RECONNECT_ERRORS = (ConnectionClosed, HandshakeError, OSError)
+
+
+@dataclass
+class ReconnectStatistics:
+    reconnections: int = 0
+    failed_attempts: int = 0
+    # time when the last established connection was lost, it is None while connected
+    disconnected_at: Optional[float] = None
+    total_downtime: float = 0.0
+    reconnect_times: LatencyHistogram = field(default_factory=LatencyHistogram)
+    downtimes: LatencyHistogram = field(default_factory=LatencyHistogram)
+    tls_handshakes: TlsHandshakeStatistics = field(default_factory=TlsHandshakeStatistics)
+
+    def get_total_downtime(self) -> float:
+        """Returns the downtime including the current disconnection if the connection is not established again."""
+        if self.disconnected_at is None:
+            return self.total_downtime
+        return self.total_downtime + trio.current_time() - self.disconnected_at
+
+
+def get_backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """
+    Returns the delay to wait before the given attempt, starting from 1. The delay doubles at each attempt up to the
+    cap, and half of it is random so that clients disconnected at the same time do not reconnect at the same time.
+    """
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)  # noqa: S311
+
+
+async def run_with_reconnection(
+    url: str,
+    handler: Callable[[WebSocketConnection], Awaitable[None]],
+    max_attempts: int,
+    statistics: ReconnectStatistics,
+    terminal: Console = console,
+    with_timings: bool = False,
+) -> None:
+    """
+    Runs the handler with a websocket connection to the url, and runs it again with a new connection each time the
+    connection is lost. The error of the last attempt is raised after max_attempts consecutive failed attempts. With
+    timings, the steps of each connection attempt are printed when it ends.
+    """
+    settings = get_settings()
+    attempt = 0
+    while True:
+        connected = False
+        started_at = trio.current_time()
+        timings = ConnectionTimings() if with_timings else None
+        error = None
+        try:
+            async with open_websocket_client(url, settings, timings) as client:
+                connected = True
+                attempt = 0
+                statistics.tls_handshakes.record(client.tls_handshake_time, client.is_tls_session_resumed)
+                now = trio.current_time()
+                if statistics.disconnected_at is not None:
+                    downtime = now - statistics.disconnected_at
+                    statistics.reconnections += 1
+                    statistics.reconnect_times.record(now - started_at)
+                    statistics.downtimes.record(downtime)
+                    statistics.total_downtime += downtime
+                    statistics.disconnected_at = None
+                    terminal.print(f'[info]Reconnected to {url} after [number]{downtime:.3f}s[/] of downtime')
+                print_compression_parameters(terminal, client.compression)
+                try:
+                    await handler(client)
+                except RECONNECT_ERRORS as e:
+                    # caught inside the connection, otherwise a cancellation of the program at the same time would
+                    # group the error with the cancellation of the reader task and the error would escape
+                    error = e
+                finally:
+                    print_compression_summary(terminal, client.compression)
+            if error is None:
+                return
+        except RECONNECT_ERRORS as e:
+            error = e
+        finally:
+            if timings is not None:
+                print_connection_timings(terminal, url, timings)
+
+        if connected:
+            statistics.disconnected_at = trio.current_time()
+            reason = 'lost'
+        else:
+            statistics.failed_attempts += 1
+            reason = 'failed'
+
+        attempt += 1
+        if attempt > max_attempts:
+            terminal.print(f'[error]Unable to reconnect to {url} after {max_attempts} attempt(s)')
+            raise error
+
+        delay = get_backoff_delay(attempt, BACKOFF_BASE, BACKOFF_CAP)
+        terminal.print(
+            f'[warning]Connection to {url} {reason} ({type(error).__name__}), attempt [number]{attempt}/{max_attempts}'
+            f'[/] in [number]{delay:.3f}s'
+        )
+        await trio.sleep(delay)
+
+
+async def run_websocket_client(
+    url: str,
+    handler: Callable[[WebSocketConnection], Awaitable[None]],
+    max_attempts: Optional[int] = None,
+    statistics: Optional[ReconnectStatistics] = None,
+    terminal: Console = console,
+    with_timings: bool = False,
+) -> None:
+    """
+    Runs the handler with a websocket connection, which is opened again when it is lost if max_attempts is given.
+    Connection errors are raised instead of exiting the program, so that the caller decides what they stop.
+    """
+    if max_attempts is not None:
+        statistics = ReconnectStatistics() if statistics is None else statistics
+        await run_with_reconnection(url, handler, max_attempts, statistics, terminal, with_timings)
+        return
+
+    timings = ConnectionTimings() if with_timings else None
+    error = None
+    try:
+        async with open_websocket_client(url, get_settings(), timings) as client:
+            print_compression_parameters(terminal, client.compression)
+            try:
+                await handler(client)
+            except RECONNECT_ERRORS as e:
+                # caught inside the connection for the same reason as in run_with_reconnection
+                error = e
+            finally:
+                print_compression_summary(terminal, client.compression)
+    finally:
+        if timings is not None:
+            print_connection_timings(terminal, url, timings)
+    if error is not None:
+        raise error
+
+
+def describe_connection_error(error: Exception) -> str:
+    """Returns a short description of an error raised by run_websocket_client."""
+    if isinstance(error, ConnectionClosed):
+        return f'connection closed by the endpoint with code {error.reason.code} ({error.reason.name})'
+    if isinstance(error, ConnectionRejected):
+        return f'connection rejected with status code {error.status_code}'
+    if isinstance(error, ConnectionTimeout):
+        return 'unable to connect on time'
+    if isinstance(error, DisconnectionTimeout):
+        return 'unable to disconnect on time'
+    cause = error.__cause__ if isinstance(error, HandshakeError) and error.__cause__ is not None else error
+    return f'unable to connect ({cause})'
+
+
+def print_reconnect_summary(terminal: Console, url: str, statistics: ReconnectStatistics) -> None:
+    terminal.print(f'--- {url} reconnect statistics ---')
+    terminal.print(
+        f'[number]{statistics.reconnections}[/] reconnections, [number]{statistics.failed_attempts}[/] failed attempts,'
+        f' total downtime [number]{statistics.get_total_downtime():.3f}s[/]'
+    )
+    for label, histogram in [('reconnect', statistics.reconnect_times), ('downtime', statistics.downtimes)]:
+        if histogram.count:
+            print_latency_summary(terminal, label, histogram)
+    print_tls_summary(terminal, statistics.tls_handshakes)
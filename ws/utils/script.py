@@ -0,0 +1,165 @@
+"""Session commands read from a script and run on one connection without prompt, with the duration of each step."""
+import random
+import struct
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Union
+
+import trio
+from rich.console import Console
+from rich.text import Text
+from trio_websocket import ConnectionClosed, WebSocketConnection
+from wsproto.events import Ping
+
+from ws.utils.command import (
+    Command,
+    CommandError,
+    check_close_arguments,
+    check_control_payload,
+    check_data_message,
+    command_registry,
+    parse_command,
+)
+from ws.utils.compat import DEFAULT_PING_PAYLOAD_SIZE, get_pending_pings, send_event
+from ws.utils.size import get_readable_size
+from ws.utils.statistics import format_milliseconds
+
+SCRIPT_COMMANDS = (Command.TEXT, Command.BYTE, Command.PING, Command.PONG, Command.CLOSE, Command.QUIT)
+
+
+@dataclass
+class ScriptStep:
+    line: int
+    command: Command
+    # data of text and byte messages, payload of ping and pong frames
+    message: Union[str, bytes, None] = None
+    code: int = 1000
+    reason: Optional[str] = None
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+
+class ScriptError(Exception):
+    """Raised when a line of a script is not a valid command, the message is plain text."""
+
+
+def parse_step(line: int, command_line: str) -> ScriptStep:
+    command = parse_command(command_line)
+    names = [script_command.value for script_command in SCRIPT_COMMANDS]
+    if command.name not in names:
+        raise ScriptError(f'line {line}: unknown command {command.name}, available commands are {", ".join(names)}')
+
+    step = ScriptStep(line, Command(command.name))
+    try:
+        arguments = command_registry.get(command.name).parse_arguments(command.args)
+        if step.command in (Command.TEXT, Command.BYTE):
+            step.message = check_data_message(arguments.message, is_byte=step.command is Command.BYTE)
+        elif step.command in (Command.PING, Command.PONG):
+            step.message = check_control_payload(arguments.message, step.command.value.upper())
+        elif step.command is Command.CLOSE:
+            step.code, step.reason = check_close_arguments(arguments.code, arguments.reason)
+    except CommandError as e:
+        raise ScriptError(f'line {line}: {Text.from_markup(e.message).plain.strip()}') from None
+    return step
+
+
+def parse_script(lines: Iterable[str]) -> List[ScriptStep]:
+    """
+    Returns the steps of a script, one session command per line. Empty lines and lines starting with # are ignored.
+    A close or quit command can only be the last one, quit is not a step since the connection is closed anyway.
+    """
+    steps: List[ScriptStep] = []
+    for line, command_line in enumerate(lines, start=1):
+        command_line = command_line.strip()
+        if not command_line or command_line.startswith('#'):
+            continue
+        if steps and steps[-1].command in (Command.CLOSE, Command.QUIT):
+            raise ScriptError(f'line {line}: no command can follow {steps[-1].command.value}')
+        steps.append(parse_step(line, command_line))
+
+    if steps and steps[-1].command is Command.QUIT:
+        steps.pop()
+    return steps
+
+
+async def run_ping(
+    client: WebSocketConnection,
+    step: ScriptStep,
+    response_timeout: float,
+    task_status: Any = trio.TASK_STATUS_IGNORED,
+) -> None:
+    """
+    Sends a ping and waits for its pong. It does what WebSocketConnection.ping does, but the caller is resumed as soon
+    as the ping is written, so that the next steps are sent while the pong is on its way.
+    """
+    payload = struct.pack('!I', random.getrandbits(32)) if step.message is None else step.message
+    # a pong answers all pings sent before, but trio-websocket expects a payload to be pending only once
+    pings = get_pending_pings(client)
+    while payload in pings:
+        await pings[payload].wait()
+
+    if client.closed:
+        raise ConnectionClosed(client.closed)
+    pong_received = trio.Event()
+    pings[payload] = pong_received
+    beginning = trio.current_time()
+    await send_event(client, Ping(payload=payload))
+    task_status.started()
+
+    with trio.move_on_after(response_timeout):
+        await pong_received.wait()
+        step.duration = trio.current_time() - beginning
+        return
+    step.error = 'no pong'
+    pings.pop(payload, None)
+
+
+async def run_steps(client: WebSocketConnection, steps: List[ScriptStep], response_timeout: float) -> None:
+    """
+    Runs the steps in order until a close step. Sends do not wait for anything but the frame to be written, and pongs
+    are awaited in the background, they are all received when the function returns.
+    """
+    async with trio.open_nursery() as nursery:
+        for step in steps:
+            if step.command is Command.CLOSE:
+                break
+            beginning = trio.current_time()
+            if step.command is Command.PING:
+                await nursery.start(run_ping, client, step, response_timeout)
+                continue
+            if step.command is Command.PONG:
+                await client.pong(step.message or b'')
+            else:
+                await client.send_message(step.message)
+            step.duration = trio.current_time() - beginning
+
+
+async def run_close(client: WebSocketConnection, step: ScriptStep) -> None:
+    beginning = trio.current_time()
+    await client.aclose(step.code, step.reason)
+    step.duration = trio.current_time() - beginning
+
+
+def describe_step(step: ScriptStep) -> str:
+    if step.command in (Command.TEXT, Command.BYTE):
+        return f'{step.command.value} {get_readable_size(len(step.message))}'
+    if step.command in (Command.PING, Command.PONG):
+        size = (
+            DEFAULT_PING_PAYLOAD_SIZE
+            if step.message is None and step.command is Command.PING
+            else len(step.message or b'')
+        )
+        return f'{step.command.value} {get_readable_size(size)}'
+    return f'{step.command.value} {step.code}'
+
+
+def print_script_report(terminal: Console, steps: List[ScriptStep], duration: float) -> None:
+    terminal.print('--- script timings ---')
+    for step in steps:
+        label = f'[label]line {step.line}[/] {describe_step(step)}'
+        if step.error is not None:
+            terminal.print(f'{label} = [error]{step.error}[/]')
+        elif step.duration is not None:
+            terminal.print(f'{label} = [number]{format_milliseconds(step.duration)}[/] ms')
+        else:
+            terminal.print(f'{label} = [warning]not run[/]')
+    terminal.print(f'[label]total[/] = [number]{format_milliseconds(duration)}[/] ms')
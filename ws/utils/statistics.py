@@ -0,0 +1,131 @@
+"""Constant memory latency statistics used by the commands measuring round trips."""
+import math
+from array import array
+from typing import Iterator, Tuple
+
+from rich.console import Console
+
+# latencies are recorded as integers in microseconds
+MICROSECONDS = 1_000_000
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """
+    A simplified HDR histogram.
+
+    Values are stored in log-linear buckets, so the memory used does not depend on the number of recorded values, and
+    the relative error of every percentile is bounded by the number of significant digits given at the creation.
+    Minimum, maximum, mean and standard deviation are computed exactly from the recorded values.
+    """
+
+    def __init__(self, highest_trackable_value: float = 3600.0, significant_digits: int = 3):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError('significant_digits must be between 1 and 5')
+
+        # values are in seconds, the histogram works with microseconds
+        self._highest_trackable_value = max(int(highest_trackable_value * MICROSECONDS), 2)
+        largest_value_with_single_unit_resolution = 2 * 10**significant_digits
+        sub_bucket_count_magnitude = math.ceil(math.log2(largest_value_with_single_unit_resolution))
+        self._sub_bucket_half_count_magnitude = max(sub_bucket_count_magnitude, 1) - 1
+        self._sub_bucket_count = 1 << (self._sub_bucket_half_count_magnitude + 1)
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self._sub_bucket_mask = self._sub_bucket_count - 1
+
+        smallest_untrackable_value = self._sub_bucket_count
+        bucket_count = 1
+        while smallest_untrackable_value <= self._highest_trackable_value:
+            smallest_untrackable_value <<= 1
+            bucket_count += 1
+
+        self._counts = array('Q', [0]) * ((bucket_count + 1) * self._sub_bucket_half_count)
+        self.count = 0
+        self._min = 0
+        self._max = 0
+        self._mean = 0.0
+        # sum of squares of differences from the current mean (Welford algorithm)
+        self._m2 = 0.0
+
+    def _get_index(self, value: int) -> int:
+        bucket_index = (value | self._sub_bucket_mask).bit_length() - (self._sub_bucket_half_count_magnitude + 1)
+        sub_bucket_index = value >> bucket_index
+        return (
+            ((bucket_index + 1) << self._sub_bucket_half_count_magnitude)
+            + sub_bucket_index
+            - self._sub_bucket_half_count
+        )
+
+    def _get_highest_equivalent_value(self, index: int) -> int:
+        bucket_index = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self._sub_bucket_half_count
+            bucket_index = 0
+        lowest_value = sub_bucket_index << bucket_index
+        return lowest_value + (1 << bucket_index) - 1
+
+    def record(self, value: float) -> None:
+        """Records a duration expressed in seconds."""
+        microseconds = min(max(round(value * MICROSECONDS), 0), self._highest_trackable_value)
+        self._counts[self._get_index(microseconds)] += 1
+
+        if self.count == 0 or microseconds < self._min:
+            self._min = microseconds
+        if microseconds > self._max:
+            self._max = microseconds
+        self.count += 1
+        delta = microseconds - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (microseconds - self._mean)
+
+    @property
+    def min(self) -> float:
+        return self._min / MICROSECONDS
+
+    @property
+    def max(self) -> float:
+        return self._max / MICROSECONDS
+
+    @property
+    def mean(self) -> float:
+        return self._mean / MICROSECONDS
+
+    @property
+    def stddev(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return math.sqrt(self._m2 / self.count) / MICROSECONDS
+
+    def percentile(self, percentile: float) -> float:
+        """Returns the value in seconds below which the given percentage of recorded values falls."""
+        if self.count == 0:
+            return 0.0
+
+        percentile = min(max(percentile, 0.0), 100.0)
+        target = max(math.ceil(percentile / 100 * self.count), 1)
+        total = 0
+        for index, count in self._non_empty_counts():
+            total += count
+            if total >= target:
+                value = self._get_highest_equivalent_value(index)
+                return min(max(value, self._min), self._max) / MICROSECONDS
+
+        return self.max  # pragma: no cover
+
+    def _non_empty_counts(self) -> Iterator[Tuple[int, int]]:
+        for index, count in enumerate(self._counts):
+            if count:
+                yield index, count
+
+
+def format_milliseconds(value: float) -> str:
+    return f'{value * 1000:.3f}'
+
+
+def print_latency_summary(terminal: Console, label: str, histogram: LatencyHistogram) -> None:
+    values = '/'.join(format_milliseconds(value) for value in (histogram.min, histogram.mean, histogram.max))
+    terminal.print(
+        f'[label]{label}[/] min/avg/max/stddev = [number]{values}/{format_milliseconds(histogram.stddev)}[/] ms'
+    )
+    percentiles = '/'.join(format_milliseconds(histogram.percentile(value)) for value in PERCENTILES)
+    terminal.print(f'[label]{label}[/] p50/p90/p99/p99.9 = [number]{percentiles}[/] ms')
@@ -0,0 +1,57 @@
+"""Duration of each step of the life of a connection, to know where the time goes when connecting is slow."""
+import contextlib
+from typing import ContextManager, Dict, Iterator, Optional, Tuple
+
+import trio
+from rich.console import Console
+
+from ws.utils.statistics import format_milliseconds
+
+# steps in the order they happen, tls is only present for wss urls
+PHASES = ('dns', 'tcp', 'tls', 'upgrade', 'close')
+
+
+class ConnectionTimings:
+    """
+    Records the duration of the steps of a connection. When a step fails or is interrupted, it stays pending, so that
+    we know which step the connection was stuck in.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._pending: Optional[Tuple[str, float]] = None
+
+    @contextlib.contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        beginning = trio.current_time()
+        self._pending = (phase, beginning)
+        yield
+        self.durations[phase] = trio.current_time() - beginning
+        self._pending = None
+
+    @property
+    def pending_phase(self) -> Optional[Tuple[str, float]]:
+        """Returns the step which did not complete and the time spent in it."""
+        if self._pending is None:
+            return None
+        phase, beginning = self._pending
+        return phase, trio.current_time() - beginning
+
+
+def measure(timings: Optional[ConnectionTimings], phase: str) -> ContextManager[None]:
+    """Measures the step only when timings are requested."""
+    return contextlib.nullcontext() if timings is None else timings.measure(phase)
+
+
+def print_connection_timings(terminal: Console, url: str, timings: ConnectionTimings) -> None:
+    terminal.print(f'--- {url} connection timings ---')
+    for phase in PHASES:
+        if phase in timings.durations:
+            terminal.print(f'[label]{phase}[/] = [number]{format_milliseconds(timings.durations[phase])}[/] ms')
+
+    pending_phase = timings.pending_phase
+    if pending_phase is not None:
+        phase, elapsed = pending_phase
+        terminal.print(
+            f'[label]{phase}[/] = [error]not completed[/] after [number]{format_milliseconds(elapsed)}[/] ms'
+        )
@@ -0,0 +1,61 @@
+"""Reuse of TLS sessions, so that repeated connections to the same server do an abbreviated handshake."""
+import ssl
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from rich.console import Console
+
+from ws.utils.statistics import LatencyHistogram, print_latency_summary
+
+
+class TlsSessionCache:
+    """
+    Keeps the last TLS session of each server, it is given to the next connection to the same server to resume the
+    session instead of doing a full handshake. Sessions are only valid with the SSLContext which created them.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[Tuple[ssl.SSLContext, str, int], ssl.SSLSession] = {}
+
+    def get(self, context: ssl.SSLContext, host: str, port: int) -> Optional[ssl.SSLSession]:
+        return self._sessions.get((context, host, port))
+
+    def set(self, context: ssl.SSLContext, host: str, port: int, session: Optional[ssl.SSLSession]) -> None:
+        if session is not None:
+            self._sessions[(context, host, port)] = session
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+
+tls_session_cache = TlsSessionCache()
+
+
+@dataclass
+class TlsHandshakeStatistics:
+    full_handshakes: LatencyHistogram = field(default_factory=LatencyHistogram)
+    resumed_handshakes: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def record(self, duration: Optional[float], is_resumed: bool) -> None:
+        """Records the duration of a handshake, nothing is recorded for connections without TLS."""
+        if duration is None:
+            return
+        histogram = self.resumed_handshakes if is_resumed else self.full_handshakes
+        histogram.record(duration)
+
+
+def print_tls_summary(terminal: Console, statistics: TlsHandshakeStatistics) -> None:
+    full_count, resumed_count = statistics.full_handshakes.count, statistics.resumed_handshakes.count
+    if not full_count and not resumed_count:
+        return
+
+    terminal.print(
+        f'[label]tls handshakes[/]: [number]{full_count}[/] full, [number]{resumed_count}[/] resumed'
+        f' ([number]{resumed_count / (full_count + resumed_count):.1%}[/] resumption rate)'
+    )
+    for label, histogram in [
+        ('full handshake', statistics.full_handshakes),
+        ('resumed handshake', statistics.resumed_handshakes),
+    ]:
+        if histogram.count:
+            print_latency_summary(terminal, label, histogram)
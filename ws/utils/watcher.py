@@ -0,0 +1,107 @@
+"""Watchers used to wait for changes of a file, for example when following it with the tail command."""
+import contextlib
+import ctypes
+import ctypes.util
+import os
+import sys
+from typing import Iterator, Optional, Union
+
+import trio
+
+POLLING_INTERVAL = 0.1
+
+# constants taken from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        # we check that the functions we need are present
+        libc.inotify_init1  # noqa: B018
+        libc.inotify_add_watch  # noqa: B018
+    except (OSError, AttributeError):
+        return None
+
+    return libc
+
+
+class PollingWatcher:
+    """Checks the size of the file at regular intervals, it works on all platforms."""
+
+    def __init__(self, filename: str, interval: float = POLLING_INTERVAL):
+        self._filename = filename
+        self._interval = interval
+
+    async def wait(self, position: int) -> None:
+        """Waits until the size of the file differs from the given position."""
+        while True:
+            await trio.sleep(self._interval)
+            try:
+                if os.stat(self._filename).st_size != position:
+                    return
+            except FileNotFoundError:
+                # the file was moved or deleted, the caller decides what to do
+                return
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Sleeps until the linux kernel notifies a change of the file, so there is no wakeup on idle files."""
+
+    def __init__(self, filename: str, libc: ctypes.CDLL):
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+        if libc.inotify_add_watch(self._fd, os.fsencode(filename), IN_WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, os.strerror(error), filename)
+
+    def _drain_events(self) -> None:
+        # we don't care about the content of the events, the caller checks the file itself
+        with contextlib.suppress(BlockingIOError):
+            while os.read(self._fd, 4096):
+                pass
+
+    async def wait(self, position: int) -> None:
+        """Waits until the kernel reports a change of the file."""
+        await trio.lowlevel.wait_readable(self._fd)
+        self._drain_events()
+
+    def close(self) -> None:
+        trio.lowlevel.notify_closing(self._fd)
+        os.close(self._fd)
+
+
+Watcher = Union[InotifyWatcher, PollingWatcher]
+_libc = _load_libc()
+
+
+@contextlib.contextmanager
+def watch_file(filename: str) -> Iterator[Watcher]:
+    """Returns an inotify watcher when it is available and falls back to a polling watcher otherwise."""
+    watcher: Watcher
+    try:
+        if _libc is None:
+            raise OSError('inotify is not available')
+        watcher = InotifyWatcher(filename, _libc)
+    except OSError:
+        # inotify may also fail when the maximum number of watches is reached
+        watcher = PollingWatcher(filename)
+
+    try:
+        yield watcher
+    finally:
+        watcher.close()
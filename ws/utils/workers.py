@@ -0,0 +1,129 @@
+"""Supervision of worker processes sharing the work of a command, to use more than one CPU core."""
+import multiprocessing
+import multiprocessing.connection
+import signal
+import socket
+import time
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, Dict, List, Tuple
+
+import trio
+from rich.console import Console
+
+from ws.console import console
+
+# a worker crashing sooner than this after its start is not restarted, it would probably crash again
+MIN_UPTIME = 1.0
+
+
+async def wait_for_termination(scope: trio.CancelScope) -> None:
+    """Cancels the scope of a worker when the supervisor asks it to stop, nothing is printed by workers."""
+    with trio.open_signal_receiver(signal.SIGTERM) as signals:
+        async for _ in signals:
+            # noinspection PyAsyncCall
+            scope.cancel()
+            return
+
+
+def _run_worker(target: Callable, index: int, *args: Any) -> None:
+    # Ctrl+C is sent to all processes of the terminal, workers only stop when the supervisor forwards it, so that each
+    # of them receives one signal and has the time to report its results
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # a forked worker inherits the handler of the supervisor, it must stop when the supervisor terminates it
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # the wakeup socket of the supervisor is inherited, signals of the worker must not be written to it
+    signal.set_wakeup_fd(-1)
+    target(index, *args)
+
+
+class WorkerSupervisor:
+    """
+    Runs count processes calling target(index, *args, results), index starting from 1. Each worker may put small
+    results in the queue given as last argument before exiting, they are read as they arrive, so that a worker is not
+    blocked on a full pipe while the supervisor waits for its exit.
+    SIGINT and SIGTERM are forwarded once to the workers as SIGTERM, and workers which crash are restarted.
+    """
+
+    def __init__(self, target: Callable[..., None], args: Tuple[Any, ...], count: int, terminal: Console = console):
+        self._target = target
+        self._args = args
+        self._count = count
+        self._terminal = terminal
+        self._context = multiprocessing.get_context()
+        self._results = self._context.SimpleQueue()
+        self._processes: Dict[int, BaseProcess] = {}
+        self._started_at: Dict[int, float] = {}
+        self._is_stopping = False
+        self.exit_code = 0
+
+    def _start(self, index: int) -> None:
+        process = self._context.Process(
+            target=_run_worker, args=(self._target, index, *self._args, self._results), name=f'worker-{index}'
+        )
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+
+    def _stop(self) -> None:
+        self._is_stopping = True
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    def _handle_signal(self, signum: int, _frame: Any) -> None:
+        if self._is_stopping:
+            return
+        key = 'Ctrl+C' if signum == signal.SIGINT else 'SIGTERM'
+        self._terminal.print(f'[info]Program was interrupted by {key}, good bye! :waving_hand:')
+        self._stop()
+
+    def _handle_exit(self, index: int, process: BaseProcess) -> None:
+        del self._processes[index]
+        if self._is_stopping or process.exitcode == 0:
+            return
+
+        if time.monotonic() - self._started_at[index] < MIN_UPTIME:
+            self._terminal.print(f'[error]Worker {index} exited with code {process.exitcode} right after its start')
+            self.exit_code = 1
+            self._stop()
+        else:
+            self._terminal.print(f'[warning]Worker {index} exited with code {process.exitcode}, restarting it')
+            self._start(index)
+
+    def run(self) -> List[Any]:
+        """Returns the results of all workers once they have exited."""
+        signals = (signal.SIGINT, signal.SIGTERM)
+        previous_handlers = {signum: signal.signal(signum, self._handle_signal) for signum in signals}
+        # a signal may be received by another thread than the main one, which keeps waiting without running the handler,
+        # the number of the signal written on the wakeup socket ends the wait
+        wakeup_reader, wakeup_writer = socket.socketpair()
+        wakeup_writer.setblocking(False)
+        previous_wakeup_fd = signal.set_wakeup_fd(wakeup_writer.fileno(), warn_on_full_buffer=False)
+        results = []
+        try:
+            for index in range(1, self._count + 1):
+                self._start(index)
+
+            while self._processes:
+                # the reader of a SimpleQueue is not public, it is the end of the pipe written by workers
+                ready = multiprocessing.connection.wait(
+                    [self._results._reader, wakeup_reader, *(process.sentinel for process in self._processes.values())]
+                )
+                if wakeup_reader in ready:
+                    wakeup_reader.recv(64)
+                if self._results._reader in ready:
+                    results.append(self._results.get())
+                for index, process in list(self._processes.items()):
+                    if not process.is_alive():
+                        process.join()
+                        self._handle_exit(index, process)
+        finally:
+            signal.set_wakeup_fd(previous_wakeup_fd)
+            wakeup_reader.close()
+            wakeup_writer.close()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+        while not self._results.empty():
+            results.append(self._results.get())
+        return results